@@ -29,11 +29,11 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
-    'django.contrib.staticfiles',
     'django.contrib.humanize',
     
-    # Votre application
+    # Votre application (avant staticfiles : sa commande collectstatic construit le CSS)
     'scoring', 
+    'django.contrib.staticfiles',
     
     # Nouvelles apps pour les formulaires
     'crispy_forms',
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'scoring.middleware.PerfMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -68,6 +69,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'scoring.context_processors.unread_notifications',
+                'scoring.context_processors.assets',
             ],
         },
     },
@@ -117,6 +119,32 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / "media"
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Registre des poids du modèle de scoring (fichiers .npz versionnés)
+SCORING_MODEL_DIR = Path(os.environ.get("SCORING_MODEL_DIR", BASE_DIR / "scoring" / "ml_models"))
+
+# Référentiel (formules, produits, types) en cache par process : délai max avant relecture du tampon de version
+REFERENTIEL_CHECK_SECONDS = int(os.environ.get("REFERENTIEL_CHECK_SECONDS", "30"))
+
+# Autorisation carte : clé partagée avec le processeur de paiement (API désactivée si vide)
+# et durée de vie de l'état des cartes en cache dans chaque process
+CARTE_AUTORISATION_CLE = os.environ.get("CARTE_AUTORISATION_CLE", "")
+CARTE_CACHE_SECONDS = int(os.environ.get("CARTE_CACHE_SECONDS", "5"))
+
+# Numéros de compte : taille des blocs de séquence réservés par process
+IBAN_BLOCK_SIZE = int(os.environ.get("IBAN_BLOCK_SIZE", "100"))
+
+# CSS Tailwind précompilé (`build_css`, lancé par `collectstatic`). Tant qu'il n'est pas
+# construit, les pages retombent sur le compilateur navigateur (CDN), autorisé par la CSP.
+TAILWIND_CSS = BASE_DIR / "scoring" / "static" / "css" / "tailwind.min.css"
+TAILWIND_CDN = os.environ.get("TAILWIND_CDN", "0" if TAILWIND_CSS.exists() else "1") == "1"
+TAILWINDCSS_BIN = os.environ.get("TAILWINDCSS_BIN", "")
+
+# Instrumentation des requêtes (Admin dashboard > Performances) : part des requêtes mesurées
+PERF_SAMPLE_RATE = float(os.environ.get("PERF_SAMPLE_RATE", "0.1"))
+
+# Pages vitrine servies aux visiteurs anonymes : durée de cache (serveur et navigateur)
+PUBLIC_PAGE_MAX_AGE = int(os.environ.get("PUBLIC_PAGE_MAX_AGE", "300"))
+
 # Sécurité basique (adaptable pour la production)
 SESSION_COOKIE_SECURE = not DEBUG
 CSRF_COOKIE_SECURE = not DEBUG
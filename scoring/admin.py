@@ -4,7 +4,7 @@ from django.contrib.auth.admin import UserAdmin
 from .models import (
     ProfilClient, Compte, Carte, Transaction, 
     DemandeCredit, ProduitPret, TypeEmploi, TypeLogement,
-    Beneficiaire, DemandeDecouvert
+    Beneficiaire, DemandeDecouvert, ProfilFinancier, Formule, EmailOutbox, Tache
 )
 
 # ===============================================
@@ -67,6 +67,17 @@ class TransactionAdmin(admin.ModelAdmin):
     fields = ('compte', 'montant', 'libelle', 'type', 'categorie', 'date_execution')
 
 
+@admin.register(ProfilFinancier)
+class ProfilFinancierAdmin(admin.ModelAdmin):
+    # Indicateurs calculés à partir des transactions : lecture seule (rebuild_features pour recalculer)
+    list_display = ('user', 'salaire_mensuel_moyen', 'depense_mensuelle_moyenne', 'prelevements_recurrents', 'jours_decouvert', 'mis_a_jour_le')
+    search_fields = ('user__username',)
+    raw_id_fields = ('user',)
+
+    def get_readonly_fields(self, request, obj=None):
+        return [f.name for f in self.model._meta.fields]
+
+
 # ===============================================
 # 3. GESTION DES CRÉDITS ET SCORES
 # ===============================================
@@ -94,7 +105,12 @@ class DemandeCreditAdmin(admin.ModelAdmin):
         })
     )
 
-# Enregistrement simple des tables de référence
+# Enregistrement simple des tables de référence (mises en cache par scoring.catalogue)
+@admin.register(Formule)
+class FormuleAdmin(admin.ModelAdmin):
+    list_display = ('code', 'label', 'prix', 'decouvert_autorise', 'ordre')
+    list_editable = ('label', 'prix', 'decouvert_autorise', 'ordre')
+
 admin.site.register(ProduitPret)
 admin.site.register(TypeEmploi)
 admin.site.register(TypeLogement)
@@ -106,3 +122,18 @@ class DemandeDecouvertAdmin(admin.ModelAdmin):
     list_filter = ('statut',)
     search_fields = ('user__username',)
     raw_id_fields = ('user',)
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('sujet', 'statut', 'tentatives', 'prochain_essai', 'cree_le', 'envoye_le')
+    list_filter = ('statut',)
+    search_fields = ('sujet', 'destinataires')
+    readonly_fields = ('cree_le', 'envoye_le', 'derniere_erreur')
+
+
+@admin.register(Tache)
+class TacheAdmin(admin.ModelAdmin):
+    list_display = ('nom', 'statut', 'tentatives', 'cree_par', 'cree_le', 'fin', 'worker')
+    list_filter = ('statut', 'nom')
+    readonly_fields = ('resultat', 'erreur', 'debut', 'fin', 'worker', 'bail_expire')
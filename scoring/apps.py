@@ -4,3 +4,34 @@ from django.apps import AppConfig
 class ScoringConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'scoring'
+
+    def ready(self):
+        # Poids du modèle chargés une fois par process (partagés après fork avec --preload)
+        from . import ml
+        ml.preload()
+
+        # Indicateurs financiers tenus à jour à chaque transaction écrite
+        from django.db.models.signals import post_save
+        from . import features
+        from .models import Transaction
+        post_save.connect(features.on_transaction_saved, sender=Transaction, dispatch_uid='features_transaction')
+
+        # Référentiel en cache : toute modification incrémente le tampon de version
+        from django.db.models.signals import post_delete
+        from . import catalogue
+        from .models import Formule, ProduitPret, TypeEmploi, TypeLogement
+        for model in (Formule, ProduitPret, TypeEmploi, TypeLogement):
+            post_save.connect(catalogue.bump_version, sender=model, dispatch_uid=f'catalogue_save_{model.__name__}')
+            post_delete.connect(catalogue.bump_version, sender=model, dispatch_uid=f'catalogue_delete_{model.__name__}')
+
+        # Découvert effectif dénormalisé sur ProfilClient
+        from . import utils
+        from .models import ProfilClient
+        post_save.connect(utils.on_profil_created, sender=ProfilClient, dispatch_uid='profil_decouvert')
+        post_save.connect(utils.on_formule_saved, sender=Formule, dispatch_uid='formule_decouvert')
+
+        # État des cartes en cache pour l'autorisation : écriture à travers
+        from . import cards
+        from .models import Carte
+        post_save.connect(cards.on_carte_saved, sender=Carte, dispatch_uid='cards_save')
+        post_delete.connect(cards.on_carte_deleted, sender=Carte, dispatch_uid='cards_delete')
@@ -0,0 +1,167 @@
+"""
+Backtest hors ligne des versions du modèle de scoring.
+
+Les demandes historiques sont lues par lots (pagination par clé, ``values_list``
+sans instancier les modèles) ; les variables sont calculées une fois par lot puis
+scorées par chaque version comparée. Les métriques (AUC, taux d'acceptation,
+matrice de confusion face aux décisions admin, dérive par segment) sont
+calculées à la fin sur les tableaux complets.
+"""
+import csv
+
+from . import ml
+from .credit_engine import (COLUMN_FIELDS, SEUIL_ACCEPTATION,
+                            columns_from_rows, score_arrays)
+from .features import revenus_verifies_map
+from .models import DemandeCredit
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TRANCHES_REVENUS = ((0, 2000), (2000, 4000), (4000, 6000), (6000, None))
+SEGMENTS = ('produit', 'emploi', 'revenus')
+
+
+def _tranche(revenus):
+    for low, high in TRANCHES_REVENUS:
+        if high is None or (revenus or 0) < high:
+            return f"{low}+" if high is None else f"{low}-{high}"
+
+
+def auc(scores, labels):
+    """AUC (statistique de Mann-Whitney, rangs moyens en cas d'égalité). ``None`` si une classe est vide."""
+    scores = np.asarray(scores, dtype=float)
+    labels = np.asarray(labels, dtype=bool)
+    n_pos = int(labels.sum())
+    n_neg = len(labels) - n_pos
+    if not n_pos or not n_neg:
+        return None
+    _, inverse, counts = np.unique(scores, return_inverse=True, return_counts=True)
+    rangs = (np.cumsum(counts) - (counts - 1) / 2.0)[inverse]
+    return float((rangs[labels].sum() - n_pos * (n_pos + 1) / 2.0) / (n_pos * n_neg))
+
+
+def confusion(predictions, labels):
+    """Matrice de confusion (avis automatique « acceptée » vs décision admin)."""
+    predictions = np.asarray(predictions, dtype=bool)
+    labels = np.asarray(labels, dtype=bool)
+    vp = int((predictions & labels).sum())
+    fp = int((predictions & ~labels).sum())
+    fn = int((~predictions & labels).sum())
+    vn = int((~predictions & ~labels).sum())
+    total = vp + fp + fn + vn
+    return {
+        'vrais_positifs': vp, 'faux_positifs': fp, 'faux_negatifs': fn, 'vrais_negatifs': vn,
+        'precision': round(vp / (vp + fp), 4) if vp + fp else None,
+        'rappel': round(vp / (vp + fn), 4) if vp + fn else None,
+        'exactitude': round((vp + vn) / total, 4) if total else None,
+    }
+
+
+def load_columns(queryset=None, chunk_size=20000):
+    """
+    Lit les demandes par lots et retourne ``(features, bonus, statuts, segments)``
+    concaténés. Les revenus déclarés sont plafonnés par le salaire constaté, comme
+    en production.
+    """
+    qs = (queryset if queryset is not None else DemandeCredit.objects.all()).order_by('id')
+    fields = ('id', 'statut', 'produit__nom', 'user_id') + COLUMN_FIELDS
+    debut = len(fields) - len(COLUMN_FIELDS)
+    emploi, revenus = fields.index('emploi_snapshot__nom'), fields.index('revenus_mensuels')
+    features, bonus, statuts = [], [], []
+    segments = {name: [] for name in SEGMENTS}
+    last_id = 0
+    while True:
+        rows = list(qs.filter(id__gt=last_id).values_list(*fields)[:chunk_size])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        verifies = revenus_verifies_map(row[3] for row in rows)
+        f, b = columns_from_rows([row[debut:] for row in rows], [verifies.get(row[3]) for row in rows])
+        features.append(f)
+        bonus.append(b)
+        for row in rows:
+            statuts.append(row[1])
+            segments['produit'].append(row[2] or "Sans produit")
+            segments['emploi'].append(row[emploi] or "Non renseigné")
+            segments['revenus'].append(_tranche(row[revenus]))
+    if not features:
+        f, b = columns_from_rows([])
+        return f, b, np.array([], dtype=object), {name: np.array([], dtype=object) for name in SEGMENTS}
+    merged = {key: np.concatenate([f[key] for f in features]) for key in features[0]}
+    return (
+        merged,
+        np.concatenate(bonus),
+        np.array(statuts, dtype=object),
+        {name: np.array(values, dtype=object) for name, values in segments.items()},
+    )
+
+
+def run_backtest(versions, queryset=None, chunk_size=20000):
+    """
+    Rejoue les demandes à travers chaque version du registre (``0`` = poids en
+    mémoire). La première version sert de référence pour la dérive par segment.
+    """
+    models = []
+    for version in versions:
+        if version == 0:
+            weights = ml.get_weights()
+        else:
+            weights, _ = ml.load_model(version)
+            if weights is None:
+                raise ValueError(f"Version {version} absente du registre.")
+        models.append((version, weights))
+
+    features, bonus, statuts, segments = load_columns(queryset, chunk_size)
+    decided = (statuts == 'ACCEPTEE') | (statuts == 'REFUSEE')
+    labels = statuts[decided] == 'ACCEPTEE'
+
+    report = {'demandes': int(len(statuts)), 'decisions_admin': int(decided.sum()), 'versions': [], 'segments': []}
+    scores_by_version = {}
+    for version, weights in models:
+        _, final = score_arrays(features, bonus, weights) if len(statuts) else (None, np.zeros(0, dtype=int))
+        accepted = final >= SEUIL_ACCEPTATION
+        scores_by_version[version] = (final, accepted)
+        report['versions'].append({
+            'version': version,
+            'taux_acceptation': round(float(accepted.mean()), 4) if len(final) else None,
+            'score_moyen': round(float(final.mean()), 2) if len(final) else None,
+            'auc': auc(final[decided], labels),
+            'confusion': confusion(accepted[decided], labels),
+        })
+
+    reference = versions[0] if versions else None
+    for name in SEGMENTS:
+        values = segments[name]
+        for segment in sorted(set(values.tolist())):
+            mask = values == segment
+            base_rate = float(scores_by_version[reference][1][mask].mean())
+            for version, _ in models:
+                final, accepted = scores_by_version[version]
+                rate = float(accepted[mask].mean())
+                report['segments'].append({
+                    'segment': name,
+                    'valeur': segment,
+                    'version': version,
+                    'demandes': int(mask.sum()),
+                    'taux_acceptation': round(rate, 4),
+                    'score_moyen': round(float(final[mask].mean()), 2),
+                    'derive_vs_reference': round(rate - base_rate, 4),
+                })
+    return report
+
+
+def write_csv(report, path):
+    fields = ['segment', 'valeur', 'version', 'demandes', 'taux_acceptation', 'score_moyen', 'derive_vs_reference']
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.DictWriter(handle, fieldnames=fields)
+        writer.writeheader()
+        for row in report['versions']:
+            writer.writerow({
+                'segment': 'global', 'valeur': 'tous', 'version': row['version'],
+                'demandes': report['demandes'], 'taux_acceptation': row['taux_acceptation'],
+                'score_moyen': row['score_moyen'], 'derive_vs_reference': '',
+            })
+        writer.writerows(report['segments'])
@@ -0,0 +1,117 @@
+"""
+Microbenchmarks des fonctions pures des chemins chauds (IBAN, scoring crédit,
+calculs de prêt, dates, filtres de templates).
+
+Chaque cas est chronométré par ``timeit`` : le nombre d'appels par mesure est
+calibré pour durer au moins ``min_time``, puis ``repeat`` tours mesurent tous
+les cas à la suite. On retient le minimum (bruit le plus faible) et la médiane.
+``baseline.json`` garde une exécution de référence ; ``compare`` signale les
+cas dont le minimum dépasse la référence de plus de ``seuil``. Les durées
+dépendent de la machine : ne comparer que des exécutions faites au même endroit.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import timeit
+from pathlib import Path
+
+from django.utils import timezone
+
+BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+SEUIL_DEFAUT = 0.20
+REPEAT_DEFAUT = 9
+MIN_TIME_DEFAUT = 0.1
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASELINE.parent, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _meta():
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {
+        'date': timezone.now().isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'numpy': numpy_version,
+        'machine': f"{platform.system()} {platform.machine()} {platform.processor()}".strip(),
+    }
+
+
+def _calibrer(timer, min_time):
+    nombre = 1
+    while timer.timeit(nombre) < min_time and nombre < 10 ** 7:
+        nombre *= 2
+    return nombre
+
+
+def run(noms=None, repeat=REPEAT_DEFAUT, min_time=MIN_TIME_DEFAUT, log=None):
+    """Joue la suite (ou les cas ``noms``) et retourne ``{'meta': …, 'cas': {nom: mesure}}``."""
+    from .cases import CAS
+
+    inconnus = set(noms or ()) - set(CAS)
+    if inconnus:
+        raise ValueError(f"Cas inconnu(s) : {', '.join(sorted(inconnus))}.")
+    log = log or (lambda message: None)
+    timers = {}
+    for nom, (description, preparer) in CAS.items():
+        if not noms or nom in noms:
+            timer = timeit.Timer(preparer())
+            timers[nom] = (timer, _calibrer(timer, min_time))
+    # Mesures entrelacées : une perturbation passagère de la machine touche tous les cas, pas un seul
+    durees = {nom: [] for nom in timers}
+    for _ in range(max(1, repeat)):
+        for nom, (timer, nombre) in timers.items():
+            durees[nom].append(timer.timeit(nombre) / nombre * 1e6)
+    resultats = {}
+    for nom, (_, nombre) in timers.items():
+        resultats[nom] = {
+            'min_us': round(min(durees[nom]), 4),
+            'mediane_us': round(statistics.median(durees[nom]), 4),
+            'appels': nombre,
+            'description': CAS[nom][0],
+        }
+        log(f"{nom:<28} {resultats[nom]['min_us']:>12.3f} µs")
+    return {'meta': _meta(), 'cas': resultats}
+
+
+def charger(path=BASELINE):
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def enregistrer(resultats, path=BASELINE):
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(resultats, handle, ensure_ascii=False, indent=2)
+        handle.write('\n')
+
+
+def compare(actuel, reference, seuil=SEUIL_DEFAUT):
+    """
+    Une ligne par cas : ``statut`` vaut ``REGRESSION`` / ``AMELIORATION`` au-delà
+    de ``seuil`` (écart relatif des minimums), ``STABLE`` sinon, ``NOUVEAU`` ou
+    ``ABSENT`` si le cas manque d'un côté.
+    """
+    lignes = []
+    avant, apres = reference.get('cas', {}), actuel.get('cas', {})
+    for nom in list(avant) + [n for n in apres if n not in avant]:
+        ref, cur = avant.get(nom), apres.get(nom)
+        if ref is None or cur is None:
+            lignes.append({'cas': nom, 'reference_us': ref and ref['min_us'], 'actuel_us': cur and cur['min_us'],
+                           'ecart': None, 'statut': 'NOUVEAU' if ref is None else 'ABSENT'})
+            continue
+        ecart = cur['min_us'] / ref['min_us'] - 1 if ref['min_us'] else 0.0
+        statut = 'REGRESSION' if ecart > seuil else 'AMELIORATION' if ecart < -seuil else 'STABLE'
+        lignes.append({'cas': nom, 'reference_us': ref['min_us'], 'actuel_us': cur['min_us'],
+                       'ecart': round(ecart, 4), 'statut': statut})
+    return lignes
@@ -0,0 +1,96 @@
+"""
+Cas de la suite : ``nom -> (description, préparer)``. ``préparer()`` construit
+les entrées hors chronométrage et retourne la fonction sans argument mesurée.
+Les entrées sont fixes et n'accèdent pas à la base.
+"""
+from datetime import date
+from decimal import Decimal
+
+from scoring import ml
+from scoring.credit_engine import score_application
+from scoring.finance import (affordability_grid, principal_for_payment,
+                             suggested_duration, to_cents)
+from scoring.models import DemandeCredit, ProduitPret, TypeEmploi, TypeLogement
+from scoring.templatetags import dict_utils, math_filters
+from scoring.views import months_diff, normalize_iban
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Poids fixes : les cas ne dépendent pas du modèle présent dans le registre
+POIDS = (0.8, 0.35, -1.2, -0.6, 0.45)
+
+
+def _poids():
+    if np is None:
+        raise RuntimeError("numpy est requis pour les cas de scoring.")
+    return np.array(POIDS)
+
+
+def _demande():
+    return DemandeCredit(
+        produit=ProduitPret(nom="Prêt immobilier", taux_ref=Decimal("3.45")),
+        montant_souhaite=220000, duree_souhaitee_annees=20, apport_personnel=30000,
+        revenus_mensuels=4800, loyer_actuel=0, dettes_mensuelles=250, enfants_a_charge=1,
+        emploi_snapshot=TypeEmploi(nom="CDI"), logement_snapshot=TypeLogement(nom="Locataire"), sante_snapshot='BON',
+    )
+
+
+def _normalize_iban():
+    saisie = " fr76 1977-6000 0100 0001 2345 678 "
+    return lambda: normalize_iban(saisie)
+
+
+def _ml_score():
+    poids = _poids()
+    return lambda: ml.ml_score(revenus=4.8, dti=32.5, ltv=86.4, apport_ratio=0.136, weights=poids)
+
+
+def _simulation():
+    demande, poids = _demande(), _poids()
+    return lambda: score_application(demande, weights=poids, version=0, revenus_verifies=Decimal("4650"))
+
+
+def _resultat_grille():
+    demande = _demande()
+    charges = demande.dettes_mensuelles + demande.loyer_actuel
+    cible = Decimal(demande.revenus_mensuels) * Decimal("0.35") - charges
+
+    def resultat():
+        grille = affordability_grid(demande.revenus_mensuels, charges, demande.montant_souhaite, Decimal("3.45"))
+        return suggested_duration(grille, cible)
+    return resultat
+
+
+def _resultat_ajustement():
+    mensualite, taux = Decimal("1275.50"), Decimal("3.69")
+    return lambda: to_cents(principal_for_payment(mensualite, taux, 25 * 12))
+
+
+def _months_diff():
+    debut, fin = date(2023, 11, 5), date(2026, 3, 17)
+    return lambda: months_diff(fin, debut)
+
+
+def _filtres():
+    plafonds = {'paiement': 2000, 'retrait': 500}
+
+    def filtres():
+        math_filters.multiply("12.5", 4)
+        math_filters.subtract(440, "87.3")
+        dict_utils.get_item(plafonds, 'retrait')
+        return dict_utils.ratio("1250.40", 2000)
+    return filtres
+
+
+CAS = {
+    'normalize_iban': ("views.normalize_iban sur un IBAN saisi avec espaces et tirets", _normalize_iban),
+    'ml_score': ("ml.ml_score (régression logistique, un dossier)", _ml_score),
+    'simulation.score': ("credit_engine.score_application, calcul de page_simulation", _simulation),
+    'resultat.grille': ("affordability_grid + suggested_duration, calcul de page_resultat", _resultat_grille),
+    'resultat.ajustement': ("principal_for_payment + to_cents, calcul de api_update_resultat", _resultat_ajustement),
+    'months_diff': ("views.months_diff", _months_diff),
+    'templatetags.filtres': ("filtres multiply, subtract, get_item et ratio", _filtres),
+}
@@ -0,0 +1,119 @@
+"""
+Facturation mensuelle des abonnements.
+
+Les profils arrivés à échéance sont traités par lots : un ``UPDATE`` ensembliste
+par tarif sur les comptes principaux, un ``bulk_create`` des transactions et
+des notifications, puis l'avancement de ``prochaine_facturation`` dans la même
+transaction. Cet avancement sert de marqueur : un profil facturé n'est plus
+à échéance, une relance ne facture donc jamais deux fois la même période.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+
+from . import catalogue, features
+from .models import Compte, Notification, ProfilClient, Transaction
+from .overdraft import enforce_overdraft_bulk
+from .utils import refresh_overdraft_limits
+
+PERIODE_JOURS = 30
+
+
+def _prochaine_echeance(periode, today):
+    suivante = periode + timedelta(days=PERIODE_JOURS)
+    # Périodes manquées (commande non lancée) : on repart d'aujourd'hui sans rattrapage
+    return suivante if suivante > today else today + timedelta(days=PERIODE_JOURS)
+
+
+def _comptes_principaux(user_ids):
+    principaux = {}
+    for compte in Compte.objects.filter(user_id__in=user_ids, est_actif=True).order_by('id'):
+        principaux.setdefault(compte.user_id, compte)
+    return principaux
+
+
+def bill_chunk(profils, plans, today, dry_run=False):
+    """
+    Facture un lot de profils à échéance. Retourne ``(stats, ids des comptes
+    débités, transactions créées)``.
+    """
+    stats = defaultdict(int)
+    principaux = _comptes_principaux([p.user_id for p in profils])
+    debits = defaultdict(list)           # prix -> ids de comptes
+    operations, notifications, changements = [], [], []
+    for profil in profils:
+        plan = profil.prochain_abonnement or profil.abonnement
+        if plan not in plans:
+            plan = 'ESSENTIEL'
+        prix = plans[plan]['prix']
+        compte = principaux.get(profil.user_id)
+        if prix > 0 and compte is None:
+            # Aucun compte à débiter : retour à la formule gratuite
+            plan, prix = 'ESSENTIEL', plans['ESSENTIEL']['prix']
+            stats['sans_compte'] += 1
+        if plan != profil.abonnement:
+            stats['changements'] += 1
+            changements.append(profil.user_id)
+        periode = profil.prochaine_facturation
+        if prix > 0:
+            debits[prix].append(compte.id)
+            operations.append(Transaction(
+                compte=compte,
+                montant=-prix,
+                libelle=f"Abonnement Banquise {plans[plan]['label']} - période du {periode:%d/%m/%Y}",
+                type='DEBIT',
+                categorie='AUTRE',
+            ))
+            notifications.append(Notification(
+                user_id=profil.user_id,
+                titre="Abonnement renouvelé",
+                contenu=f"Formule {plans[plan]['label']} facturée {prix} € pour la période du {periode:%d/%m/%Y}.",
+                type='TRANSACTION',
+                url=reverse('dashboard'),
+            ))
+            stats['factures'] += 1
+            stats['montant'] += prix
+        profil.abonnement = plan
+        profil.prochain_abonnement = plan
+        profil.prochaine_facturation = _prochaine_echeance(periode, today)
+
+    if dry_run:
+        return stats, [], []
+    with transaction.atomic():
+        for prix, compte_ids in debits.items():
+            Compte.objects.filter(id__in=compte_ids).update(solde=F('solde') - prix)
+        created = Transaction.objects.bulk_create(operations)
+        Notification.objects.bulk_create(notifications)
+        ProfilClient.objects.bulk_update(profils, ['abonnement', 'prochain_abonnement', 'prochaine_facturation'])
+        refresh_overdraft_limits(changements, today)
+    return stats, sorted({cid for ids in debits.values() for cid in ids}), created
+
+
+def bill_subscriptions(today=None, chunk_size=500, dry_run=False):
+    """
+    Facture tous les profils dont ``prochaine_facturation`` est échue, puis
+    contrôle le découvert des comptes débités (une passe ensembliste par lot).
+    """
+    today = today or timezone.now().date()
+    plans = catalogue.plans()
+    totals = defaultdict(int)
+    last_id = 0
+    due = ProfilClient.objects.filter(prochaine_facturation__lte=today).order_by('id')
+    while True:
+        with transaction.atomic():
+            profils = list(due.select_for_update().filter(id__gt=last_id)[:chunk_size])
+            if not profils:
+                break
+            last_id = profils[-1].id
+            stats, compte_ids, operations = bill_chunk(profils, plans, today, dry_run=dry_run)
+        # bulk_create ne déclenche pas post_save : indicateurs du lot mis à jour en une passe, verrous relâchés
+        features.record_transactions(operations, today)
+        totals['profils'] += len(profils)
+        for key, value in stats.items():
+            totals[key] += value
+        enforce_overdraft_bulk(compte_ids)
+    return dict(totals)
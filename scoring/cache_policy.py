@@ -0,0 +1,80 @@
+"""
+Politique de cache HTTP par vue.
+
+Par défaut, ``NoCacheForAuthMiddleware`` pose ``no-store`` sur toutes les
+réponses. Les pages vitrine décorées par ``public_page`` y échappent pour les
+visiteurs anonymes sans session : la page rendue est gardée dans le cache Django
+``max_age`` secondes, servie avec ``ETag`` (réponse 304 sur ``If-None-Match``)
+et ``Cache-Control: public``. Les utilisateurs connectés, les visiteurs porteurs
+d'une session ou de messages, et toute réponse qui pose un cookie ou un jeton
+CSRF restent en ``no-store``.
+
+La politique se déclare sur la vue (``@public_page(max_age=600)``) ou dans les
+URLs (``path('faq/', public_page()(views.page_faq))``).
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+
+PUBLIC = 'public'
+MAX_AGE_DEFAUT = 300
+PREFIXE = 'page-publique:'
+
+
+def _anonyme_sans_etat(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    cookies = request.COOKIES
+    if settings.SESSION_COOKIE_NAME in cookies or 'messages' in cookies:
+        return False
+    user = getattr(request, 'user', None)
+    return not (user and user.is_authenticated)
+
+
+def _cle(request):
+    return PREFIXE + hashlib.md5(request.get_full_path().encode()).hexdigest()
+
+
+def _publiable(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_USED')
+    )
+
+
+def public_page(max_age=None):
+    """Décorateur : page publique, mise en cache pour les visiteurs anonymes."""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not _anonyme_sans_etat(request):
+                return view(request, *args, **kwargs)
+            ttl = max_age if max_age is not None else getattr(settings, 'PUBLIC_PAGE_MAX_AGE', MAX_AGE_DEFAUT)
+            key = _cle(request)
+            entry = cache.get(key)
+            if entry is None:
+                response = view(request, *args, **kwargs)
+                if not _publiable(request, response):
+                    return response
+                etag = quote_etag(hashlib.md5(response.content).hexdigest())
+                entry = (response.content, response['Content-Type'], etag)
+                cache.set(key, entry, ttl)
+            content, content_type, etag = entry
+            response = HttpResponse(content, content_type=content_type)
+            response['ETag'] = etag
+            response = get_conditional_response(request, etag=etag, response=response)
+            response['Cache-Control'] = f'public, max-age={ttl}'
+            patch_vary_headers(response, ('Cookie',))
+            response.cache_policy = PUBLIC
+            return response
+        wrapped.cache_policy = PUBLIC
+        return wrapped
+    return decorator
+
@@ -0,0 +1,176 @@
+"""
+Autorisation des paiements carte.
+
+L'état des cartes (options, plafonds, compte, découvert autorisé) est servi
+depuis un cache en mémoire du process. Le cache est écrit à travers : chaque
+``Carte.save()`` recharge immédiatement l'entrée, les mises à jour en masse
+(blocage découvert, blocage admin) l'invalident. Une entrée est de toute façon
+relue après ``CARTE_CACHE_SECONDS`` pour suivre les écritures des autres process.
+
+La décision (``decide``) est une fonction pure sur cet état. Passent ensuite
+par la base, dans une même transaction : les plafonds glissants (une ligne de
+compteur, voir ``scoring.spend``) puis le solde et le blocage de la carte, dans
+l'``UPDATE`` conditionnel du moteur de solde : le cache ne sert qu'à ``decide``.
+"""
+import threading
+import time
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import catalogue, ledger, overdraft, spend
+from .models import Carte, Transaction
+
+DEFAULT_CACHE_SECONDS = 5
+PLAFOND_SANS_CONTACT = Decimal("50")
+MONTANT_MAX = Decimal("99999.99")
+CATEGORIES = {code for code, _ in Transaction.CATEGORIE_CHOICES}
+
+CardState = namedtuple('CardState', (
+    'id', 'compte_id', 'user_id', 'numero', 'expiration', 'bloquee', 'sans_contact',
+    'etranger', 'plafond_paiement', 'plafond_retrait', 'compte_actif', 'decouvert', 'charge_le',
+))
+
+_lock = threading.Lock()
+_cache = {}
+
+
+def _ttl():
+    return getattr(settings, 'CARTE_CACHE_SECONDS', DEFAULT_CACHE_SECONDS)
+
+
+def _load(ids):
+    rows = Carte.objects.filter(pk__in=ids).values_list(
+        'id', 'compte_id', 'compte__user_id', 'numero_visible', 'date_expiration', 'est_bloquee',
+        'sans_contact_actif', 'paiement_etranger_actif', 'plafond_paiement', 'plafond_retrait',
+        'compte__est_actif', 'compte__user__profil__decouvert_autorise',
+    )
+    now = time.monotonic()
+    states = {}
+    for row in rows:
+        decouvert = row[11] if row[11] is not None else catalogue.decouvert_autorise('ESSENTIEL')
+        states[row[0]] = CardState(*row[:11], decouvert, now)
+    with _lock:
+        for pk in ids:
+            if pk in states:
+                _cache[pk] = states[pk]
+            else:
+                _cache.pop(pk, None)
+    return states
+
+
+def card_state(carte_id):
+    """État de la carte (cache, rechargé si absent ou expiré) ; ``None`` si elle n'existe pas."""
+    state = _cache.get(carte_id)
+    if state is not None and time.monotonic() - state.charge_le < _ttl():
+        return state
+    return _load([carte_id]).get(carte_id)
+
+
+def invalidate(carte_ids=None):
+    """Oublie les cartes données (toutes si ``None``)."""
+    with _lock:
+        if carte_ids is None:
+            _cache.clear()
+        else:
+            for pk in carte_ids:
+                _cache.pop(int(pk), None)
+
+
+def invalidate_users(user_ids):
+    """Oublie les cartes des clients dont le découvert autorisé a changé."""
+    user_ids = set(user_ids)
+    if not user_ids or not _cache:
+        return
+    with _lock:
+        for pk in [pk for pk, s in _cache.items() if s.user_id in user_ids]:
+            _cache.pop(pk, None)
+
+
+def on_carte_saved(sender, instance, **kwargs):
+    # Écriture à travers : l'entrée reflète immédiatement la ligne enregistrée
+    _load([instance.pk])
+
+
+def on_carte_deleted(sender, instance, **kwargs):
+    invalidate([instance.pk])
+
+
+def decide(state, montant, sans_contact=False, etranger=False, retrait=False, today=None):
+    """Motif de refus lié à la carte, ou ``None`` si la carte autorise l'opération."""
+    if state is None:
+        return 'CARTE_INCONNUE'
+    if state.bloquee or not state.compte_actif:
+        return 'CARTE_BLOQUEE'
+    if state.expiration < (today or timezone.localdate()):
+        return 'CARTE_EXPIREE'
+    if sans_contact:
+        if not state.sans_contact:
+            return 'SANS_CONTACT_DESACTIVE'
+        if montant > PLAFOND_SANS_CONTACT:
+            return 'PLAFOND_SANS_CONTACT'
+    if etranger and not state.etranger:
+        return 'ETRANGER_DESACTIVE'
+    if montant > (state.plafond_retrait if retrait else state.plafond_paiement):
+        return 'PLAFOND_DEPASSE'
+    return None
+
+
+def parse_montant(value):
+    try:
+        montant = Decimal(str(value)).quantize(Decimal("0.01"))
+    except (InvalidOperation, ValueError, TypeError):
+        raise ValueError("Montant invalide.")
+    if montant <= 0 or montant > MONTANT_MAX:
+        raise ValueError("Montant invalide.")
+    return montant
+
+
+def authorize(carte_id, montant, commercant='', categorie='AUTRE', sans_contact=False, etranger=False, retrait=False):
+    """
+    Décide puis, si la carte l'autorise, débite le compte via le moteur de solde.
+    Retourne ``{'decision', 'motif', 'transaction_id', 'duree_decision_us'}``.
+    """
+    debut = time.perf_counter()
+    state = card_state(carte_id)
+    motif = decide(state, montant, sans_contact=sans_contact, etranger=etranger, retrait=retrait)
+    duree_us = round((time.perf_counter() - debut) * 1e6, 1)
+    result = {'decision': 'REFUSEE', 'motif': motif, 'transaction_id': None, 'duree_decision_us': duree_us}
+    if motif is not None:
+        return result
+
+    libelle = f"{'Retrait' if retrait else 'Paiement'} carte **** {state.numero}"
+    if commercant:
+        libelle = f"{libelle} - {commercant}"
+    if retrait:
+        operation, plafond, categorie = 'RETRAIT', state.plafond_retrait, 'RETRAIT'
+    else:
+        operation, plafond = 'PAIEMENT', state.plafond_paiement
+        categorie = categorie if categorie in CATEGORIES and categorie != 'RETRAIT' else 'AUTRE'
+    with transaction.atomic():
+        motif = spend.reserve(state.id, operation, montant, plafond)
+        tx = None
+        if motif is None:
+            tx = ledger.post_debit(
+                state.compte_id, montant, libelle, categorie=categorie,
+                decouvert=state.decouvert, carte_id=state.id,
+            )
+            if tx is None:
+                # Carte bloquée depuis un autre process : le cache local est périmé
+                if Carte.objects.filter(pk=state.id, est_bloquee=True).exists():
+                    motif = 'CARTE_BLOQUEE'
+                    invalidate([state.id])
+                else:
+                    motif = 'SOLDE_INSUFFISANT'
+                transaction.set_rollback(True)   # compteurs non imputés
+    if motif is not None:
+        result['motif'] = motif
+        return result
+    if ledger.solde(state.compte_id) <= -state.decouvert * overdraft.SEUIL_ALERTE:
+        # Proche de la limite : alerte préventive (le dépassement est impossible ici)
+        overdraft.enforce_overdraft_bulk([state.compte_id])
+    result.update(decision='APPROUVEE', transaction_id=tx.pk)
+    return result
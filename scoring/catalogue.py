@@ -0,0 +1,99 @@
+"""
+Référentiel en cache dans le process : formules d'abonnement (prix, découvert
+autorisé), produits de prêt, types d'emploi et de logement.
+
+Le contenu est chargé une fois puis servi depuis la mémoire. La ligne
+``VersionReferentiel`` est relue au plus toutes les ``REFERENTIEL_CHECK_SECONDS``
+secondes : si un autre process a modifié le référentiel, le cache est rechargé.
+Dans le process qui écrit, les signaux invalident immédiatement.
+"""
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import F
+
+from .models import (Formule, ProduitPret, TypeEmploi, TypeLogement,
+                     VersionReferentiel)
+
+DEFAULT_CHECK_SECONDS = 30
+DECOUVERT_PAR_DEFAUT = Decimal("100.00")
+
+_lock = threading.Lock()
+_state = {'version': None, 'checked_at': 0.0, 'data': None}
+
+
+def _check_seconds():
+    return getattr(settings, 'REFERENTIEL_CHECK_SECONDS', DEFAULT_CHECK_SECONDS)
+
+
+def _current_version():
+    return VersionReferentiel.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+
+def _load():
+    return {
+        'plans': {
+            f.code: {'label': f.label, 'prix': f.prix, 'decouvert': f.decouvert_autorise}
+            for f in Formule.objects.all()
+        },
+        'produits': list(ProduitPret.objects.order_by('id')),
+        'emplois': list(TypeEmploi.objects.order_by('id')),
+        'logements': list(TypeLogement.objects.order_by('id')),
+    }
+
+
+def _data():
+    now = time.monotonic()
+    if _state['data'] is not None and now - _state['checked_at'] < _check_seconds():
+        return _state['data']
+    with _lock:
+        if _state['data'] is not None and now - _state['checked_at'] < _check_seconds():
+            return _state['data']
+        version = _current_version()
+        if _state['data'] is None or version != _state['version']:
+            _state['data'] = _load()
+            _state['version'] = version
+        _state['checked_at'] = now
+        return _state['data']
+
+
+def invalidate():
+    """Vide le cache local (rechargé au prochain accès)."""
+    with _lock:
+        _state['data'] = None
+
+
+def bump_version(**kwargs):
+    """Signal post_save/post_delete : incrémente le tampon de version et invalide le cache local."""
+    updated = VersionReferentiel.objects.filter(pk=1).update(version=F('version') + 1)
+    if not updated:
+        VersionReferentiel.objects.get_or_create(pk=1)
+    invalidate()
+
+
+def plans():
+    """``code -> {'label', 'prix', 'decouvert'}``, dans l'ordre d'affichage."""
+    return _data()['plans']
+
+
+def plan(code):
+    return plans().get(code)
+
+
+def decouvert_autorise(code):
+    formule = plan(code)
+    return formule['decouvert'] if formule else DECOUVERT_PAR_DEFAUT
+
+
+def produits():
+    return _data()['produits']
+
+
+def emplois():
+    return _data()['emplois']
+
+
+def logements():
+    return _data()['logements']
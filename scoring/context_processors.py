@@ -1,3 +1,5 @@
+from django.conf import settings
+
 from .models import Notification
 
 
@@ -6,3 +8,8 @@ def unread_notifications(request):
     if request.user.is_authenticated:
         return {'unread_notifs': Notification.objects.filter(user=request.user, est_lu=False).count()}
     return {'unread_notifs': 0}
+
+
+def assets(request):
+    """Indique aux templates si le CSS Tailwind précompilé est disponible."""
+    return {'tailwind_cdn': settings.TAILWIND_CDN}
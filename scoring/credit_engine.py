@@ -0,0 +1,255 @@
+"""
+Moteur de scoring des demandes de crédit.
+
+``score_application`` reprend le calcul historique de ``page_simulation``
+(Decimal, une demande) ; ``score_applications`` applique les mêmes règles en
+un seul passage numpy sur un lot de demandes (re-scoring) ; ``score_arrays``
+travaille directement sur des colonnes, sans instancier les modèles (backtests).
+"""
+from decimal import Decimal
+
+from . import ml
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_RATE = Decimal("3.50")
+SEUIL_ACCEPTATION = 55
+# Revenus déclarés plafonnés à 120 % du salaire constaté sur les comptes (features.revenus_verifies)
+TOLERANCE_REVENUS = Decimal("1.20")
+
+# Champs mis à jour par le moteur (utilisables tels quels dans un bulk_update)
+SCORE_FIELDS = [
+    'score_calcule', 'taux_calcule', 'mensualite_calculee',
+    'ia_decision', 'recommendation', 'modele_version',
+]
+
+
+def _is_cdi(demande):
+    return bool(demande.emploi_snapshot and demande.emploi_snapshot.nom.lower().startswith('cdi'))
+
+
+def _is_proprietaire(demande):
+    return bool(demande.logement_snapshot and 'propri' in demande.logement_snapshot.nom.lower())
+
+
+def _revenus_retenus(declares, verifies):
+    if verifies:
+        return min(Decimal(declares or 0), Decimal(verifies) * TOLERANCE_REVENUS)
+    return Decimal(declares or 0)
+
+
+def _limits(revenus_mensuels, montant, apport):
+    dti_limit = 42 if revenus_mensuels < 6000 else 47
+    ltv_limit = 95
+    if montant and montant >= 250000 and apport >= montant * Decimal("0.10"):
+        ltv_limit = 97
+    return dti_limit, ltv_limit
+
+
+def _recommendation(ia_decision, final_score, dti, ltv, dti_limit, ltv_limit):
+    return (
+        f"Avis automatique {ia_decision.lower()} "
+        f"(score final {final_score}, dti {dti:.1f}% / seuil {dti_limit}%, ltv {ltv:.1f}% / seuil {ltv_limit}%)"
+    )
+
+
+def score_application(demande, weights=None, version=None, revenus_verifies=None):
+    """
+    Calcule score, taux, mensualité et avis automatique d'une demande (sans la
+    sauvegarder). ``revenus_verifies`` plafonne les revenus déclarés.
+    """
+    base_rate = demande.produit.taux_ref if demande.produit else DEFAULT_RATE
+    nb_mois = max(1, (demande.duree_souhaitee_annees or 0) * 12)
+    taux_mensuel = (Decimal(base_rate) / Decimal("100")) / Decimal("12")
+
+    if taux_mensuel > 0:
+        mensualite = Decimal(demande.montant_souhaite) * taux_mensuel / (1 - (1 + taux_mensuel) ** (-nb_mois))
+    else:
+        mensualite = Decimal(demande.montant_souhaite) / nb_mois
+
+    dettes_totales = Decimal(demande.dettes_mensuelles or 0) + Decimal(demande.loyer_actuel or 0)
+    revenus = _revenus_retenus(demande.revenus_mensuels, revenus_verifies) or Decimal(1)
+    dti = ((mensualite + dettes_totales) / revenus) * Decimal("100")
+    ltv = Decimal("100") * (Decimal("1") - (Decimal(demande.apport_personnel or 0) / Decimal(max(1, demande.montant_souhaite or 1))))
+
+    score = Decimal("100")
+    # Heuristique plus souple
+    if dti > Decimal("30"):
+        score -= (dti - Decimal("30")) * Decimal("1.0")
+    if ltv > Decimal("85"):
+        score -= (ltv - Decimal("85")) * Decimal("0.25")
+    if revenus < Decimal("2000"):
+        score -= Decimal("8")
+    if Decimal(demande.apport_personnel or 0) >= Decimal(demande.montant_souhaite or 0) * Decimal("0.2"):
+        score += Decimal("10")
+    if demande.sante_snapshot == 'BON':
+        score += Decimal("2")
+    if _is_cdi(demande):
+        score += Decimal("10")
+    if _is_proprietaire(demande):
+        score += Decimal("10")
+
+    score = int(max(0, min(100, score)))
+
+    # ---- Score ML (régression logistique du registre scoring.ml) ----
+    if weights is None:
+        weights, version = ml.get_weights(), ml.current_version()
+    ml_score = ml.ml_score(
+        revenus=float(revenus) / 1000.0,
+        dti=float(dti),
+        ltv=float(ltv),
+        apport_ratio=float(demande.apport_personnel or 0) / float(max(1, demande.montant_souhaite or 1)),
+        weights=weights,
+    )
+    final_score = int((score + (ml_score if ml_score is not None else score)) / 2)
+
+    dti_limit, ltv_limit = _limits(demande.revenus_mensuels, demande.montant_souhaite, demande.apport_personnel)
+    ia_decision = 'ACCEPTEE' if final_score >= SEUIL_ACCEPTATION else 'REFUSEE'
+
+    surcharge_risque = Decimal(max(0, (70 - score)) * 0.02).quantize(Decimal("0.01"))
+    return {
+        'score_calcule': final_score,
+        'taux_calcule': Decimal(base_rate) + surcharge_risque,
+        'mensualite_calculee': Decimal(str(mensualite)).quantize(Decimal("0.01")),
+        'ia_decision': ia_decision,
+        'recommendation': _recommendation(ia_decision, final_score, dti, ltv, dti_limit, ltv_limit),
+        'modele_version': version,
+    }
+
+
+# Colonnes lues par ``values_list`` pour scorer sans instancier les modèles (backtests)
+COLUMN_FIELDS = (
+    'montant_souhaite', 'duree_souhaitee_annees', 'apport_personnel', 'revenus_mensuels',
+    'dettes_mensuelles', 'loyer_actuel', 'produit__taux_ref',
+    'sante_snapshot', 'emploi_snapshot__nom', 'logement_snapshot__nom',
+)
+
+
+def features_from_columns(montant, duree, apport, revenus, dettes, base_rate):
+    """Variables du scoring à partir de colonnes brutes (séquences ou tableaux numpy)."""
+    montant = np.asarray(montant, dtype=float)
+    duree = np.asarray(duree, dtype=float)
+    apport = np.asarray(apport, dtype=float)
+    revenus_raw = np.asarray(revenus, dtype=float)
+    dettes = np.asarray(dettes, dtype=float)
+    base_rate = np.asarray(base_rate, dtype=float)
+
+    n = np.maximum(1, duree * 12)
+    r = base_rate / 100 / 12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mensualite = np.where(r > 0, montant * r / (1 - (1 + r) ** (-n)), montant / n)
+    revenus = np.where(revenus_raw > 0, revenus_raw, 1)
+    apport_ratio = apport / np.maximum(1, np.where(montant > 0, montant, 1))
+    return {
+        'montant': montant,
+        'apport': apport,
+        'revenus': revenus,
+        'base_rate': base_rate,
+        'mensualite': mensualite,
+        'dti': (mensualite + dettes) / revenus * 100,
+        'ltv': 100 * (1 - apport_ratio),
+        'apport_ratio': apport_ratio,
+    }
+
+
+def feature_arrays(demandes, revenus_verifies=None):
+    """
+    Variables du scoring (mensualité, DTI, LTV, ratio d'apport...) sous forme de
+    tableaux numpy. ``revenus_verifies`` : dict ``user_id -> salaire constaté``.
+    """
+    verifies = revenus_verifies or {}
+    return features_from_columns(
+        [d.montant_souhaite or 0 for d in demandes],
+        [d.duree_souhaitee_annees or 0 for d in demandes],
+        [d.apport_personnel or 0 for d in demandes],
+        [float(_revenus_retenus(d.revenus_mensuels, verifies.get(d.user_id))) for d in demandes],
+        [(d.dettes_mensuelles or 0) + (d.loyer_actuel or 0) for d in demandes],
+        [float(d.produit.taux_ref if d.produit else DEFAULT_RATE) for d in demandes],
+    )
+
+
+def columns_from_rows(rows, revenus_verifies=None):
+    """
+    ``(features, bonus)`` pour des tuples lus avec ``values_list(*COLUMN_FIELDS)``.
+    ``revenus_verifies`` : salaire constaté par ligne (ou None), même plafond que
+    ``score_applications``.
+    """
+    if not rows:
+        return features_from_columns([], [], [], [], [], []), np.zeros(0)
+    montant, duree, apport, revenus, dettes, loyer, taux, sante, emploi, logement = zip(*rows)
+    verifies = revenus_verifies or [None] * len(rows)
+    features = features_from_columns(
+        [v or 0 for v in montant],
+        [v or 0 for v in duree],
+        [v or 0 for v in apport],
+        [float(_revenus_retenus(v, w)) for v, w in zip(revenus, verifies)],
+        [(a or 0) + (b or 0) for a, b in zip(dettes, loyer)],
+        [float(t if t is not None else DEFAULT_RATE) for t in taux],
+    )
+    return features, bonus_array(sante, emploi, logement)
+
+
+def bonus_array(sante, emplois, logements):
+    """Bonus de profil (santé, CDI, propriétaire) à partir des libellés."""
+    return np.array([
+        (2 if s == 'BON' else 0)
+        + (10 if e and e.lower().startswith('cdi') else 0)
+        + (10 if lg and 'propri' in lg.lower() else 0)
+        for s, e, lg in zip(sante, emplois, logements)
+    ], dtype=float)
+
+
+def score_arrays(features, bonus, weights):
+    """Score heuristique et score final (moyenne avec le score ML) pour des variables précalculées."""
+    f = features
+    montant, apport, revenus, dti, ltv = f['montant'], f['apport'], f['revenus'], f['dti'], f['ltv']
+    score = 100 - np.where(dti > 30, dti - 30, 0) - np.where(ltv > 85, (ltv - 85) * 0.25, 0)
+    score -= np.where(revenus < 2000, 8, 0)
+    score += np.where(apport >= montant * 0.2, 10, 0) + bonus
+    score = np.clip(score, 0, 100).astype(int)
+
+    ml_scores = ml.ml_score_batch(revenus / 1000.0, dti, ltv, f['apport_ratio'], weights=weights)
+    final = ((score + (ml_scores if ml_scores is not None else score)) / 2).astype(int)
+    return score, final
+
+
+def score_applications(demandes, weights=None, version=None, revenus_verifies=None):
+    """
+    Version vectorisée de ``score_application`` pour un lot de demandes.
+    Les demandes doivent être chargées avec ``select_related('produit',
+    'emploi_snapshot', 'logement_snapshot')``. Retourne une liste de dicts
+    (mêmes clés que ``score_application``), dans l'ordre du lot.
+    ``revenus_verifies`` : dict ``user_id -> salaire constaté``.
+    """
+    demandes = list(demandes)
+    if not demandes:
+        return []
+    if weights is None:
+        weights, version = ml.get_weights(), ml.current_version()
+
+    f = feature_arrays(demandes, revenus_verifies)
+    bonus = bonus_array(
+        [d.sante_snapshot for d in demandes],
+        [d.emploi_snapshot.nom if d.emploi_snapshot else None for d in demandes],
+        [d.logement_snapshot.nom if d.logement_snapshot else None for d in demandes],
+    )
+    score, final = score_arrays(f, bonus, weights)
+    dti, ltv, mensualite, base_rate = f['dti'], f['ltv'], f['mensualite'], f['base_rate']
+    surcharge = np.round(np.maximum(0, 70 - score) * 0.02, 2)
+
+    results = []
+    for i, d in enumerate(demandes):
+        ia_decision = 'ACCEPTEE' if final[i] >= SEUIL_ACCEPTATION else 'REFUSEE'
+        dti_limit, ltv_limit = _limits(d.revenus_mensuels, d.montant_souhaite, d.apport_personnel)
+        results.append({
+            'score_calcule': int(final[i]),
+            'taux_calcule': (Decimal(str(base_rate[i])) + Decimal(f"{surcharge[i]:.2f}")).quantize(Decimal("0.01")),
+            'mensualite_calculee': Decimal(f"{mensualite[i]:.2f}"),
+            'ia_decision': ia_decision,
+            'recommendation': _recommendation(ia_decision, int(final[i]), dti[i], ltv[i], dti_limit, ltv_limit),
+            'modele_version': version,
+        })
+    return results
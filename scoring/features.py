@@ -0,0 +1,272 @@
+"""
+Indicateurs financiers vérifiés par client, tenus à jour après le commit de
+chaque transaction.
+
+``record_transaction`` applique une opération à l'état du client (flux du mois,
+solde reconstitué, découvert, prélèvements récurrents) en ne touchant que
+quelques lignes ; ``rebuild_user`` rejoue tout l'historique avec la même
+fonction ``_apply``, ce qui garantit des résultats identiques. Le scoring lit
+ensuite ``ProfilFinancier`` en une requête, sans parcourir l'historique.
+"""
+import logging
+import re
+from datetime import date
+from decimal import Decimal
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import (Compte, FluxMensuel, PrelevementRecurrent,
+                     ProfilFinancier, Transaction)
+
+logger = logging.getLogger(__name__)
+
+FENETRE_MOIS = 6          # moyennes calculées sur les 6 derniers mois
+MOIS_RECURRENCE = 3       # un débit vu sur 3 mois distincts est considéré récurrent
+MOIS_SALAIRE_MIN = 3      # salaire observé sur au moins 3 mois pour être utilisé au scoring
+
+
+def _mois(day):
+    return date(day.year, day.month, 1)
+
+
+def _mois_precedent(mois, n=1):
+    index = mois.year * 12 + mois.month - 1 - n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _jour(tx):
+    return timezone.localtime(tx.date_execution).date() if timezone.is_aware(tx.date_execution) else tx.date_execution.date()
+
+
+def cle_prelevement(libelle, categorie):
+    """Clé de regroupement d'un débit : libellé sans chiffres (dates, références) + catégorie."""
+    base = re.sub(r'[\d/.-]+', '', (libelle or '').lower())
+    return f"{categorie}|{' '.join(base.split())}"[:60]
+
+
+def _apply(profil, flux, recurrent, tx):
+    """Applique une transaction à l'état en mémoire (profil, flux du mois, débit récurrent éventuel)."""
+    montant = Decimal(str(tx.montant))
+    jour = _jour(tx)
+
+    flux.nb_operations += 1
+    if montant > 0 and tx.categorie == 'SALAIRE':
+        flux.salaires += montant
+    elif montant < 0:
+        flux.depenses -= montant
+
+    profil.solde_suivi += montant
+    x = float(profil.solde_suivi)
+    profil.solde_n += 1
+    delta = x - profil.solde_moyenne
+    profil.solde_moyenne += delta / profil.solde_n
+    profil.solde_m2 += delta * (x - profil.solde_moyenne)
+
+    if profil.solde_suivi < 0 and profil.decouvert_depuis is None:
+        profil.decouvert_depuis = jour
+    elif profil.solde_suivi >= 0 and profil.decouvert_depuis is not None:
+        profil.jours_decouvert += max(0, (jour - profil.decouvert_depuis).days)
+        profil.decouvert_depuis = None
+
+    if recurrent is not None:
+        if recurrent.nb_mois == 0 or recurrent.dernier_mois != flux.mois:
+            recurrent.nb_mois += 1
+        recurrent.dernier_mois = flux.mois
+        recurrent.montant = -montant
+
+    profil.nb_transactions += 1
+    if profil.premiere_operation is None or jour < profil.premiere_operation:
+        profil.premiere_operation = jour
+    if profil.derniere_operation is None or tx.date_execution > profil.derniere_operation:
+        profil.derniere_operation = tx.date_execution
+
+
+def _refresh(profil, flux_rows, recurrents, today):
+    """Recalcule les moyennes glissantes à partir des flux mensuels (au plus ``FENETRE_MOIS`` lignes)."""
+    courant = _mois(today)
+    debut = _mois_precedent(courant, FENETRE_MOIS - 1)
+    if profil.premiere_operation:
+        debut = max(debut, _mois(profil.premiere_operation))
+    nb_mois = max(1, (courant.year - debut.year) * 12 + courant.month - debut.month + 1)
+    rows = [f for f in flux_rows if debut <= f.mois <= courant]
+    profil.salaire_mensuel_moyen = (sum((f.salaires for f in rows), Decimal("0")) / nb_mois).quantize(Decimal("0.01"))
+    profil.mois_avec_salaire = sum(1 for f in rows if f.salaires > 0)
+    profil.depense_mensuelle_moyenne = (sum((f.depenses for f in rows), Decimal("0")) / nb_mois).quantize(Decimal("0.01"))
+
+    actifs = [r for r in recurrents if r.nb_mois >= MOIS_RECURRENCE and r.dernier_mois >= _mois_precedent(courant)]
+    profil.nb_prelevements_recurrents = len(actifs)
+    profil.prelevements_recurrents = sum((r.montant for r in actifs), Decimal("0"))
+
+
+def record_transaction(tx, today=None):
+    """Met à jour les indicateurs du titulaire après l'écriture d'une transaction."""
+    user_id = tx.compte.user_id
+    today = today or timezone.now().date()
+    with transaction.atomic():
+        profil = ProfilFinancier.objects.select_for_update().filter(user_id=user_id).first()
+        if profil is None:
+            # Premier passage : reconstitution complète (la transaction est déjà en base)
+            return rebuild_user(user_id, today=today)
+        mois = _mois(_jour(tx))
+        flux, _ = FluxMensuel.objects.select_for_update().get_or_create(user_id=user_id, mois=mois)
+        recurrent = None
+        if Decimal(str(tx.montant)) < 0:
+            recurrent, _ = PrelevementRecurrent.objects.select_for_update().get_or_create(
+                user_id=user_id, cle=cle_prelevement(tx.libelle, tx.categorie),
+                defaults={'dernier_mois': mois, 'nb_mois': 0},
+            )
+        _apply(profil, flux, recurrent, tx)
+        flux.save()
+        if recurrent is not None:
+            recurrent.save()
+        courant = _mois(today)
+        _refresh(
+            profil,
+            FluxMensuel.objects.filter(user_id=user_id, mois__gte=_mois_precedent(courant, FENETRE_MOIS - 1)),
+            PrelevementRecurrent.objects.filter(
+                user_id=user_id, nb_mois__gte=MOIS_RECURRENCE, dernier_mois__gte=_mois_precedent(courant)
+            ),
+            today,
+        )
+        profil.save()
+    return profil
+
+
+def record_transactions(transactions, today=None):
+    """
+    Version par lot de ``record_transaction`` (opérations écrites par ``bulk_create``) :
+    un nombre constant de requêtes quel que soit le lot. Les clients sans
+    ``ProfilFinancier`` sont laissés à leur première reconstitution.
+    """
+    today = today or timezone.now().date()
+    courant = _mois(today)
+    par_user = {}
+    for tx in sorted(transactions, key=lambda t: (t.date_execution, t.pk)):
+        par_user.setdefault(tx.compte.user_id, []).append(tx)
+    if not par_user:
+        return 0
+    with transaction.atomic():
+        profils = {p.user_id: p for p in ProfilFinancier.objects.select_for_update().filter(user_id__in=par_user)}
+        if not profils:
+            return 0
+        mois = {_mois(_jour(tx)) for user_id in profils for tx in par_user[user_id]}
+        flux = {
+            (f.user_id, f.mois): f
+            for f in FluxMensuel.objects.select_for_update().filter(user_id__in=profils, mois__in=mois)
+        }
+        cles = {
+            cle_prelevement(tx.libelle, tx.categorie)
+            for user_id in profils for tx in par_user[user_id] if Decimal(str(tx.montant)) < 0
+        }
+        recurrents = {
+            (r.user_id, r.cle): r
+            for r in PrelevementRecurrent.objects.select_for_update().filter(user_id__in=profils, cle__in=cles)
+        }
+        nouveaux_flux, nouveaux_recurrents = [], []
+        for user_id, profil in profils.items():
+            for tx in par_user[user_id]:
+                m = _mois(_jour(tx))
+                bucket = flux.get((user_id, m))
+                if bucket is None:
+                    bucket = flux[(user_id, m)] = FluxMensuel(user_id=user_id, mois=m)
+                    nouveaux_flux.append(bucket)
+                recurrent = None
+                if Decimal(str(tx.montant)) < 0:
+                    cle = cle_prelevement(tx.libelle, tx.categorie)
+                    recurrent = recurrents.get((user_id, cle))
+                    if recurrent is None:
+                        recurrent = recurrents[(user_id, cle)] = PrelevementRecurrent(
+                            user_id=user_id, cle=cle, dernier_mois=m, nb_mois=0,
+                        )
+                        nouveaux_recurrents.append(recurrent)
+                _apply(profil, bucket, recurrent, tx)
+        FluxMensuel.objects.bulk_update(
+            [f for f in flux.values() if f.pk], ['salaires', 'depenses', 'nb_operations'],
+        )
+        FluxMensuel.objects.bulk_create(nouveaux_flux)
+        PrelevementRecurrent.objects.bulk_update(
+            [r for r in recurrents.values() if r.pk], ['montant', 'dernier_mois', 'nb_mois'],
+        )
+        PrelevementRecurrent.objects.bulk_create(nouveaux_recurrents)
+
+        fenetre, actifs = {}, {}
+        for f in FluxMensuel.objects.filter(user_id__in=profils, mois__gte=_mois_precedent(courant, FENETRE_MOIS - 1)):
+            fenetre.setdefault(f.user_id, []).append(f)
+        for r in PrelevementRecurrent.objects.filter(
+            user_id__in=profils, nb_mois__gte=MOIS_RECURRENCE, dernier_mois__gte=_mois_precedent(courant)
+        ):
+            actifs.setdefault(r.user_id, []).append(r)
+        maintenant = timezone.now()
+        for user_id, profil in profils.items():
+            _refresh(profil, fenetre.get(user_id, []), actifs.get(user_id, []), today)
+            profil.mis_a_jour_le = maintenant  # bulk_update ne renseigne pas auto_now
+        ProfilFinancier.objects.bulk_update(
+            list(profils.values()),
+            [f.name for f in ProfilFinancier._meta.concrete_fields if f.name not in ('id', 'user')],
+        )
+    return len(profils)
+
+
+def rebuild_user(user_id, today=None):
+    """Recalcule entièrement les indicateurs d'un client à partir de son historique."""
+    today = today or timezone.now().date()
+    transactions = Transaction.objects.filter(compte__user_id=user_id)
+    solde_actuel = Compte.objects.filter(user_id=user_id).aggregate(s=Sum('solde'))['s'] or Decimal("0")
+    mouvements = transactions.aggregate(s=Sum('montant'))['s'] or Decimal("0")
+
+    profil = ProfilFinancier(user_id=user_id, solde_suivi=Decimal(solde_actuel) - Decimal(mouvements))
+    flux, recurrents = {}, {}
+    rows = transactions.order_by('date_execution', 'id').only(
+        'montant', 'libelle', 'categorie', 'date_execution'
+    ).iterator(chunk_size=2000)
+    for tx in rows:
+        mois = _mois(_jour(tx))
+        bucket = flux.setdefault(mois, FluxMensuel(user_id=user_id, mois=mois))
+        recurrent = None
+        if Decimal(str(tx.montant)) < 0:
+            cle = cle_prelevement(tx.libelle, tx.categorie)
+            recurrent = recurrents.setdefault(cle, PrelevementRecurrent(user_id=user_id, cle=cle, dernier_mois=mois, nb_mois=0))
+        _apply(profil, bucket, recurrent, tx)
+    _refresh(profil, flux.values(), recurrents.values(), today)
+
+    with transaction.atomic():
+        ProfilFinancier.objects.filter(user_id=user_id).delete()
+        FluxMensuel.objects.filter(user_id=user_id).delete()
+        PrelevementRecurrent.objects.filter(user_id=user_id).delete()
+        profil.save()
+        FluxMensuel.objects.bulk_create(flux.values())
+        PrelevementRecurrent.objects.bulk_create(recurrents.values())
+    return profil
+
+
+def _record_after_commit(tx):
+    try:
+        record_transaction(tx)
+    except Exception:
+        logger.exception("Mise à jour des indicateurs impossible (transaction %s)", tx.pk)
+
+
+def on_transaction_saved(sender, instance, created, **kwargs):
+    if created:
+        # Après le commit : aucune requête ni verrou dans la transaction du grand livre,
+        # et rien à défaire si l'opération bancaire est annulée
+        transaction.on_commit(partial(_record_after_commit, instance))
+
+
+def revenus_verifies(user):
+    """Salaire mensuel moyen constaté sur les comptes (``None`` sans salaire régulier observé)."""
+    profil = ProfilFinancier.objects.filter(user=user).only('salaire_mensuel_moyen', 'mois_avec_salaire').first()
+    if profil is None or profil.mois_avec_salaire < MOIS_SALAIRE_MIN:
+        return None
+    return profil.salaire_mensuel_moyen
+
+
+def revenus_verifies_map(user_ids):
+    """``user_id -> salaire constaté`` pour un lot de clients (re-scoring)."""
+    return dict(
+        ProfilFinancier.objects.filter(user_id__in=set(user_ids), mois_avec_salaire__gte=MOIS_SALAIRE_MIN)
+        .values_list('user_id', 'salaire_mensuel_moyen')
+    )
@@ -0,0 +1,173 @@
+"""
+Calculs de prêt amortissable (annuités constantes).
+
+Les calculs se font en flottants numpy sur l'échéancier complet ; l'arrondi au
+centime n'intervient qu'à la sortie. Les tableaux sont mis en cache (LRU borné)
+sur les paramètres normalisés, les sliders générant beaucoup d'appels identiques.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CENT = Decimal("0.01")
+MAX_MONTHS = 600
+MAX_PRINCIPAL = Decimal("10000000")
+MAX_RATE = Decimal("30")
+SCHEDULE_CACHE_SIZE = 512
+
+
+def to_cents(value):
+    return Decimal(repr(float(value))).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def monthly_payment(principal, annual_rate, months):
+    """Mensualité (flottant, non arrondie) pour un capital, un taux annuel en % et une durée en mois."""
+    months = max(1, int(months))
+    r = float(annual_rate) / 100 / 12
+    if r > 0:
+        return float(principal) * r / (1 - (1 + r) ** (-months))
+    return float(principal) / months
+
+
+def principal_for_payment(mensualite, annual_rate, months):
+    """Capital empruntable (flottant) pour une mensualité donnée."""
+    months = max(1, int(months))
+    r = float(annual_rate) / 100 / 12
+    if r > 0:
+        return float(mensualite) * (1 - (1 + r) ** (-months)) / r
+    return float(mensualite) * months
+
+
+def normalize_loan_params(principal, annual_rate, months):
+    """Valide et normalise (capital au centime, taux à 4 décimales, mois entiers). Lève ValueError."""
+    try:
+        principal = Decimal(str(principal)).quantize(CENT)
+        annual_rate = Decimal(str(annual_rate)).quantize(Decimal("0.0001"))
+        months = int(months)
+    except Exception:
+        raise ValueError("Paramètres invalides.")
+    if not (0 < principal <= MAX_PRINCIPAL):
+        raise ValueError(f"Le capital doit être compris entre 0 et {MAX_PRINCIPAL} €.")
+    if not (0 <= annual_rate <= MAX_RATE):
+        raise ValueError(f"Le taux doit être compris entre 0 et {MAX_RATE} %.")
+    if not (1 <= months <= MAX_MONTHS):
+        raise ValueError(f"La durée doit être comprise entre 1 et {MAX_MONTHS} mois.")
+    return principal, annual_rate, months
+
+
+def _schedule_arrays(principal, annual_rate, months):
+    """Échéancier vectorisé : (mensualité, intérêts[], amortissement[], capital restant[])."""
+    r = annual_rate / 100 / 12
+    k = np.arange(1, months + 1, dtype=float)
+    payment = monthly_payment(principal, annual_rate, months)
+    if r > 0:
+        growth = (1 + r) ** k
+        remaining = principal * growth - payment * (growth - 1) / r
+        previous = np.concatenate(([principal], remaining[:-1]))
+        interest = previous * r
+    else:
+        remaining = principal - payment * k
+        interest = np.zeros(months)
+    remaining = np.clip(remaining, 0, None)
+    remaining[-1] = 0.0
+    return payment, interest, payment - interest, remaining
+
+
+@lru_cache(maxsize=SCHEDULE_CACHE_SIZE)
+def _cached_schedule(principal, annual_rate, months):
+    payment, interest, amortissement, remaining = _schedule_arrays(float(principal), float(annual_rate), months)
+    total_interest = float(interest.sum())
+    echeances = tuple(
+        {
+            'mois': i + 1,
+            'mensualite': float(to_cents(payment)),
+            'interets': float(to_cents(interest[i])),
+            'capital': float(to_cents(amortissement[i])),
+            'capital_restant': float(to_cents(remaining[i])),
+        }
+        for i in range(months)
+    )
+    return {
+        'principal': float(principal),
+        'taux': float(annual_rate),
+        'mois': months,
+        'mensualite': float(to_cents(payment)),
+        'cout_total': float(to_cents(payment * months)),
+        'interets_totaux': float(to_cents(total_interest)),
+        'echeancier': echeances,
+    }
+
+
+def amortization_schedule(principal, annual_rate, months):
+    """
+    Mensualité, coût total et échéancier complet. Le résultat provient d'un cache
+    partagé : ne pas le modifier.
+    """
+    if np is None:
+        raise RuntimeError("numpy est requis pour le calcul de l'échéancier.")
+    return _cached_schedule(*normalize_loan_params(principal, annual_rate, months))
+
+
+GRID_DUREES = tuple(range(1, 41))
+GRID_ECARTS_TAUX = (-1.0, -0.5, -0.25, 0.0, 0.25, 0.5, 1.0)
+GRID_DTI = (30, 33, 35, 40, 45)
+
+
+def affordability_grid(revenus, charges, principal, taux_ref,
+                       durees=GRID_DUREES, ecarts_taux=GRID_ECARTS_TAUX, dti_cibles=GRID_DTI):
+    """
+    Grille d'alternatives (durée × taux × DTI) calculée en un seul passage numpy.
+
+    - ``capital_max[d][t][k]`` : capital empruntable sur ``durees[d]`` ans au taux
+      ``taux[t]`` pour un DTI cible ``dti[k]`` ;
+    - ``mensualite_requise[d][t]`` / ``dti_requis[d][t]`` : mensualité et DTI
+      atteints pour le capital demandé.
+    """
+    if np is None:
+        raise RuntimeError("numpy est requis pour la grille d'alternatives.")
+    revenus = max(float(revenus or 0), 1.0)
+    charges = float(charges or 0)
+    years = np.asarray(durees, dtype=float)
+    taux = np.round(np.clip(float(taux_ref) + np.asarray(ecarts_taux, dtype=float), 0, None), 2)
+    dti = np.asarray(dti_cibles, dtype=float)
+
+    n = (years * 12)[:, None]
+    r = (taux / 100 / 12)[None, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        facteur = np.where(r > 0, (1 - (1 + r) ** (-n)) / np.where(r > 0, r, 1), n)  # (D, T)
+    capacite = np.clip(revenus * dti / 100 - charges, 0, None)                       # (K,)
+    capital_max = facteur[:, :, None] * capacite[None, None, :]                      # (D, T, K)
+    mensualite_requise = float(principal or 0) / facteur                             # (D, T)
+    dti_requis = (mensualite_requise + charges) / revenus * 100
+
+    return {
+        'durees': [int(y) for y in years],
+        'taux': taux.tolist(),
+        'taux_ref_index': int(np.argmin(np.abs(np.asarray(ecarts_taux, dtype=float)))),
+        'dti': dti.astype(int).tolist(),
+        'capacite_mensuelle': np.floor(capacite).astype(int).tolist(),
+        'capital_max': np.floor(capital_max).astype(int).tolist(),
+        'mensualite_requise': np.round(mensualite_requise, 2).tolist(),
+        'dti_requis': np.round(dti_requis, 1).tolist(),
+    }
+
+
+def suggested_duration(grid, mensualite_cible):
+    """Plus petite durée (années) de la grille dont la mensualité au taux de référence tient dans la cible."""
+    ref = grid['taux_ref_index']
+    for i, duree in enumerate(grid['durees']):
+        if grid['mensualite_requise'][i][ref] <= mensualite_cible:
+            return duree
+    return None
+
+
+def min_duration_for_payment(principal, annual_rate, mensualite_cible, durees=GRID_DUREES):
+    """Équivalent scalaire de ``suggested_duration`` (sans numpy) : même résultat, sans construire la grille."""
+    for duree in durees:
+        if round(monthly_payment(principal or 0, annual_rate, duree * 12), 2) <= mensualite_cible:
+            return duree
+    return None
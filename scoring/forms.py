@@ -3,6 +3,7 @@ from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 import re
+from . import catalogue
 from .models import DemandeCredit, TypeEmploi, TypeLogement, ProduitPret, Compte, Transaction, Beneficiaire
 
 # --- UTILITAIRE DE VALIDATION IBAN (Version Souple pour Simulation) ---
@@ -184,6 +185,19 @@ class TransactionFilterForm(forms.Form):
 
 # --- CRÉDIT & SIMULATION ---
 
+class CatalogueChoiceField(forms.ChoiceField):
+    """Liste déroulante alimentée par le référentiel en cache (aucune requête au rendu ni à la validation)."""
+
+    def __init__(self, objets, empty_label="---------", **kwargs):
+        self.objets = {str(o.pk): o for o in objets}
+        kwargs.setdefault('required', False)
+        super().__init__(choices=[('', empty_label)] + [(pk, str(o)) for pk, o in self.objets.items()], **kwargs)
+
+    def clean(self, value):
+        value = super().clean(value)
+        return self.objets.get(str(value)) if value not in self.empty_values else None
+
+
 class SimulationPretForm(forms.ModelForm):
     revenus_mensuels = forms.IntegerField(label="Vos revenus mensuels nets (€)", min_value=0)
     loyer_actuel = forms.IntegerField(label="Loyer actuel / Charges (€)", required=False, min_value=0)
@@ -195,11 +209,27 @@ class SimulationPretForm(forms.ModelForm):
             'user', 'statut', 'date_demande',
             'score_calcule', 'taux_calcule', 'recommendation',
             'sante_snapshot', 'ia_decision', 'mensualite_calculee',
-            'echeances_payees', 'dernier_prelevement'
+            'echeances_payees', 'dernier_prelevement', 'modele_version',
+            'date_decision'
         ]
 
+    # Champs du référentiel : listes servies par le cache (rendu sans requête) ; à l'envoi, la
+    # validation du modèle revérifie en base qu'un choix n'a pas été supprimé par un autre process
+    CATALOGUE_FIELDS = {
+        'produit': catalogue.produits,
+        'emploi_snapshot': catalogue.emplois,
+        'logement_snapshot': catalogue.logements,
+    }
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        for name, source in self.CATALOGUE_FIELDS.items():
+            if name in self.fields:
+                model_field = self.fields[name]
+                self.fields[name] = CatalogueChoiceField(
+                    source(), label=model_field.label, required=model_field.required,
+                    help_text=model_field.help_text, widget=forms.Select(attrs=model_field.widget.attrs),
+                )
         numeric_fields = [
             ('montant_souhaite', 1, 1),
             ('duree_souhaitee_annees', 1, 1),
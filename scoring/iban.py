@@ -0,0 +1,107 @@
+"""
+Attribution des numéros de compte : IBAN français valides (clé RIB et clé IBAN mod 97).
+
+Le numéro de compte (11 chiffres) vient d'une séquence en base réservée par
+blocs de ``IBAN_BLOCK_SIZE`` : chaque process consomme son bloc en mémoire et
+ne retourne en base qu'une fois le bloc épuisé. Deux process ne reçoivent
+jamais le même bloc (``UPDATE`` atomique de la séquence), les numéros sont donc
+uniques sans nouvel essai sur la contrainte ``unique``. Un bloc entamé est
+perdu au redémarrage : la séquence a des trous, jamais de doublons.
+
+Les blocs ne sont réservés qu'en autocommit : la réservation est commitée
+aussitôt et ne peut plus être annulée. Dans un bloc ``atomic``, le numéro est
+réservé à l'unité dans la transaction de l'appelant (annulé avec elle) et le
+bloc local n'est pas touché ; réserver le numéro avant d'ouvrir la transaction
+garde le chemin sans requête.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import SequenceCompte
+
+SEQUENCE = 'COMPTE'
+DEFAULT_BLOCK_SIZE = 100
+CODE_BANQUE = '19776'
+CODE_GUICHET = '00001'
+
+_lock = threading.Lock()
+_block = {'pid': None, 'next': 0, 'end': 0}
+
+
+def cle_rib(banque, guichet, compte):
+    return 97 - (89 * int(banque) + 15 * int(guichet) + 3 * int(compte)) % 97
+
+
+def _numerique(value):
+    return ''.join(str(int(c, 36)) for c in value)
+
+
+def cle_iban(pays, bban):
+    return 98 - int(_numerique(bban + pays + '00')) % 97
+
+
+def est_valide(iban):
+    """Contrôle mod 97 d'un IBAN (espaces ignorés)."""
+    iban = iban.replace(' ', '').upper()
+    if len(iban) < 15 or not iban.isalnum():
+        return False
+    return int(_numerique(iban[4:] + iban[:4])) % 97 == 1
+
+
+def format_iban(numero):
+    banque = getattr(settings, 'IBAN_CODE_BANQUE', CODE_BANQUE)
+    guichet = getattr(settings, 'IBAN_CODE_GUICHET', CODE_GUICHET)
+    compte = f"{numero:011d}"
+    bban = f"{banque}{guichet}{compte}{cle_rib(banque, guichet, compte):02d}"
+    return f"FR{cle_iban('FR', bban):02d}{bban}"
+
+
+def _reserve_block(size):
+    with transaction.atomic():
+        updated = SequenceCompte.objects.filter(nom=SEQUENCE).update(prochain=F('prochain') + size)
+        if not updated:
+            SequenceCompte.objects.get_or_create(nom=SEQUENCE)
+            SequenceCompte.objects.filter(nom=SEQUENCE).update(prochain=F('prochain') + size)
+        fin = SequenceCompte.objects.filter(nom=SEQUENCE).values_list('prochain', flat=True).get()
+    return fin - size, fin
+
+
+def allocate_numero():
+    """Prochain numéro de la séquence (une requête par bloc, aucune sinon ; une par numéro dans un ``atomic``)."""
+    if transaction.get_connection().in_atomic_block:
+        # Une réservation annulée rendrait la plage réattribuable : pas de bloc local
+        return _reserve_block(1)[0]
+    with _lock:
+        # Bloc hérité du process parent (fork) : jamais réutilisé
+        if _block['pid'] == os.getpid() and _block['next'] < _block['end']:
+            _block['next'] += 1
+            return _block['next'] - 1
+    # Réservation hors verrou : un thread en attente sur la base ne bloque pas les autres
+    size = max(1, getattr(settings, 'IBAN_BLOCK_SIZE', DEFAULT_BLOCK_SIZE))
+    start, end = _reserve_block(size)
+    with _lock:
+        _block.update(pid=os.getpid(), next=start + 1, end=end)
+    return start
+
+
+def allocate_iban():
+    """IBAN d'un nouveau compte (sans espaces, comme les numéros existants)."""
+    return format_iban(allocate_numero())
+
+
+def allocate_ibans(n):
+    """``n`` IBAN consécutifs pour un import en masse (un seul bloc dédié, une requête)."""
+    if n <= 0:
+        return []
+    start, end = _reserve_block(n)
+    return [format_iban(numero) for numero in range(start, end)]
+
+
+def reset():
+    """Abandonne le bloc courant (tests)."""
+    with _lock:
+        _block.update(pid=None, next=0, end=0)
@@ -0,0 +1,40 @@
+"""
+Moteur de solde : écritures de débit atomiques sur un compte.
+
+Le contrôle « solde + découvert » est porté par un ``UPDATE`` conditionnel
+(``solde >= montant - découvert``) : deux débits concurrents ne peuvent pas
+faire passer le compte sous sa limite, sans verrou applicatif ni relecture.
+Un débit carte exige en plus, dans le même ``UPDATE``, que la carte ne soit pas
+bloquée en base (le cache des cartes d'un autre process peut être en retard).
+"""
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+
+from .models import Carte, Compte, Transaction
+
+
+def post_debit(compte_id, montant, libelle, categorie='AUTRE', decouvert=0, carte_id=None):
+    """
+    Débite ``montant`` (positif) si le solde le permet, découvert compris.
+    Retourne la transaction créée, ou ``None`` si le solde est insuffisant
+    (ou si la carte ``carte_id`` est bloquée).
+    """
+    with transaction.atomic():
+        comptes = Compte.objects.filter(id=compte_id, est_actif=True, solde__gte=montant - decouvert)
+        if carte_id is not None:
+            comptes = comptes.filter(Exists(Carte.objects.filter(id=carte_id, compte_id=OuterRef('pk'), est_bloquee=False)))
+        updated = comptes.update(solde=F('solde') - montant)
+        if not updated:
+            return None
+        return Transaction.objects.create(
+            compte_id=compte_id,
+            montant=-montant,
+            libelle=libelle[:100],
+            type='DEBIT',
+            categorie=categorie,
+            carte_id=carte_id,
+        )
+
+
+def solde(compte_id):
+    return Compte.objects.filter(id=compte_id).values_list('solde', flat=True).first()
@@ -0,0 +1,56 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scoring import ml
+from scoring.backtest import run_backtest, write_csv
+from scoring.models import DemandeCredit
+
+
+class Command(BaseCommand):
+    help = "Rejoue les demandes de crédit historiques à travers une ou plusieurs versions du modèle et compare les résultats."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--versions', type=int, nargs='+', help="Versions du registre à comparer (la première sert de référence). Par défaut : les deux dernières.")
+        parser.add_argument('--since', help="Limiter aux demandes créées depuis cette date (AAAA-MM-JJ).")
+        parser.add_argument('--soumises', action='store_true', help="Ignorer les simulations non soumises.")
+        parser.add_argument('--chunk-size', type=int, default=20000)
+        parser.add_argument('--json', dest='json_path', help="Écrire le rapport complet en JSON.")
+        parser.add_argument('--csv', dest='csv_path', help="Écrire les métriques par segment en CSV.")
+
+    def handle(self, *args, **options):
+        if ml.np is None:
+            raise CommandError("numpy est requis pour le backtest.")
+        versions = options['versions'] or ml.list_versions()[-2:] or [0]
+        qs = DemandeCredit.objects.all()
+        if options['since']:
+            qs = qs.filter(date_demande__date__gte=options['since'])
+        if options['soumises']:
+            qs = qs.filter(soumise=True)
+
+        start = time.perf_counter()
+        try:
+            report = run_backtest(versions, qs, chunk_size=max(1, options['chunk_size']))
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(
+            f"{report['demandes']} demande(s) rejouée(s) ({report['decisions_admin']} décision(s) admin) "
+            f"sur {len(versions)} version(s) en {elapsed:.2f}s."
+        )
+        for row in report['versions']:
+            auc = f"{row['auc']:.3f}" if row['auc'] is not None else "n/a"
+            c = row['confusion']
+            self.stdout.write(
+                f"  v{row['version']} : acceptation {row['taux_acceptation']}, score moyen {row['score_moyen']}, AUC {auc}, "
+                f"VP {c['vrais_positifs']} / FP {c['faux_positifs']} / FN {c['faux_negatifs']} / VN {c['vrais_negatifs']}"
+            )
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as handle:
+                json.dump(report, handle, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Rapport JSON : {options['json_path']}")
+        if options['csv_path']:
+            write_csv(report, options['csv_path'])
+            self.stdout.write(f"Rapport CSV : {options['csv_path']}")
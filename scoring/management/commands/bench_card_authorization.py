@@ -0,0 +1,53 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from scoring import cards
+
+
+class Command(BaseCommand):
+    help = "Mesure le temps de décision d'une autorisation carte (cache + règles, hors écriture en base)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000)
+        parser.add_argument('--carte', type=int, help="Carte réelle à lire via le cache (état synthétique sinon).")
+        parser.add_argument('--objectif-us', type=float, default=1000.0, help="Objectif de p99 en microsecondes.")
+        parser.add_argument('--strict', action='store_true', help="Échoue si le p99 dépasse l'objectif.")
+
+    def handle(self, *args, **options):
+        iterations = max(1, options['iterations'])
+        if options['carte']:
+            carte_id = options['carte']
+            if cards.card_state(carte_id) is None:
+                raise CommandError(f"Carte {carte_id} introuvable.")
+            lire = lambda: cards.card_state(carte_id)  # noqa: E731
+        else:
+            state = cards.CardState(
+                0, 0, 0, '0000', timezone.localdate() + timedelta(days=365), False, True, False,
+                2000, 500, True, Decimal("500"), time.monotonic(),
+            )
+            lire = lambda: state  # noqa: E731
+
+        montants = [Decimal(f"{(i % 120) + 0.99:.2f}") for i in range(iterations)]
+        today = timezone.localdate()
+        durees = []
+        refus = 0
+        for i, montant in enumerate(montants):
+            debut = time.perf_counter()
+            motif = cards.decide(lire(), montant, sans_contact=i % 2 == 0, etranger=i % 7 == 0, today=today)
+            durees.append(time.perf_counter() - debut)
+            refus += motif is not None
+
+        durees.sort()
+        us = lambda q: durees[min(len(durees) - 1, int(q * len(durees)))] * 1e6  # noqa: E731
+        p99 = us(0.99)
+        self.stdout.write(
+            f"{iterations} décisions ({refus} refus) : moyenne {sum(durees) / len(durees) * 1e6:.1f} µs, "
+            f"p50 {us(0.5):.1f} µs, p99 {p99:.1f} µs, max {durees[-1] * 1e6:.1f} µs "
+            f"(objectif p99 < {options['objectif_us']:.0f} µs : {'OK' if p99 < options['objectif_us'] else 'KO'})."
+        )
+        if options['strict'] and p99 >= options['objectif_us']:
+            raise CommandError("Objectif de latence non atteint.")
@@ -0,0 +1,37 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scoring.billing import bill_subscriptions
+
+
+class Command(BaseCommand):
+    help = "Facture les abonnements arrivés à échéance et applique les changements de formule programmés."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Date de facturation (AAAA-MM-JJ, aujourd'hui par défaut).")
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help="Calcule sans débiter ni modifier les profils.")
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError("Date invalide (format attendu AAAA-MM-JJ).")
+
+        start = time.perf_counter()
+        totals = bill_subscriptions(
+            today=today,
+            chunk_size=max(1, options['chunk_size']),
+            dry_run=options['dry_run'],
+        )
+        elapsed = time.perf_counter() - start
+        mode = " (dry-run)" if options['dry_run'] else ""
+        self.stdout.write(
+            f"{totals.get('profils', 0)} profil(s) à échéance traité(s) en {elapsed:.2f}s{mode} : "
+            f"{totals.get('factures', 0)} facture(s) pour {totals.get('montant', 0)} €, "
+            f"{totals.get('changements', 0)} changement(s) de formule, {totals.get('sans_compte', 0)} sans compte actif."
+        )
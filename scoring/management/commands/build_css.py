@@ -0,0 +1,50 @@
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+TAILWIND_DIR = Path(__file__).resolve().parents[2] / 'tailwind'
+# pytailwindcss télécharge la CLI autonome : on reste sur la v3 (configuration JS)
+TAILWIND_VERSION = 'v3.4.17'
+
+
+def tailwind_bin():
+    return settings.TAILWINDCSS_BIN or shutil.which('tailwindcss')
+
+
+class Command(BaseCommand):
+    help = (
+        "Construit le CSS Tailwind purgé et minifié à partir des templates "
+        "(scoring/static/css/tailwind.min.css). Lancée automatiquement par collectstatic."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true', help="Reconstruit à chaque modification (développement).")
+
+    def handle(self, *args, **options):
+        binary = tailwind_bin()
+        if not binary:
+            raise CommandError("Exécutable tailwindcss introuvable : pip install pytailwindcss, ou TAILWINDCSS_BIN.")
+        output = Path(settings.TAILWIND_CSS)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        cmd = [
+            binary,
+            '-c', str(TAILWIND_DIR / 'tailwind.config.js'),
+            '-i', str(TAILWIND_DIR / 'input.css'),
+            '-o', str(output),
+            '--minify',
+        ]
+        if options['watch']:
+            cmd.append('--watch')
+        env = dict(os.environ)
+        env.setdefault('TAILWINDCSS_VERSION', TAILWIND_VERSION)
+        try:
+            result = subprocess.run(cmd, env=env, capture_output=not options['watch'], text=True)
+        except OSError as exc:
+            raise CommandError(f"tailwindcss n'a pas pu être lancé : {exc}")
+        if result.returncode:
+            raise CommandError(f"tailwindcss a échoué : {(result.stderr or '').strip()[-2000:]}")
+        self.stdout.write(f"CSS construit : {output} ({output.stat().st_size / 1024:.1f} ko).")
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.management.commands.collectstatic import \
+    Command as CollectStaticCommand
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+
+class Command(CollectStaticCommand):
+    """collectstatic précédé de build_css, pour que le bundle Tailwind soit haché et servi par WhiteNoise."""
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--no-css', action='store_true', help="Ne pas reconstruire le CSS Tailwind.")
+        parser.add_argument(
+            '--css-fallback', action='store_true',
+            help="Hors DEBUG, poursuivre malgré l'échec de build_css (bundle existant ou CDN Tailwind).",
+        )
+
+    def handle(self, **options):
+        if not options['no_css']:
+            try:
+                call_command('build_css', stdout=self.stdout, stderr=self.stderr)
+            except CommandError as exc:
+                # En production, un échec ne doit pas réactiver en silence le compilateur du CDN
+                if not settings.DEBUG and not options['css_fallback']:
+                    raise CommandError(f"{exc} Relancer avec --css-fallback pour déployer malgré tout.")
+                if Path(settings.TAILWIND_CSS).exists():
+                    self.stderr.write(f"{exc} Bundle CSS existant conservé.")
+                else:
+                    self.stderr.write(f"{exc} Les pages utiliseront le compilateur Tailwind du CDN.")
+        return super().handle(**options)
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from scoring import benchmarks
+
+
+class Command(BaseCommand):
+    help = "Compare des résultats de microbenchmarks à la référence et signale les régressions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('resultats', nargs='?', help="JSON de run_benchmarks (sinon la suite est jouée maintenant).")
+        parser.add_argument('--baseline', default=str(benchmarks.BASELINE))
+        parser.add_argument('--seuil', type=float, default=benchmarks.SEUIL_DEFAUT,
+                            help="Écart relatif toléré sur le minimum (0.20 : +20 %%).")
+        parser.add_argument('--repeat', type=int, default=benchmarks.REPEAT_DEFAUT)
+        parser.add_argument('--strict', action='store_true', help="Échoue en cas de régression.")
+
+    def handle(self, *args, **options):
+        try:
+            reference = benchmarks.charger(options['baseline'])
+        except FileNotFoundError:
+            raise CommandError(f"Référence introuvable : {options['baseline']} (run_benchmarks --save-baseline).")
+        if options['resultats']:
+            actuel = benchmarks.charger(options['resultats'])
+        else:
+            try:
+                actuel = benchmarks.run(repeat=options['repeat'])
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+
+        if reference['meta'].get('machine') != actuel['meta'].get('machine'):
+            self.stderr.write(
+                f"Attention : référence mesurée sur « {reference['meta'].get('machine')} », "
+                "les écarts reflètent aussi la machine."
+            )
+        lignes = benchmarks.compare(actuel, reference, seuil=options['seuil'])
+        for ligne in lignes:
+            ecart = f"{ligne['ecart']:+.1%}" if ligne['ecart'] is not None else '—'
+            ref = f"{ligne['reference_us']:.3f}" if ligne['reference_us'] is not None else '—'
+            cur = f"{ligne['actuel_us']:.3f}" if ligne['actuel_us'] is not None else '—'
+            self.stdout.write(f"{ligne['cas']:<28} {ref:>12} → {cur:>12} µs  {ecart:>8}  {ligne['statut']}")
+
+        regressions = [l['cas'] for l in lignes if l['statut'] == 'REGRESSION']
+        self.stdout.write(
+            f"{len(lignes)} cas, {len(regressions)} régression(s) au-delà de {options['seuil']:.0%} "
+            f"(référence {reference['meta'].get('commit') or '?'} du {reference['meta'].get('date', '?')[:10]})."
+        )
+        if options['strict'] and regressions:
+            raise CommandError(f"Régression : {', '.join(regressions)}.")
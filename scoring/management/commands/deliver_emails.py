@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from scoring.outbox import deliver_pending, purge_sent
+
+
+class Command(BaseCommand):
+    help = "Envoie les emails en file (EmailOutbox) par lots sur une connexion SMTP réutilisée."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--max-batches', type=int, help="Nombre maximal de lots par passe.")
+        parser.add_argument('--loop', action='store_true', help="Tourne en continu (worker).")
+        parser.add_argument('--interval', type=float, default=5.0, help="Pause entre deux passes en mode --loop (secondes).")
+        parser.add_argument('--purge-days', type=int, help="Supprime ensuite les emails envoyés depuis plus de N jours.")
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            stats = deliver_pending(batch_size=max(1, options['batch_size']), max_batches=options['max_batches'])
+            elapsed = time.perf_counter() - start
+            if not options['loop'] or any(stats.values()):
+                self.stdout.write(
+                    f"{stats['envoyes']} email(s) envoyé(s), {stats['reportes']} reporté(s), "
+                    f"{stats['abandonnes']} abandonné(s) en {elapsed:.2f}s."
+                )
+            if options['purge_days'] is not None:
+                purged = purge_sent(options['purge_days'])
+                if purged:
+                    self.stdout.write(f"{purged} email(s) envoyé(s) purgé(s).")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,39 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scoring.models import Compte
+from scoring.overdraft import enforce_overdraft_bulk
+from scoring.utils import expire_overdraft_boosts, refresh_all_overdraft_limits
+
+
+class Command(BaseCommand):
+    help = "Expire les découverts temporaires échus, recalcule les limites et réévalue les cartes des comptes concernés."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Date de référence (AAAA-MM-JJ, aujourd'hui par défaut).")
+        parser.add_argument('--all', action='store_true', help="Recalculer aussi la limite de tous les profils.")
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError("Date invalide (format attendu AAAA-MM-JJ).")
+
+        start = time.perf_counter()
+        expired, changed = expire_overdraft_boosts(today)
+        changed = set(changed)
+        if options['all']:
+            changed.update(refresh_all_overdraft_limits())
+
+        compte_ids = list(Compte.objects.filter(user_id__in=changed).values_list('id', flat=True))
+        enforce_overdraft_bulk(compte_ids)
+        comptes = len(compte_ids)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{expired} découvert(s) temporaire(s) expiré(s), {len(changed)} limite(s) recalculée(s), "
+            f"{comptes} compte(s) réévalué(s) en {elapsed:.2f}s."
+        )
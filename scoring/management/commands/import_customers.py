@@ -0,0 +1,81 @@
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scoring import catalogue
+from scoring.onboarding import CADEAU_BIENVENUE, clean_row, onboard_bulk
+
+MAX_ERREURS_AFFICHEES = 20
+
+
+def _lignes(path, fmt):
+    with open(path, newline='', encoding='utf-8-sig') as fh:
+        if fmt == 'csv':
+            for numero, row in enumerate(csv.DictReader(fh), start=2):
+                yield numero, row
+        else:
+            for numero, line in enumerate(fh, start=1):
+                if line.strip():
+                    yield numero, line
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe des clients (CSV ou JSONL : username, email, first_name, last_name, birth_date, birth_city, "
+        "abonnement, password_hash) avec profil, compte courant, carte et cadeau de bienvenue, par lots."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Déduit de l'extension par défaut.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--cadeau', default=str(CADEAU_BIENVENUE), help="Montant du cadeau de bienvenue (0 : aucun).")
+        parser.add_argument('--dry-run', action='store_true', help="Valide et compte sans rien écrire.")
+
+    def handle(self, *args, **options):
+        try:
+            cadeau = Decimal(options['cadeau']).quantize(Decimal("0.01"))
+        except InvalidOperation:
+            raise CommandError("Montant de cadeau invalide.")
+        chunk_size = max(1, options['chunk_size'])
+        plans = catalogue.plans()
+
+        start = time.perf_counter()
+        lus = crees = ignores = 0
+        erreurs = []
+        for path in options['files']:
+            path = Path(path)
+            if not path.exists():
+                raise CommandError(f"Fichier introuvable : {path}")
+            fmt = options['format'] or ('jsonl' if path.suffix.lower() in ('.jsonl', '.json', '.ndjson') else 'csv')
+            lot = []
+            for numero, row in _lignes(path, fmt):
+                lus += 1
+                try:
+                    if isinstance(row, str):
+                        row = json.loads(row)
+                    lot.append(clean_row(row, plans))
+                except (ValueError, AttributeError) as exc:
+                    erreurs.append(f"{path.name}:{numero} : {exc}")
+                    continue
+                if len(lot) >= chunk_size:
+                    c, i = onboard_bulk(lot, cadeau=cadeau, dry_run=options['dry_run'])
+                    crees, ignores, lot = crees + c, ignores + i, []
+            if lot:
+                c, i = onboard_bulk(lot, cadeau=cadeau, dry_run=options['dry_run'])
+                crees, ignores = crees + c, ignores + i
+
+        elapsed = time.perf_counter() - start
+        for erreur in erreurs[:MAX_ERREURS_AFFICHEES]:
+            self.stderr.write(erreur)
+        if len(erreurs) > MAX_ERREURS_AFFICHEES:
+            self.stderr.write(f"… {len(erreurs) - MAX_ERREURS_AFFICHEES} autre(s) erreur(s).")
+        debit = crees / elapsed * 60 if elapsed else 0
+        self.stdout.write(
+            f"{lus} ligne(s) lue(s) : {crees} client(s) {'à créer' if options['dry_run'] else 'créé(s)'}, "
+            f"{ignores} déjà présent(s), {len(erreurs)} en erreur, en {elapsed:.2f}s ({debit:,.0f} clients/min)."
+        )
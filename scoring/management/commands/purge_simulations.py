@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from scoring.models import DemandeCredit
+
+
+class Command(BaseCommand):
+    help = "Supprime les anciennes simulations de crédit jamais soumises (héritées d'avant le stockage en session)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help="Âge minimum (en jours) des simulations à supprimer.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(days=options['days'])
+        qs = DemandeCredit.objects.filter(soumise=False, statut='EN_ATTENTE', date_demande__lt=limite)
+        if options['dry_run']:
+            self.stdout.write(f"{qs.count()} simulation(s) non soumise(s) à supprimer (dry-run).")
+            return
+
+        total = 0
+        batch_size = max(1, options['batch_size'])
+        # Suppression par lots pour ne pas verrouiller la table sur de gros volumes
+        while True:
+            ids = list(qs.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            DemandeCredit.objects.filter(id__in=ids).delete()
+            total += len(ids)
+        self.stdout.write(f"{total} simulation(s) non soumise(s) supprimée(s) (plus de {options['days']} jours).")
@@ -0,0 +1,27 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scoring.spend import rebuild_all_counters
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les compteurs de dépenses carte (jour, 30 jours) à partir des transactions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Date de référence (AAAA-MM-JJ, aujourd'hui par défaut).")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError("Date invalide (format attendu AAAA-MM-JJ).")
+
+        start = time.perf_counter()
+        cartes, compteurs = rebuild_all_counters(chunk_size=max(1, options['chunk_size']), today=today)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"{cartes} carte(s) réconciliée(s), {compteurs} compteur(s) reconstruit(s) en {elapsed:.2f}s.")
@@ -0,0 +1,36 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from scoring.features import rebuild_user
+
+
+class Command(BaseCommand):
+    help = "Recalcule les indicateurs financiers clients (salaire, dépenses, découvert, volatilité, prélèvements récurrents) depuis l'historique."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Limiter à un nom d'utilisateur.")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Clients lus par requête.")
+
+    def handle(self, *args, **options):
+        qs = User.objects.order_by('id')
+        if options['user']:
+            qs = qs.filter(username=options['user'])
+            if not qs.exists():
+                raise CommandError(f"Utilisateur {options['user']} introuvable.")
+
+        start = time.perf_counter()
+        total = 0
+        last_id = 0
+        chunk_size = max(1, options['chunk_size'])
+        while True:
+            ids = list(qs.filter(id__gt=last_id).values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            last_id = ids[-1]
+            for user_id in ids:
+                rebuild_user(user_id)
+            total += len(ids)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"Indicateurs recalculés pour {total} client(s) en {elapsed:.2f}s.")
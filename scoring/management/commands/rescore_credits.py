@@ -0,0 +1,80 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from scoring import ml
+from scoring.credit_engine import SCORE_FIELDS, score_applications
+from scoring.features import revenus_verifies_map
+from scoring.models import DemandeCredit
+
+
+class Command(BaseCommand):
+    help = "Recalcule score, taux et avis automatique des demandes de crédit en attente (par lots vectorisés)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--statut', default='EN_ATTENTE', help="Statut à re-scorer (EN_ATTENTE par défaut, ALL pour tous).")
+        parser.add_argument('--user', help="Limiter à un nom d'utilisateur.")
+        parser.add_argument('--since', help="Limiter aux demandes créées depuis cette date (AAAA-MM-JJ).")
+        parser.add_argument('--soumises', action='store_true', help="Ignorer les simulations non soumises.")
+        parser.add_argument('--model-version', type=int, help="Version du registre à utiliser (dernière par défaut).")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Calcule et rapporte sans écrire en base.")
+
+    def handle(self, *args, **options):
+        if ml.np is None:
+            raise CommandError("numpy est requis pour le re-scoring vectorisé.")
+        if options['model_version'] is not None:
+            weights, meta = ml.load_model(options['model_version'])
+            if weights is None:
+                raise CommandError(f"Version {options['model_version']} absente du registre.")
+            version = meta.get('version')
+        else:
+            weights, version = ml.get_weights(), ml.current_version()
+
+        qs = DemandeCredit.objects.select_related('produit', 'emploi_snapshot', 'logement_snapshot')
+        if options['statut'] != 'ALL':
+            qs = qs.filter(statut=options['statut'])
+        if options['user']:
+            qs = qs.filter(user__username=options['user'])
+        if options['since']:
+            qs = qs.filter(date_demande__date__gte=options['since'])
+        if options['soumises']:
+            qs = qs.filter(soumise=True)
+
+        chunk_size = max(1, options['chunk_size'])
+        total = 0
+        transitions = Counter()
+        versions = Counter()
+        last_id = 0
+        start = time.perf_counter()
+        # Pagination par clé (id) : pas d'OFFSET, lecture en flux constant
+        while True:
+            chunk = list(qs.filter(id__gt=last_id).order_by('id')[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            verifies = revenus_verifies_map(d.user_id for d in chunk)
+            results = score_applications(chunk, weights=weights, version=version, revenus_verifies=verifies)
+            for demande, result in zip(chunk, results):
+                transitions[(demande.ia_decision or '-', result['ia_decision'])] += 1
+                versions[(demande.modele_version, version)] += 1
+                for field, value in result.items():
+                    setattr(demande, field, value)
+            if not options['dry_run']:
+                with transaction.atomic():
+                    DemandeCredit.objects.bulk_update(chunk, SCORE_FIELDS)
+            total += len(chunk)
+
+        elapsed = time.perf_counter() - start
+        rate = total / elapsed if elapsed > 0 else 0
+        mode = " (dry-run)" if options['dry_run'] else ""
+        self.stdout.write(f"{total} demande(s) re-scorée(s) en {elapsed:.2f}s ({rate:.0f}/s) avec le modèle v{version}{mode}.")
+        for (old_version, new_version), count in sorted(versions.items(), key=lambda item: str(item[0])):
+            self.stdout.write(f"  modèle v{old_version if old_version is not None else '?'} -> v{new_version} : {count}")
+        changes = sum(count for (old, new), count in transitions.items() if old != new)
+        self.stdout.write(f"Décisions modifiées : {changes}")
+        for (old, new), count in sorted(transitions.items()):
+            marker = "*" if old != new else " "
+            self.stdout.write(f" {marker} {old} -> {new} : {count}")
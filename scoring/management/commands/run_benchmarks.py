@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from scoring import benchmarks
+
+
+class Command(BaseCommand):
+    help = "Joue les microbenchmarks des fonctions pures (scoring.benchmarks) et enregistre les résultats."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', nargs='+', metavar='CAS', help="Limiter la suite à ces cas.")
+        parser.add_argument('--repeat', type=int, default=benchmarks.REPEAT_DEFAUT)
+        parser.add_argument('--min-time', type=float, default=benchmarks.MIN_TIME_DEFAUT,
+                            help="Durée minimale d'une mesure (s), le nombre d'appels est calibré dessus.")
+        parser.add_argument('--json', dest='json_path', help="Écrire les résultats en JSON.")
+        parser.add_argument('--save-baseline', action='store_true', help=f"Remplacer la référence ({benchmarks.BASELINE.name}).")
+
+    def handle(self, *args, **options):
+        try:
+            resultats = benchmarks.run(
+                noms=options['only'], repeat=options['repeat'], min_time=options['min_time'], log=self.stdout.write,
+            )
+        except (ValueError, RuntimeError) as exc:
+            raise CommandError(str(exc))
+        if options['json_path']:
+            benchmarks.enregistrer(resultats, options['json_path'])
+            self.stdout.write(f"Résultats JSON : {options['json_path']}")
+        if options['save_baseline']:
+            if options['only']:
+                raise CommandError("La référence doit couvrir toute la suite : retirer --only.")
+            benchmarks.enregistrer(resultats)
+            self.stdout.write(f"Référence enregistrée : {benchmarks.BASELINE}")
@@ -0,0 +1,79 @@
+import logging
+import multiprocessing
+import time
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from scoring import tasks
+
+logger = logging.getLogger(__name__)
+
+
+def _execute(tache_id, worker, bail):
+    # Chaque thread/processus du pool garde sa connexion ; fermée si obsolète
+    close_old_connections()
+    try:
+        return tasks.execute(tache_id, worker, bail)
+    finally:
+        close_old_connections()
+
+
+def _init_process():
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = "Traite la file de tâches en arrière-plan (pool de threads ou de processus)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help="Tâches exécutées en parallèle.")
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread')
+        parser.add_argument('--interval', type=float, default=2.0, help="Attente quand la file est vide (secondes).")
+        parser.add_argument('--lease', type=int, default=int(tasks.BAIL.total_seconds()), help="Durée du bail (secondes), prolongé toutes les lease/3 pendant l'exécution.")
+        parser.add_argument('--once', action='store_true', help="S'arrête quand la file est vide.")
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        bail = timedelta(seconds=max(1, options['lease']))
+        worker = tasks.worker_name()
+        if options['mode'] == 'process':
+            # Pas de connexion partagée entre le parent et les processus fils
+            connections.close_all()
+            pool = ProcessPoolExecutor(concurrency, mp_context=multiprocessing.get_context(), initializer=_init_process)
+        else:
+            pool = ThreadPoolExecutor(concurrency)
+        self.stdout.write(f"Worker {worker} : {concurrency} {options['mode']}(s), tâches {', '.join(sorted(tasks.TACHES))}.")
+
+        en_cours = {}
+        traitees = 0
+        try:
+            while True:
+                libres = concurrency - len(en_cours)
+                ids = tasks.claim(libres, worker, bail=bail) if libres else []
+                for tache_id in ids:
+                    en_cours[pool.submit(_execute, tache_id, worker, bail)] = tache_id
+                if not en_cours:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+                done, _ = wait(list(en_cours), timeout=options['interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    tache_id = en_cours.pop(future)
+                    try:
+                        issue = future.result()
+                    except Exception:
+                        logger.exception("Tâche %s : erreur du worker", tache_id)
+                        issue = 'ERREUR'
+                    traitees += 1
+                    self.stdout.write(f"Tâche {tache_id} : {issue}")
+        except KeyboardInterrupt:
+            self.stdout.write("Arrêt demandé, fin des tâches en cours…")
+        finally:
+            pool.shutdown(wait=True)
+        self.stdout.write(f"{traitees} tâche(s) traitée(s).")
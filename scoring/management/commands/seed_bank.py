@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scoring.seeding import seed_bank
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère un jeu de données de volume déterministe (clients, comptes, cartes, transactions, "
+        "bénéficiaires, notifications, demandes de crédit, messages support) par bulk_create."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--transactions', type=int, default=100_000, help="Nombre total de transactions.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--days', type=int, default=180, help="Profondeur de l'historique.")
+        parser.add_argument('--prefix', default='seed', help="Préfixe des identifiants (seed0000000, ...).")
+        parser.add_argument('--password', default='banquise', help="Mot de passe commun des clients générés.")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            stats = seed_bank(
+                users=max(0, options['users']),
+                transactions=max(0, options['transactions']),
+                seed=options['seed'],
+                days=max(1, options['days']),
+                prefix=options['prefix'],
+                password=options['password'],
+                chunk_size=max(1, options['chunk_size']),
+                log=self.stdout.write,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['clients']} client(s) et {stats['transactions']} transaction(s) générés en {elapsed:.1f}s."
+        ))
+        self.stdout.write("Indicateurs dérivés : lancer rebuild_features puis rebuild_card_counters.")
@@ -3,12 +3,12 @@ from decimal import Decimal
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
 from django.core.management.base import BaseCommand
 from django.db.models import Sum
 from django.utils import timezone
 
 from scoring.models import Compte, Transaction
+from scoring.outbox import enqueue_email
 from scoring.utils import overdraft_limit_for_user
 
 
@@ -25,7 +25,7 @@ class Command(BaseCommand):
         now = timezone.now()
         week_ago = now - timedelta(days=7)
         comptes_alertes = []
-        for compte in Compte.objects.select_related('user').filter(est_actif=True):
+        for compte in Compte.objects.select_related('user__profil').filter(est_actif=True):
             limite = overdraft_limit_for_user(compte.user)
             if compte.solde < -limite or compte.solde < Decimal("50.00"):
                 comptes_alertes.append(
@@ -57,11 +57,10 @@ class Command(BaseCommand):
         else:
             body_lines.append("- Pas de dépense remontée.")
 
-        send_mail(
-            subject="Banquise - rapport hebdo",
-            message="\n".join(body_lines),
-            from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', 'webmaster@localhost'),
-            recipient_list=admin_emails,
-            fail_silently=False
+        enqueue_email(
+            "Banquise - rapport hebdo",
+            "\n".join(body_lines),
+            admin_emails,
+            getattr(settings, 'DEFAULT_FROM_EMAIL', 'webmaster@localhost'),
         )
-        self.stdout.write(f"Email envoyé aux admins ({len(admin_emails)} destinataires).")
+        self.stdout.write(f"Email mis en file pour les admins ({len(admin_emails)} destinataires), envoyé par deliver_emails.")
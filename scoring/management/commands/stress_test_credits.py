@@ -0,0 +1,61 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scoring.stress import run_stress_test
+
+
+class Command(BaseCommand):
+    help = "Stress test Monte-Carlo des crédits acceptés en cours (chocs de taux, de revenus et défauts)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--paths', type=int, default=10000, help="Nombre de trajectoires simulées.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Crédits lus par requête.")
+        parser.add_argument('--memory-mb', type=int, default=256, help="Budget mémoire d'un bloc crédits × trajectoires.")
+        parser.add_argument('--choc-taux', type=float, help="Écart-type du choc de taux (points).")
+        parser.add_argument('--choc-revenus', type=float, help="Écart-type du choc de revenus systémique.")
+        parser.add_argument('--choc-individuel', type=float, help="Écart-type du choc de revenus individuel.")
+        parser.add_argument('--lgd', type=float, help="Perte en cas de défaut (0-1).")
+        parser.add_argument('--json', dest='json_path', help="Écrire le rapport complet en JSON.")
+
+    def handle(self, *args, **options):
+        if options['paths'] < 1:
+            raise CommandError("--paths doit être strictement positif.")
+        if options['seed'] < 0:
+            raise CommandError("--seed doit être positif ou nul.")
+        for option in ('choc_taux', 'choc_revenus', 'choc_individuel'):
+            if options[option] is not None and options[option] < 0:
+                raise CommandError(f"--{option.replace('_', '-')} doit être positif ou nul.")
+        if options['lgd'] is not None and not 0 <= options['lgd'] <= 1:
+            raise CommandError("--lgd doit être compris entre 0 et 1.")
+        start = time.perf_counter()
+        try:
+            rapport = run_stress_test(
+                paths=options['paths'],
+                seed=options['seed'],
+                chunk_size=max(1, options['chunk_size']),
+                memory_mb=max(1, options['memory_mb']),
+                choc_taux=options['choc_taux'],
+                choc_revenus=options['choc_revenus'],
+                choc_individuel=options['choc_individuel'],
+                lgd=options['lgd'],
+            )
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(
+            f"{rapport['credits']} crédit(s) × {rapport['trajectoires']} trajectoire(s) en {elapsed:.2f}s "
+            f"(exposition {rapport['exposition']:.2f} €)."
+        )
+        self.stdout.write(f"  Perte attendue : {rapport['perte_attendue']:.2f} € ({rapport['perte_attendue_pct']} %)")
+        for label, value in rapport['quantiles'].items():
+            self.stdout.write(f"  {label} : {value:.2f} €")
+        self.stdout.write(f"  VaR 99 % : {rapport['var_99']:.2f} € · ES 99 % : {rapport['es_99']:.2f} €")
+        self.stdout.write(f"  Taux de défaut moyen : {rapport['taux_defaut_moyen']}")
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as handle:
+                json.dump(rapport, handle, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Rapport JSON : {options['json_path']}")
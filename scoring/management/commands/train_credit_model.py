@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from scoring import ml
+
+
+class Command(BaseCommand):
+    help = "Entraîne le modèle de scoring crédit et publie une nouvelle version des poids (.npz)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42, help="Graine du dataset synthétique.")
+        parser.add_argument('--samples', type=int, default=600, help="Nombre de lignes synthétiques.")
+
+    def handle(self, *args, **options):
+        if ml.np is None:
+            raise CommandError("numpy est requis pour entraîner le modèle.")
+        weights = ml.train_credit_model(seed=options['seed'], n=options['samples'])
+        version = ml.save_weights(weights, seed=options['seed'], n_samples=options['samples'])
+        self.stdout.write(f"Modèle v{version} publié dans {ml.model_path(version)}.")
+        self.stdout.write("Redémarrer les workers (ou relancer avec --preload) pour charger cette version.")
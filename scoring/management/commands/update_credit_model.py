@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scoring import ml
+from scoring.training import update_model
+
+
+class Command(BaseCommand):
+    help = "Met à jour le modèle de scoring (SGD par mini-lots) avec les décisions admin depuis le dernier point de reprise."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Décisions lues par requête.")
+        parser.add_argument('--batch-size', type=int, default=64, help="Taille des mini-lots SGD.")
+        parser.add_argument('--lr', type=float, default=0.05, help="Pas d'apprentissage.")
+        parser.add_argument('--epochs', type=int, default=1, help="Passages sur chaque lot de nouvelles décisions.")
+        parser.add_argument('--l2', type=float, default=0.0, help="Régularisation L2.")
+        parser.add_argument('--dry-run', action='store_true', help="Entraîne sans publier de nouvelle version.")
+
+    def handle(self, *args, **options):
+        if ml.np is None:
+            raise CommandError("numpy est requis pour entraîner le modèle.")
+        start = time.perf_counter()
+        summary = update_model(
+            chunk_size=max(1, options['chunk_size']),
+            lr=options['lr'],
+            batch_size=max(1, options['batch_size']),
+            epochs=max(1, options['epochs']),
+            l2=options['l2'],
+            publish=not options['dry_run'],
+        )
+        elapsed = time.perf_counter() - start
+        if not summary['decisions']:
+            self.stdout.write("Aucune nouvelle décision depuis le dernier point de reprise.")
+            return
+        self.stdout.write(
+            f"{summary['decisions']} décision(s) apprises ({summary['acceptees']} acceptée(s)) "
+            f"depuis v{summary['parent'] if summary['parent'] is not None else '-'} en {elapsed:.2f}s."
+        )
+        if summary['version']:
+            self.stdout.write(f"Modèle v{summary['version']} publié. Redémarrer les workers pour le charger.")
+        else:
+            self.stdout.write("Dry-run : aucune version publiée.")
@@ -1,5 +1,8 @@
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 
+from . import perf
+
 
 class SecurityHeadersMiddleware(MiddlewareMixin):
     """
@@ -7,6 +10,8 @@ class SecurityHeadersMiddleware(MiddlewareMixin):
     Bien activer HTTPS en production pour que ces directives soient pleinement efficaces.
     """
     def process_response(self, request, response):
+        # Le compilateur Tailwind du CDN n'est autorisé que si le bundle CSS n'est pas construit
+        tailwind = "https://cdn.tailwindcss.com " if settings.TAILWIND_CDN else ""
         response.headers.setdefault("X-Content-Type-Options", "nosniff")
         response.headers.setdefault("X-Frame-Options", "SAMEORIGIN")
         response.headers.setdefault("Referrer-Policy", "same-origin")
@@ -14,7 +19,7 @@ class SecurityHeadersMiddleware(MiddlewareMixin):
         response.headers.setdefault(
             "Content-Security-Policy",
             "default-src 'self' data: blob:; "
-            "script-src 'self' https://cdn.tailwindcss.com https://cdn.jsdelivr.net https://cdn.jsdelivr.net/npm 'unsafe-inline'; "
+            f"script-src 'self' {tailwind}https://cdn.jsdelivr.net https://cdn.jsdelivr.net/npm 'unsafe-inline'; "
             "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://fonts.googleapis.com; "
             "font-src 'self' data: https://fonts.gstatic.com https://cdn.jsdelivr.net https://cdn.jsdelivr.net/npm; "
             "img-src 'self' data: blob: https:;"
@@ -24,11 +29,31 @@ class SecurityHeadersMiddleware(MiddlewareMixin):
 
 class NoCacheForAuthMiddleware(MiddlewareMixin):
     """
-    Ajoute des en-têtes no-cache à toutes les réponses pour éviter de revoir
-    des pages protégées via le bouton Retour après déconnexion.
+    Ajoute des en-têtes no-cache aux réponses pour éviter de revoir des pages
+    protégées via le bouton Retour après déconnexion. Seules les pages publiques
+    servies à un visiteur anonyme (``cache_policy.public_page``) y échappent.
     """
     def process_response(self, request, response):
+        if getattr(response, 'cache_policy', None) == 'public':
+            return response
         response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
         response.headers["Pragma"] = "no-cache"
         response.headers["Expires"] = "0"
         return response
+
+
+class PerfMiddleware:
+    """
+    Mesure latence, SQL et rendu des templates d'une fraction des requêtes
+    (``PERF_SAMPLE_RATE``), agrégés par nom d'URL dans ``scoring.perf``.
+    À placer en tête de ``MIDDLEWARE`` pour couvrir les autres middlewares.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        perf.install()
+
+    def __call__(self, request):
+        if not perf.echantillonner():
+            return self.get_response(request)
+        with perf.mesurer(request):
+            return self.get_response(request)
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-19 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0014_messagesupport_a_ete_modifie'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='demandecredit',
+            name='modele_version',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.25 on 2026-10-19 16:09
+
+from django.db import migrations, models
+
+
+def backfill_date_decision(apps, schema_editor):
+    # Les décisions antérieures n'ont pas d'horodatage : on reprend la date de demande
+    DemandeCredit = apps.get_model('scoring', 'DemandeCredit')
+    DemandeCredit.objects.filter(
+        statut__in=['ACCEPTEE', 'REFUSEE'], date_decision__isnull=True
+    ).update(date_decision=models.F('date_demande'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0015_demandecredit_modele_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='demandecredit',
+            name='date_decision',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_date_decision, migrations.RunPython.noop),
+    ]
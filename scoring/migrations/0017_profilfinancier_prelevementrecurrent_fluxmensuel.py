@@ -0,0 +1,66 @@
+# Generated by Django 4.2.25 on 2026-10-19 16:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('scoring', '0016_demandecredit_date_decision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfilFinancier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('salaire_mensuel_moyen', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('mois_avec_salaire', models.PositiveIntegerField(default=0)),
+                ('depense_mensuelle_moyenne', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('prelevements_recurrents', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('nb_prelevements_recurrents', models.PositiveIntegerField(default=0)),
+                ('jours_decouvert', models.PositiveIntegerField(default=0)),
+                ('decouvert_depuis', models.DateField(blank=True, null=True)),
+                ('solde_suivi', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('solde_n', models.PositiveIntegerField(default=0)),
+                ('solde_moyenne', models.FloatField(default=0)),
+                ('solde_m2', models.FloatField(default=0)),
+                ('nb_transactions', models.PositiveIntegerField(default=0)),
+                ('premiere_operation', models.DateField(blank=True, null=True)),
+                ('derniere_operation', models.DateTimeField(blank=True, null=True)),
+                ('mis_a_jour_le', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profil_financier', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PrelevementRecurrent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cle', models.CharField(max_length=60)),
+                ('montant', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('dernier_mois', models.DateField()),
+                ('nb_mois', models.PositiveIntegerField(default=1)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prelevements_recurrents', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'cle')},
+            },
+        ),
+        migrations.CreateModel(
+            name='FluxMensuel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mois', models.DateField()),
+                ('salaires', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('depenses', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('nb_operations', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flux_mensuels', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'mois')},
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.25 on 2026-10-19 16:20
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+FORMULES = [
+    ('ESSENTIEL', 'Essentiel', Decimal("0.00"), Decimal("100.00"), 1),
+    ('PLUS', 'Plus', Decimal("9.90"), Decimal("500.00"), 2),
+    ('INFINITE', 'Infinite', Decimal("19.90"), Decimal("1000.00"), 3),
+]
+
+
+def seed_referentiel(apps, schema_editor):
+    Formule = apps.get_model('scoring', 'Formule')
+    VersionReferentiel = apps.get_model('scoring', 'VersionReferentiel')
+    for code, label, prix, decouvert, ordre in FORMULES:
+        Formule.objects.get_or_create(code=code, defaults={
+            'label': label, 'prix': prix, 'decouvert_autorise': decouvert, 'ordre': ordre,
+        })
+    VersionReferentiel.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0017_profilfinancier_prelevementrecurrent_fluxmensuel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Formule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=15, unique=True)),
+                ('label', models.CharField(max_length=50)),
+                ('prix', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('decouvert_autorise', models.DecimalField(decimal_places=2, default=100, max_digits=8)),
+                ('ordre', models.PositiveSmallIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['ordre', 'prix'],
+            },
+        ),
+        migrations.CreateModel(
+            name='VersionReferentiel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=1)),
+                ('mis_a_jour_le', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(seed_referentiel, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.25 on 2026-10-19 16:22
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Q
+from django.utils import timezone
+
+
+def backfill_decouvert(apps, schema_editor):
+    Formule = apps.get_model('scoring', 'Formule')
+    ProfilClient = apps.get_model('scoring', 'ProfilClient')
+    DemandeDecouvert = apps.get_model('scoring', 'DemandeDecouvert')
+    today = timezone.now().date()
+    paliers = dict(Formule.objects.values_list('code', 'decouvert_autorise'))
+    boosts = {}
+    actifs = DemandeDecouvert.objects.filter(statut='ACCEPTEE').filter(
+        Q(expire_le__isnull=True) | Q(expire_le__gte=today)
+    ).order_by('-cree_le')
+    for demande in actifs:
+        boosts.setdefault(demande.user_id, demande.montant_souhaite)
+    profils = list(ProfilClient.objects.all())
+    for profil in profils:
+        base = paliers.get(profil.abonnement, Decimal("100.00"))
+        boost = boosts.get(profil.user_id)
+        profil.decouvert_autorise = max(base, boost) if boost else base
+    ProfilClient.objects.bulk_update(profils, ['decouvert_autorise'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0018_referentiel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profilclient',
+            name='decouvert_autorise',
+            field=models.DecimalField(decimal_places=2, default=100, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='demandedecouvert',
+            name='statut',
+            field=models.CharField(choices=[('EN_ATTENTE', 'En attente'), ('ACCEPTEE', 'Acceptée'), ('REFUSEE', 'Refusée'), ('EXPIREE', 'Expirée')], default='EN_ATTENTE', max_length=15),
+        ),
+        migrations.RunPython(backfill_decouvert, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-19 16:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0019_decouvert_autorise'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='compte',
+            name='alerte_decouvert_le',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.25 on 2026-10-19 16:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0020_compte_alerte_decouvert'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='carte',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='scoring.carte'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='categorie',
+            field=models.CharField(choices=[('ALIM', 'Alimentation & Courses'), ('LOGEMENT', 'Logement & Factures'), ('TRANSPORT', 'Transport'), ('LOISIRS', 'Loisirs & Sorties'), ('SANTE', 'Santé'), ('SHOPPING', 'Shopping'), ('VIREMENT', 'Virement'), ('SALAIRE', 'Salaire & Revenus'), ('RETRAIT', "Retraits d'espèces"), ('AUTRE', 'Autre')], default='AUTRE', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='DepenseCarteJour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.CharField(choices=[('PAIEMENT', 'Paiement'), ('RETRAIT', 'Retrait')], max_length=10)),
+                ('jour', models.DateField()),
+                ('montant', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('carte', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='depenses_jour', to='scoring.carte')),
+            ],
+            options={
+                'unique_together': {('carte', 'operation', 'jour')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CompteurCarte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.CharField(choices=[('PAIEMENT', 'Paiement'), ('RETRAIT', 'Retrait')], max_length=10)),
+                ('jour', models.DateField()),
+                ('montant_jour', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('montant_30j', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('carte', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='compteurs', to='scoring.carte')),
+            ],
+            options={
+                'unique_together': {('carte', 'operation')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.25 on 2026-10-19 16:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0021_compteurs_carte'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sujet', models.CharField(max_length=200)),
+                ('corps', models.TextField()),
+                ('corps_html', models.TextField(blank=True)),
+                ('expediteur', models.CharField(max_length=254)),
+                ('destinataires', models.JSONField(default=list)),
+                ('statut', models.CharField(choices=[('EN_ATTENTE', 'En attente'), ('ENVOYE', 'Envoyé'), ('ECHEC', 'Échec définitif')], default='EN_ATTENTE', max_length=12)),
+                ('tentatives', models.PositiveIntegerField(default=0)),
+                ('prochain_essai', models.DateTimeField(default=django.utils.timezone.now)),
+                ('derniere_erreur', models.TextField(blank=True)),
+                ('cree_le', models.DateTimeField(auto_now_add=True)),
+                ('envoye_le', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['statut', 'prochain_essai'], name='scoring_ema_statut_765479_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.25 on 2026-10-19 16:37
+
+from django.db import migrations, models
+
+
+def seed_sequence(apps, schema_editor):
+    SequenceCompte = apps.get_model('scoring', 'SequenceCompte')
+    SequenceCompte.objects.get_or_create(nom='COMPTE', defaults={'prochain': 1})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0023_taches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenceCompte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=30, unique=True)),
+                ('prochain', models.BigIntegerField(default=1)),
+            ],
+        ),
+        migrations.RunPython(seed_sequence, migrations.RunPython.noop),
+    ]
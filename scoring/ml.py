@@ -0,0 +1,206 @@
+"""
+Registre du modèle de scoring crédit (régression logistique).
+
+Les poids sont entraînés hors requête (commande ``train_credit_model``) et
+stockés en ``.npz`` versionnés dans ``settings.SCORING_MODEL_DIR``. Ils sont
+chargés une seule fois au démarrage (``ScoringConfig.ready``) : avec
+``gunicorn --preload`` les workers forkés les partagent en copy-on-write.
+"""
+import os
+import re
+import tempfile
+import threading
+from math import exp
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MODEL_PREFIX = "credit_model_v"
+_MODEL_RE = re.compile(rf"^{MODEL_PREFIX}(\d+)\.npz$")
+
+_lock = threading.Lock()
+_WEIGHTS = None
+_VERSION = None
+
+
+def model_dir():
+    return Path(getattr(settings, 'SCORING_MODEL_DIR', Path(settings.BASE_DIR) / "scoring" / "ml_models"))
+
+
+def train_credit_model(seed=42, n=600):
+    """Entraîne le modèle logistique sur un dataset synthétique et retourne les poids."""
+    if np is None:
+        return None
+    rng = np.random.default_rng(seed)
+    revenus = rng.uniform(1, 12, size=n)      # k€
+    dti = rng.uniform(10, 70, size=n)         # %
+    ltv = rng.uniform(50, 110, size=n)        # %
+    apport = rng.uniform(0, 0.6, size=n)      # ratio
+
+    # Règle synthétique pour générer un label
+    score = (revenus > 4).astype(int) + (dti < 40).astype(int) + (ltv < 90).astype(int) + (apport > 0.2).astype(int)
+    y = (score >= 3).astype(float)  # 1 si profil jugé "bon" par la règle, sinon 0
+
+    X = np.column_stack([revenus, dti, ltv, apport])
+    X = (X - X.mean(axis=0)) / (X.std(axis=0) + 1e-6)  # normalisation simple
+    X = np.concatenate([np.ones((n, 1)), X], axis=1)   # biais
+    w = np.zeros(X.shape[1])
+    lr = 0.05
+    for _ in range(300):  # descente de gradient rapide
+        z = X @ w
+        pred = 1 / (1 + np.exp(-z))
+        grad = X.T @ (pred - y) / n
+        w -= lr * grad
+    return w
+
+
+def list_versions():
+    """Versions disponibles dans le registre, triées par ordre croissant."""
+    directory = model_dir()
+    if not directory.is_dir():
+        return []
+    versions = []
+    for entry in directory.iterdir():
+        match = _MODEL_RE.match(entry.name)
+        if match:
+            versions.append(int(match.group(1)))
+    return sorted(versions)
+
+
+def model_path(version):
+    return model_dir() / f"{MODEL_PREFIX}{version:04d}.npz"
+
+
+def save_weights(weights, **metadata):
+    """
+    Publie une nouvelle version des poids et retourne son numéro.
+    Écriture dans un fichier temporaire puis lien vers le nom définitif : un
+    lecteur ne voit jamais un fichier partiel et deux publications concurrentes
+    ne peuvent pas écraser la même version.
+    """
+    directory = model_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    metadata.setdefault('trained_at', timezone.now().isoformat())
+    fd, tmp_name = tempfile.mkstemp(dir=directory, suffix=".npz.tmp")
+    try:
+        while True:
+            versions = list_versions()
+            version = (versions[-1] + 1) if versions else 1
+            with open(fd, 'wb', closefd=False) as fh:
+                fh.seek(0)
+                fh.truncate()
+                np.savez(fh, weights=np.asarray(weights, dtype=float), version=version, **metadata)
+            os.chmod(tmp_name, 0o644)
+            try:
+                # Lien exclusif : échoue si un autre entraînement a publié ce numéro entre-temps
+                os.link(tmp_name, model_path(version))
+                return version
+            except FileExistsError:
+                continue
+    finally:
+        os.close(fd)
+        os.unlink(tmp_name)
+
+
+def load_model(version=None):
+    """Retourne ``(poids, métadonnées)`` d'une version (la plus récente par défaut) ou ``(None, {})``."""
+    if np is None:
+        return None, {}
+    if version is None:
+        versions = list_versions()
+        if not versions:
+            return None, {}
+        version = versions[-1]
+    path = model_path(version)
+    if not path.exists():
+        return None, {}
+    with np.load(path, allow_pickle=False) as data:
+        weights = data['weights'].copy()
+        meta = {key: data[key].item() for key in data.files if key != 'weights'}
+    return weights, meta
+
+
+def preload(version=None):
+    """Charge les poids en mémoire (appelé une fois par ``AppConfig.ready``)."""
+    global _WEIGHTS, _VERSION
+    with _lock:
+        weights, meta = load_model(version)
+        if weights is None:
+            # Registre vide : on entraîne en mémoire, hors du chemin des requêtes.
+            weights, meta = train_credit_model(), {'version': 0}
+        _WEIGHTS = weights
+        _VERSION = meta.get('version')
+    return _VERSION
+
+
+def get_weights():
+    if _WEIGHTS is None:
+        preload()
+    return _WEIGHTS
+
+
+def current_version():
+    get_weights()
+    return _VERSION
+
+
+def _features(revenus, dti, ltv, apport_ratio):
+    return [
+        1.0,
+        (revenus - 6) / 3,          # centrage approximatif
+        (dti - 40) / 15,
+        (ltv - 90) / 15,
+        (apport_ratio - 0.2) / 0.15
+    ]
+
+
+def design_matrix(revenus, dti, ltv, apport_ratio):
+    """Matrice (n, 5) des variables normalisées, biais inclus, à partir de tableaux numpy."""
+    cols = [np.asarray(v, dtype=float) for v in (revenus, dti, ltv, apport_ratio)]
+    return np.column_stack([np.ones_like(cols[0])] + _features(*cols)[1:])
+
+
+def sgd_update(weights, X, y, lr=0.05, batch_size=64, epochs=1, l2=0.0, seed=0):
+    """
+    Descente de gradient stochastique par mini-lots sur la log-loss, à partir des
+    poids existants (apprentissage incrémental). Retourne de nouveaux poids.
+    """
+    w = np.array(weights, dtype=float)
+    y = np.asarray(y, dtype=float)
+    rng = np.random.default_rng(seed)
+    n = X.shape[0]
+    for _ in range(epochs):
+        order = rng.permutation(n)
+        for start in range(0, n, batch_size):
+            idx = order[start:start + batch_size]
+            pred = 1 / (1 + np.exp(-(X[idx] @ w)))
+            grad = X[idx].T @ (pred - y[idx]) / len(idx) + l2 * w
+            w -= lr * grad
+    return w
+
+
+def ml_score(revenus, dti, ltv, apport_ratio, weights=None):
+    """Retourne un score 0-100 issu du modèle logistique."""
+    weights = get_weights() if weights is None else weights
+    if weights is None:
+        return None
+    x = np.array(_features(revenus, dti, ltv, apport_ratio))
+    z = float(np.dot(weights, x))
+    prob = 1 / (1 + exp(-z))
+    return int(max(0, min(100, prob * 100)))
+
+
+def ml_score_batch(revenus, dti, ltv, apport_ratio, weights=None):
+    """Version vectorisée de ``ml_score`` : tableaux numpy en entrée, scores entiers en sortie."""
+    weights = get_weights() if weights is None else weights
+    if weights is None:
+        return None
+    X = design_matrix(revenus, dti, ltv, apport_ratio)
+    prob = 1 / (1 + np.exp(-(X @ weights)))
+    return np.clip(prob * 100, 0, 100).astype(int)
@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -17,6 +18,8 @@ class ProfilClient(models.Model):
     abonnement = models.CharField(max_length=15, choices=ABONNEMENT_CHOICES, default='ESSENTIEL')
     prochain_abonnement = models.CharField(max_length=15, choices=ABONNEMENT_CHOICES, null=True, blank=True)
     prochaine_facturation = models.DateField(default=timezone.now)
+    # Découvert effectif (formule + découvert temporaire accepté), tenu à jour par utils.refresh_overdraft_limits
+    decouvert_autorise = models.DecimalField(max_digits=10, decimal_places=2, default=100)
 
     def __str__(self):
         return self.user.username
@@ -53,10 +56,18 @@ class Compte(models.Model):
     numero_compte = models.CharField(max_length=30, unique=True)
     date_creation = models.DateTimeField(auto_now_add=True)
     est_actif = models.BooleanField(default=True)
+    # Dernière alerte d'approche du découvert (anti-doublon, voir scoring.overdraft)
+    alerte_decouvert_le = models.DateTimeField(null=True, blank=True, db_index=True)
     
     def __str__(self):
         return f"{self.get_type_compte_display()} ({self.numero_compte})"
 
+
+# Séquence des numéros de compte, réservée par blocs (voir scoring.iban)
+class SequenceCompte(models.Model):
+    nom = models.CharField(max_length=30, unique=True)
+    prochain = models.BigIntegerField(default=1)
+
 class Carte(models.Model):
     compte = models.ForeignKey(Compte, on_delete=models.CASCADE, related_name='cartes')
     numero_visible = models.CharField(max_length=4)
@@ -70,6 +81,31 @@ class Carte(models.Model):
     def __str__(self):
         return f"Carte **** {self.numero_visible}"
 
+
+# Dépenses carte agrégées par jour (fenêtres glissantes des plafonds) : voir scoring.spend
+OPERATION_CARTE_CHOICES = [('PAIEMENT', 'Paiement'), ('RETRAIT', 'Retrait')]
+
+
+class CompteurCarte(models.Model):
+    carte = models.ForeignKey(Carte, on_delete=models.CASCADE, related_name='compteurs')
+    operation = models.CharField(max_length=10, choices=OPERATION_CARTE_CHOICES)
+    jour = models.DateField()
+    montant_jour = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    montant_30j = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('carte', 'operation')
+
+
+class DepenseCarteJour(models.Model):
+    carte = models.ForeignKey(Carte, on_delete=models.CASCADE, related_name='depenses_jour')
+    operation = models.CharField(max_length=10, choices=OPERATION_CARTE_CHOICES)
+    jour = models.DateField()
+    montant = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('carte', 'operation', 'jour')
+
 # --- BÉNÉFICIAIRES ---
 class Beneficiaire(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='beneficiaires')
@@ -98,6 +134,7 @@ class Transaction(models.Model):
         ('SHOPPING', 'Shopping'),
         ('VIREMENT', 'Virement'),
         ('SALAIRE', 'Salaire & Revenus'),
+        ('RETRAIT', "Retraits d'espèces"),
         ('AUTRE', 'Autre'),
     ]
 
@@ -107,6 +144,94 @@ class Transaction(models.Model):
     date_execution = models.DateTimeField(default=timezone.now)
     type = models.CharField(max_length=10, choices=TYPE_CHOICES)
     categorie = models.CharField(max_length=20, choices=CATEGORIE_CHOICES, default='AUTRE')
+    carte = models.ForeignKey(Carte, on_delete=models.SET_NULL, null=True, blank=True, related_name='transactions')
+
+# --- RÉFÉRENTIEL (formules, produits, types) : lu via scoring.catalogue ---
+class Formule(models.Model):
+    code = models.CharField(max_length=15, unique=True)
+    label = models.CharField(max_length=50)
+    prix = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    decouvert_autorise = models.DecimalField(max_digits=8, decimal_places=2, default=100)
+    ordre = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ['ordre', 'prix']
+
+    def __str__(self):
+        return self.label
+
+
+class VersionReferentiel(models.Model):
+    """Ligne unique incrémentée à chaque modification du référentiel (invalidation des caches)."""
+    version = models.PositiveBigIntegerField(default=1)
+    mis_a_jour_le = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Référentiel v{self.version}"
+
+
+# --- INDICATEURS FINANCIERS (mis à jour à chaque transaction) ---
+class ProfilFinancier(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profil_financier')
+    salaire_mensuel_moyen = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    mois_avec_salaire = models.PositiveIntegerField(default=0)
+    depense_mensuelle_moyenne = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    prelevements_recurrents = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    nb_prelevements_recurrents = models.PositiveIntegerField(default=0)
+    jours_decouvert = models.PositiveIntegerField(default=0)
+    decouvert_depuis = models.DateField(null=True, blank=True)
+    # Solde reconstitué et statistiques de Welford (volatilité du solde après chaque opération)
+    solde_suivi = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    solde_n = models.PositiveIntegerField(default=0)
+    solde_moyenne = models.FloatField(default=0)
+    solde_m2 = models.FloatField(default=0)
+    nb_transactions = models.PositiveIntegerField(default=0)
+    premiere_operation = models.DateField(null=True, blank=True)
+    derniere_operation = models.DateTimeField(null=True, blank=True)
+    mis_a_jour_le = models.DateTimeField(auto_now=True)
+
+    @property
+    def volatilite_solde(self):
+        return (self.solde_m2 / (self.solde_n - 1)) ** 0.5 if self.solde_n > 1 else 0.0
+
+    def jours_decouvert_total(self, today=None):
+        """Jours de découvert cumulés, période en cours comprise."""
+        if self.decouvert_depuis is None:
+            return self.jours_decouvert
+        today = today or timezone.now().date()
+        return self.jours_decouvert + max(0, (today - self.decouvert_depuis).days)
+
+    def __str__(self):
+        return f"Indicateurs {self.user.username}"
+
+
+class FluxMensuel(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='flux_mensuels')
+    mois = models.DateField()
+    salaires = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    depenses = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    nb_operations = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'mois')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.mois:%m/%Y}"
+
+
+class PrelevementRecurrent(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='prelevements_recurrents')
+    cle = models.CharField(max_length=60)
+    montant = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    dernier_mois = models.DateField()
+    nb_mois = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('user', 'cle')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.cle}"
+
 
 # --- SIMULATION & CRÉDIT ---
 class ProduitPret(models.Model):
@@ -163,6 +288,8 @@ class DemandeCredit(models.Model):
     soumise = models.BooleanField(default=False)
     echeances_payees = models.IntegerField(default=0)
     dernier_prelevement = models.DateField(null=True, blank=True)
+    modele_version = models.PositiveIntegerField(null=True, blank=True)
+    date_decision = models.DateTimeField(null=True, blank=True, db_index=True)
 
     def __str__(self):
         return f"{self.user.username} - {self.produit.nom if self.produit else 'Produit inconnu'} ({self.statut})"
@@ -173,6 +300,7 @@ class DemandeDecouvert(models.Model):
         ('EN_ATTENTE', 'En attente'),
         ('ACCEPTEE', 'Acceptée'),
         ('REFUSEE', 'Refusée'),
+        ('EXPIREE', 'Expirée'),
     ]
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='demandes_decouvert')
@@ -210,3 +338,59 @@ class Notification(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.titre}"
+
+
+# --- EMAILS SORTANTS (écrits avec l'événement métier, envoyés par deliver_emails) ---
+class EmailOutbox(models.Model):
+    STATUT_CHOICES = [
+        ('EN_ATTENTE', 'En attente'),
+        ('ENVOYE', 'Envoyé'),
+        ('ECHEC', 'Échec définitif'),
+    ]
+    sujet = models.CharField(max_length=200)
+    corps = models.TextField()
+    corps_html = models.TextField(blank=True)
+    expediteur = models.CharField(max_length=254)
+    destinataires = models.JSONField(default=list)
+    statut = models.CharField(max_length=12, choices=STATUT_CHOICES, default='EN_ATTENTE')
+    tentatives = models.PositiveIntegerField(default=0)
+    prochain_essai = models.DateTimeField(default=timezone.now)
+    derniere_erreur = models.TextField(blank=True)
+    cree_le = models.DateTimeField(auto_now_add=True)
+    envoye_le = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['statut', 'prochain_essai'])]
+
+    def __str__(self):
+        return f"{self.sujet} → {', '.join(self.destinataires)} ({self.get_statut_display()})"
+
+
+# --- TÂCHES EN ARRIÈRE-PLAN (file en base, traitée par run_worker) ---
+class Tache(models.Model):
+    STATUT_CHOICES = [
+        ('EN_ATTENTE', 'En attente'),
+        ('EN_COURS', 'En cours'),
+        ('TERMINEE', 'Terminée'),
+        ('ECHEC', 'Échec'),
+    ]
+    nom = models.CharField(max_length=50)
+    parametres = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    statut = models.CharField(max_length=12, choices=STATUT_CHOICES, default='EN_ATTENTE')
+    tentatives = models.PositiveIntegerField(default=0)
+    max_tentatives = models.PositiveIntegerField(default=3)
+    prochain_essai = models.DateTimeField(default=timezone.now)
+    bail_expire = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    resultat = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    erreur = models.TextField(blank=True)
+    cree_par = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='taches')
+    cree_le = models.DateTimeField(auto_now_add=True)
+    debut = models.DateTimeField(null=True, blank=True)
+    fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['statut', 'prochain_essai'])]
+
+    def __str__(self):
+        return f"{self.nom} #{self.pk} ({self.get_statut_display()})"
@@ -0,0 +1,153 @@
+"""
+Ouverture des clients : profil, compte courant, carte et cadeau de bienvenue.
+
+``onboard_customer`` sert l'inscription en ligne (un client, signaux Django
+normaux). ``onboard_bulk`` sert les reprises de clientèle (commande
+``import_customers``) : mêmes règles, mais par lots de ``bulk_create`` avec une
+réservation d'IBAN par lot. Les indicateurs financiers des clients importés sont
+reconstitués à leur première opération (``features.record_transaction``).
+"""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from . import catalogue
+from .iban import allocate_iban, allocate_ibans
+from .models import Carte, Compte, ProfilClient, Transaction
+
+CADEAU_BIENVENUE = Decimal("100.00")
+LIBELLE_CADEAU = "Cadeau de bienvenue Banquise"
+VALIDITE_CARTE = timedelta(days=365 * 4)
+
+
+def _profil_defaults(birth_date, birth_city, abonnement, today):
+    return {
+        'date_de_naissance': birth_date,
+        'ville_naissance': birth_city or '',
+        'abonnement': abonnement,
+        'prochain_abonnement': abonnement,
+        'prochaine_facturation': today + timedelta(days=30),
+    }
+
+
+def _carte(compte, now):
+    return Carte(
+        compte=compte,
+        numero_visible=str(random.randint(1000, 9999)),
+        date_expiration=(now + VALIDITE_CARTE).date(),
+        est_bloquee=False,
+        sans_contact_actif=True,
+        paiement_etranger_actif=False,
+    )
+
+
+def _cadeau(compte, montant):
+    return Transaction(compte=compte, montant=montant, libelle=LIBELLE_CADEAU, type='CREDIT', categorie='SALAIRE')
+
+
+def onboard_customer(user, birth_date=None, birth_city='', abonnement='ESSENTIEL', cadeau=CADEAU_BIENVENUE):
+    """Crée profil, compte courant, carte et cadeau de bienvenue s'ils n'existent pas encore."""
+    now = timezone.now()
+    # Numéro réservé avant la transaction : servi par le bloc de séquence local
+    numero = None if Compte.objects.filter(user=user).exists() else allocate_iban()
+    with transaction.atomic():
+        profil, _ = ProfilClient.objects.get_or_create(
+            user=user, defaults=_profil_defaults(birth_date, birth_city, abonnement, now.date()),
+        )
+        if Compte.objects.filter(user=user).exists():
+            return profil
+        compte = Compte.objects.create(
+            user=user, type_compte='COURANT', solde=cadeau, numero_compte=numero or allocate_iban(), est_actif=True,
+        )
+        _carte(compte, now).save()
+        if cadeau:
+            _cadeau(compte, cadeau).save()
+    return profil
+
+
+def _parse_date(value):
+    if not value or isinstance(value, date):
+        return value or None
+    return date.fromisoformat(str(value).strip()[:10])
+
+
+def clean_row(row, plans):
+    """Normalise une ligne d'import ; lève ``ValueError`` si elle est inutilisable."""
+    username = (row.get('username') or '').strip()
+    email = (row.get('email') or '').strip().lower()
+    if not username or not email or '@' not in email:
+        raise ValueError("username et email sont obligatoires")
+    abonnement = (row.get('abonnement') or 'ESSENTIEL').strip().upper()
+    if abonnement not in plans:
+        raise ValueError(f"formule inconnue : {abonnement}")
+    password = row.get('password_hash') or ''
+    if password:
+        identify_hasher(password)  # hash Django exporté tel quel, jamais de mot de passe en clair
+    return {
+        'username': username[:150],
+        'email': email,
+        'first_name': (row.get('first_name') or '').strip()[:150],
+        'last_name': (row.get('last_name') or '').strip()[:150],
+        'password': password or make_password(None),
+        'birth_date': _parse_date(row.get('birth_date')),
+        'birth_city': (row.get('birth_city') or '').strip()[:100],
+        'abonnement': abonnement,
+    }
+
+
+def onboard_bulk(rows, cadeau=CADEAU_BIENVENUE, dry_run=False):
+    """
+    Ouvre un lot de clients déjà nettoyés (``clean_row``) en quelques requêtes.
+    Les identifiants ou emails déjà présents (en base ou dans le lot) sont ignorés.
+    Retourne ``(créés, ignorés)``.
+    """
+    usernames = {r['username'] for r in rows}
+    emails = {r['email'] for r in rows}
+    pris_u = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    pris_e = set(User.objects.annotate(email_min=Lower('email')).filter(email_min__in=emails).values_list('email_min', flat=True))
+    retenus = []
+    for row in rows:
+        if row['username'] in pris_u or row['email'] in pris_e:
+            continue
+        pris_u.add(row['username'])
+        pris_e.add(row['email'])
+        retenus.append(row)
+    ignores = len(rows) - len(retenus)
+    if dry_run or not retenus:
+        return len(retenus), ignores
+
+    now = timezone.now()
+    with transaction.atomic():
+        User.objects.bulk_create([
+            User(
+                username=r['username'], email=r['email'], first_name=r['first_name'], last_name=r['last_name'],
+                password=r['password'], is_active=True, date_joined=now,
+            )
+            for r in retenus
+        ])
+        # Relecture des ids : indépendante du support de RETURNING par le moteur
+        user_ids = dict(User.objects.filter(username__in=[r['username'] for r in retenus]).values_list('username', 'id'))
+        ProfilClient.objects.bulk_create([
+            ProfilClient(
+                user_id=user_ids[r['username']],
+                decouvert_autorise=catalogue.decouvert_autorise(r['abonnement']),
+                **_profil_defaults(r['birth_date'], r['birth_city'], r['abonnement'], now.date()),
+            )
+            for r in retenus
+        ])
+        comptes = Compte.objects.bulk_create([
+            Compte(user_id=user_ids[r['username']], type_compte='COURANT', solde=cadeau, numero_compte=numero, est_actif=True)
+            for r, numero in zip(retenus, allocate_ibans(len(retenus)))
+        ])
+        if comptes and comptes[0].pk is None:
+            comptes = list(Compte.objects.filter(numero_compte__in=[c.numero_compte for c in comptes]))
+        Carte.objects.bulk_create([_carte(c, now) for c in comptes])
+        if cadeau:
+            Transaction.objects.bulk_create([_cadeau(c, cadeau) for c in comptes])
+    return len(retenus), ignores
@@ -0,0 +1,121 @@
+"""
+Boîte d'envoi transactionnelle des emails.
+
+Les vues et commandes n'appellent plus le serveur SMTP : ``enqueue_email`` écrit
+une ligne ``EmailOutbox`` dans la transaction de l'événement métier (l'email
+n'existe que si l'inscription, le renvoi de code... est bien enregistré).
+``deliver_pending`` (commande ``deliver_emails``) vide ensuite la file par lots
+sur une seule connexion SMTP réutilisée, avec reprise et délai exponentiel.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+MAX_TENTATIVES = 6
+DELAI_BASE = timedelta(minutes=1)       # 1, 2, 4, 8, 16 min puis échec définitif
+DELAI_MAX = timedelta(hours=1)
+BAIL = timedelta(minutes=5)             # lot réservé par un worker, repris s'il s'arrête
+
+
+def enqueue_email(subject, message, recipients, from_email=None, html_message=''):
+    """Met un email en file (à appeler dans la transaction de l'événement)."""
+    return EmailOutbox.objects.create(
+        sujet=subject[:200],
+        corps=message,
+        corps_html=html_message or '',
+        expediteur=from_email or getattr(settings, 'DEFAULT_FROM_EMAIL', 'webmaster@localhost'),
+        destinataires=[r for r in recipients if r],
+    )
+
+
+def _delai(tentatives):
+    return min(DELAI_MAX, DELAI_BASE * (2 ** max(0, tentatives - 1)))
+
+
+def _claim(batch_size, now):
+    """Réserve un lot d'emails dus (les autres workers sautent les lignes verrouillées)."""
+    with transaction.atomic():
+        rows = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(statut='EN_ATTENTE', prochain_essai__lte=now)
+            .order_by('prochain_essai', 'id')[:batch_size]
+        )
+        if rows:
+            EmailOutbox.objects.filter(id__in=[r.id for r in rows]).update(prochain_essai=now + BAIL)
+    return rows
+
+
+def _echec(row, exc, now):
+    row.tentatives += 1
+    row.derniere_erreur = f"{type(exc).__name__}: {exc}"[:1000]
+    if row.tentatives >= MAX_TENTATIVES:
+        row.statut = 'ECHEC'
+        logger.error("Email %s abandonné après %s tentatives : %s", row.pk, row.tentatives, row.derniere_erreur)
+    row.prochain_essai = now + _delai(row.tentatives)
+
+
+def _message(row, connection):
+    msg = EmailMultiAlternatives(row.sujet, row.corps, row.expediteur, row.destinataires, connection=connection)
+    if row.corps_html:
+        msg.attach_alternative(row.corps_html, 'text/html')
+    return msg
+
+
+def deliver_pending(batch_size=50, max_batches=None, now=None):
+    """
+    Envoie les emails dus par lots sur une connexion ouverte une seule fois.
+    Retourne ``{'envoyes', 'reportes', 'abandonnes'}``.
+    """
+    now = now or timezone.now()
+    stats = {'envoyes': 0, 'reportes': 0, 'abandonnes': 0}
+    connection = None
+    batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            rows = _claim(batch_size, now)
+            if not rows:
+                break
+            batches += 1
+            if connection is None:
+                connection = get_connection(fail_silently=False)
+            try:
+                connection.open()
+            except Exception as exc:
+                # Serveur injoignable : tout le lot est reporté
+                for row in rows:
+                    _echec(row, exc, now)
+            else:
+                for row in rows:
+                    try:
+                        _message(row, connection).send()
+                    except Exception as exc:
+                        _echec(row, exc, now)
+                    else:
+                        row.statut, row.envoye_le, row.derniere_erreur = 'ENVOYE', timezone.now(), ''
+            EmailOutbox.objects.bulk_update(
+                rows, ['statut', 'tentatives', 'prochain_essai', 'derniere_erreur', 'envoye_le'],
+            )
+            for row in rows:
+                if row.statut == 'ENVOYE':
+                    stats['envoyes'] += 1
+                elif row.statut == 'ECHEC':
+                    stats['abandonnes'] += 1
+                else:
+                    stats['reportes'] += 1
+    finally:
+        if connection is not None:
+            connection.close()
+    return stats
+
+
+def purge_sent(days=30):
+    """Supprime les emails envoyés depuis plus de ``days`` jours."""
+    return EmailOutbox.objects.filter(statut='ENVOYE', envoye_le__lt=timezone.now() - timedelta(days=days)).delete()[0]
@@ -0,0 +1,81 @@
+"""
+Contrôle du découvert sur un ensemble de comptes.
+
+Les décisions (blocage, déblocage, alerte préventive) sont calculées en mémoire
+à partir d'une seule lecture des comptes et de leurs cartes ; les mises à jour
+et notifications sont ensuite appliquées en masse. L'anti-doublon des alertes
+repose sur ``Compte.alerte_decouvert_le`` plutôt que sur le titre des notifications.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.urls import reverse
+from django.utils import timezone
+
+from . import cards, utils
+from .models import Carte, Compte, Notification
+
+SEUIL_ALERTE = Decimal("0.8")          # alerte à 80 % du découvert autorisé
+DELAI_ALERTE = timedelta(hours=12)
+
+
+def enforce_overdraft_bulk(comptes, now=None):
+    """
+    Bloque/débloque les cartes et envoie les alertes pour un ensemble de comptes
+    (instances ou ids). Retourne ``{'bloques', 'debloques', 'alertes'}`` (ids de comptes).
+    """
+    now = now or timezone.now()
+    ids = [c.pk if isinstance(c, Compte) else c for c in comptes]
+    if not ids:
+        return {'bloques': [], 'debloques': [], 'alertes': []}
+    rows = Compte.objects.filter(id__in=ids).select_related('user__profil').only(
+        'id', 'solde', 'alerte_decouvert_le', 'user__id', 'user__profil__decouvert_autorise',
+    )
+    cartes = {}
+    for carte_id, compte_id, bloquee in Carte.objects.filter(compte_id__in=ids).values_list('id', 'compte_id', 'est_bloquee'):
+        cartes.setdefault(compte_id, []).append((carte_id, bloquee))
+
+    a_bloquer, a_debloquer, alertes = [], [], []
+    comptes_bloques, comptes_debloques = [], []
+    notifications = []
+    url_dashboard, url_cartes = reverse('dashboard'), reverse('cartes')
+    for compte in rows:
+        limite = utils.overdraft_limit_for_user(compte.user)
+        solde = compte.solde
+        if solde <= -limite * SEUIL_ALERTE and (
+            compte.alerte_decouvert_le is None or compte.alerte_decouvert_le < now - DELAI_ALERTE
+        ):
+            alertes.append(compte.id)
+            notifications.append(Notification(
+                user_id=compte.user_id, titre="Alerte découvert", type='INFO', url=url_dashboard,
+                contenu=f"Votre solde ({solde} €) s'approche de la limite autorisée ({-limite} €).",
+            ))
+        bloque = solde < -limite
+        changements = [cid for cid, etat in cartes.get(compte.id, []) if etat != bloque]
+        if not changements:
+            continue
+        if bloque:
+            a_bloquer.extend(changements)
+            comptes_bloques.append(compte.id)
+            notifications.append(Notification(
+                user_id=compte.user_id, titre="Découvert dépassé", type='TRANSACTION', url=url_cartes,
+                contenu="Vos cartes sont bloquées jusqu'au retour en dessous du découvert autorisé.",
+            ))
+        else:
+            a_debloquer.extend(changements)
+            comptes_debloques.append(compte.id)
+            notifications.append(Notification(
+                user_id=compte.user_id, titre="Cartes débloquées", type='TRANSACTION', url=url_cartes,
+                contenu="Votre solde est revenu au-dessus du découvert autorisé.",
+            ))
+
+    if a_bloquer:
+        Carte.objects.filter(id__in=a_bloquer).update(est_bloquee=True)
+    if a_debloquer:
+        Carte.objects.filter(id__in=a_debloquer).update(est_bloquee=False)
+    cards.invalidate(a_bloquer + a_debloquer)
+    if alertes:
+        Compte.objects.filter(id__in=alertes).update(alerte_decouvert_le=now)
+    if notifications:
+        Notification.objects.bulk_create(notifications)
+    return {'bloques': comptes_bloques, 'debloques': comptes_debloques, 'alertes': alertes}
@@ -0,0 +1,176 @@
+"""
+Instrumentation des requêtes : latence, nombre et durée des requêtes SQL et durée
+de rendu des templates, agrégés par nom d'URL dans des histogrammes en mémoire.
+
+``PerfMiddleware`` n'instrumente qu'une fraction des requêtes
+(``PERF_SAMPLE_RATE``) : une requête non échantillonnée ne coûte qu'un tirage
+aléatoire. Les histogrammes sont propres à chaque process (un worker gunicorn a
+les siens) et repartent de zéro au redémarrage. Consultation : Admin dashboard >
+Performances.
+"""
+import os
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+# Bornes hautes des seaux de latence, en millisecondes (dernier seau : au-delà)
+BORNES_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+NON_RESOLUE = '(non résolue)'
+
+_lock = threading.Lock()
+_stats = {}
+_depuis = timezone.now()
+_courante = ContextVar('perf_mesure', default=None)
+
+
+class Mesure:
+    __slots__ = ('requetes', 'sql', 'templates', 'profondeur')
+
+    def __init__(self):
+        self.requetes = 0
+        self.sql = 0.0
+        self.templates = 0.0
+        self.profondeur = 0
+
+
+class Histogramme:
+    __slots__ = ('n', 'seaux', 'latence', 'latence_max', 'requetes', 'requetes_max', 'sql', 'templates')
+
+    def __init__(self):
+        self.n = 0
+        self.seaux = [0] * (len(BORNES_MS) + 1)
+        self.latence = self.latence_max = self.sql = self.templates = 0.0
+        self.requetes = self.requetes_max = 0
+
+    def ajouter(self, latence_ms, mesure):
+        i = 0
+        while i < len(BORNES_MS) and latence_ms > BORNES_MS[i]:
+            i += 1
+        self.seaux[i] += 1
+        self.n += 1
+        self.latence += latence_ms
+        self.latence_max = max(self.latence_max, latence_ms)
+        self.requetes += mesure.requetes
+        self.requetes_max = max(self.requetes_max, mesure.requetes)
+        self.sql += mesure.sql * 1000
+        self.templates += mesure.templates * 1000
+
+    def quantile(self, q):
+        """Borne haute du seau contenant le quantile ``q`` (en ms)."""
+        rang, cumul = q * self.n, 0
+        for i, compte in enumerate(self.seaux):
+            cumul += compte
+            if compte and cumul >= rang:
+                return BORNES_MS[i] if i < len(BORNES_MS) else round(self.latence_max)
+        return round(self.latence_max)
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    mesure = _courante.get()
+    if mesure is None:
+        return execute(sql, params, many, context)
+    debut = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        mesure.requetes += 1
+        mesure.sql += time.perf_counter() - debut
+
+
+def install():
+    """Chronomètre le rendu des templates Django (une seule fois par process)."""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'perf', False):
+        return
+    original = Template.render
+
+    def render(self, context=None, request=None):
+        mesure = _courante.get()
+        if mesure is None or mesure.profondeur:
+            return original(self, context, request)
+        mesure.profondeur += 1
+        debut = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            mesure.profondeur -= 1
+            mesure.templates += time.perf_counter() - debut
+
+    render.perf = True
+    Template.render = render
+
+
+def echantillonner():
+    taux = getattr(settings, 'PERF_SAMPLE_RATE', 0)
+    return taux >= 1 or (taux > 0 and random.random() < taux)
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else NON_RESOLUE
+
+
+@contextmanager
+def mesurer(request):
+    """Mesure la requête en cours puis l'ajoute à l'histogramme de sa route."""
+    mesure = Mesure()
+    token = _courante.set(mesure)
+    debut = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(_sql_wrapper))
+            yield mesure
+    finally:
+        latence_ms = (time.perf_counter() - debut) * 1000
+        _courante.reset(token)
+        route = _route(request)
+        with _lock:
+            histo = _stats.get(route)
+            if histo is None:
+                histo = _stats[route] = Histogramme()
+            histo.ajouter(latence_ms, mesure)
+
+
+def rapport():
+    """Statistiques par route, les plus coûteuses (temps total) en premier."""
+    lignes = []
+    with _lock:
+        for route, h in _stats.items():
+            lignes.append({
+                'route': route,
+                'n': h.n,
+                'total_ms': round(h.latence),
+                'moyenne_ms': round(h.latence / h.n, 1),
+                'p50_ms': h.quantile(0.50),
+                'p95_ms': h.quantile(0.95),
+                'p99_ms': h.quantile(0.99),
+                'max_ms': round(h.latence_max, 1),
+                'requetes_moy': round(h.requetes / h.n, 1),
+                'requetes_max': h.requetes_max,
+                'sql_moy_ms': round(h.sql / h.n, 1),
+                'templates_moy_ms': round(h.templates / h.n, 1),
+            })
+    return sorted(lignes, key=lambda l: l['total_ms'], reverse=True)
+
+
+def infos():
+    return {
+        'depuis': _depuis,
+        'pid': os.getpid(),
+        'taux': getattr(settings, 'PERF_SAMPLE_RATE', 0),
+    }
+
+
+def reset():
+    global _depuis
+    with _lock:
+        _stats.clear()
+        _depuis = timezone.now()
@@ -0,0 +1,231 @@
+"""
+Jeu de données de volume : clients, comptes, cartes, historique de transactions,
+bénéficiaires, notifications, demandes de crédit et messages support.
+
+Tout est tiré d'un ``random.Random(seed)`` : deux exécutions avec la même graine
+produisent les mêmes clients et les mêmes opérations (hors IBAN et numéros de
+carte, alloués par les services habituels). L'ouverture passe par
+``onboarding.onboard_bulk`` ; le reste est écrit par ``bulk_create`` en lots.
+"""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import catalogue
+from .iban import cle_iban, cle_rib
+from .models import (Beneficiaire, Carte, Compte, DemandeCredit,
+                     MessageSupport, Notification, ProduitPret, Transaction,
+                     TypeEmploi, TypeLogement)
+from .onboarding import CADEAU_BIENVENUE, onboard_bulk
+
+PRENOMS = ("Camille", "Louis", "Emma", "Hugo", "Léa", "Jules", "Chloé", "Lucas", "Manon", "Nathan", "Inès", "Arthur")
+NOMS = ("Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand", "Leroy", "Moreau", "Simon")
+VILLES = ("Paris", "Lyon", "Marseille", "Toulouse", "Nantes", "Lille", "Bordeaux", "Rennes", "Strasbourg")
+FORMULES = (('ESSENTIEL', 70), ('PLUS', 22), ('INFINITE', 8))
+DEPENSES = (
+    ('ALIM', "Carrefour Market", 8, 120),
+    ('ALIM', "Monoprix", 5, 80),
+    ('LOGEMENT', "EDF Électricité", 40, 160),
+    ('LOGEMENT', "Loyer", 450, 1400),
+    ('TRANSPORT', "SNCF", 15, 140),
+    ('TRANSPORT', "RATP Navigo", 86, 86),
+    ('LOISIRS', "Cinéma UGC", 9, 30),
+    ('SANTE', "Pharmacie", 4, 60),
+    ('SHOPPING', "Fnac", 15, 250),
+    ('RETRAIT', "Retrait DAB", 20, 200),
+    ('AUTRE', "Paiement divers", 3, 90),
+)
+PART_SALAIRES = 0.06
+PART_DEBITEURS = 0.05
+DOMAINE = 'seed.banquise.test'
+
+
+def _pondere(rng, options):
+    return rng.choices([o for o, _ in options], weights=[w for _, w in options])[0]
+
+
+def _lots(iterable, size):
+    lot = []
+    for item in iterable:
+        lot.append(item)
+        if len(lot) >= size:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+
+def _clients(rng, users, prefix, password):
+    for i in range(users):
+        prenom, nom = rng.choice(PRENOMS), rng.choice(NOMS)
+        yield {
+            'username': f"{prefix}{i:07d}",
+            'email': f"{prefix}{i:07d}@{DOMAINE}",
+            'first_name': prenom,
+            'last_name': nom,
+            'password': password,
+            'birth_date': date(1950, 1, 1) + timedelta(days=rng.randrange(365 * 55)),
+            'birth_city': rng.choice(VILLES),
+            'abonnement': _pondere(rng, FORMULES),
+        }
+
+
+def _historique(rng, compte_id, carte_id, n, now, days):
+    """
+    ``n`` opérations d'un compte : salaires et dépenses, ramenées à ~85 % des revenus
+    (``PART_DEBITEURS`` des comptes dépensent davantage et finissent à découvert).
+    """
+    if not n:
+        return []
+
+    def _date():
+        return now - timedelta(seconds=rng.randrange(days * 86400))
+
+    nb_salaires = max(1, round(n * PART_SALAIRES))
+    salaire = Decimal(rng.randrange(150000, 450000)) / 100
+    ops = [
+        Transaction(compte_id=compte_id, montant=salaire, libelle="Salaire", type='CREDIT',
+                    categorie='SALAIRE', date_execution=_date())
+        for _ in range(nb_salaires)
+    ]
+    depenses = []
+    for _ in range(n - nb_salaires):
+        categorie, libelle, bas, haut = rng.choice(DEPENSES)
+        depenses.append((categorie, libelle, Decimal(rng.randrange(bas * 100, haut * 100 + 1)) / 100))
+    total = sum(montant for _, _, montant in depenses)
+    cible = salaire * nb_salaires * (Decimal("1.10") if rng.random() < PART_DEBITEURS else Decimal("0.85"))
+    facteur = min(Decimal(1), cible / total) if total else Decimal(1)
+    for categorie, libelle, montant in depenses:
+        montant = max(Decimal("0.01"), (montant * facteur).quantize(Decimal("0.01")))
+        ops.append(Transaction(
+            compte_id=compte_id, montant=-montant, libelle=libelle, type='DEBIT', categorie=categorie,
+            date_execution=_date(), carte_id=carte_id if categorie != 'LOGEMENT' else None,
+        ))
+    return ops
+
+
+def _iban_externe(rng):
+    banque, guichet, compte = f"{rng.randrange(10000, 40000)}", f"{rng.randrange(100000):05d}", f"{rng.randrange(10 ** 11):011d}"
+    bban = f"{banque}{guichet}{compte}{cle_rib(banque, guichet, compte):02d}"
+    return f"FR{cle_iban('FR', bban):02d}{bban}"
+
+
+def _reference():
+    produits = list(ProduitPret.objects.order_by('id'))
+    if not produits:
+        produits = [ProduitPret.objects.create(nom="Prêt personnel", taux_ref=Decimal("3.50"))]
+    emplois = list(TypeEmploi.objects.order_by('id')) or [TypeEmploi.objects.create(nom="CDI")]
+    logements = list(TypeLogement.objects.order_by('id')) or [TypeLogement.objects.create(nom="Appartement")]
+    return produits, emplois, logements
+
+
+def seed_bank(users=1000, transactions=100_000, seed=42, days=180, prefix='seed', password='banquise',
+              chunk_size=5000, log=None):
+    """
+    Génère ``users`` clients et ``transactions`` opérations réparties entre leurs comptes.
+    Lève ``ValueError`` si des clients de ce préfixe existent déjà. Retourne un dict de comptages.
+    """
+    if User.objects.filter(username__startswith=prefix, email__endswith='@' + DOMAINE).exists():
+        raise ValueError(f"Des clients « {prefix} » existent déjà : choisir un autre préfixe.")
+    log = log or (lambda message: None)
+    rng = random.Random(seed)
+    now = timezone.now()
+    hashed = make_password(password)
+    catalogue.plans()
+    stats = {'clients': 0, 'transactions': 0, 'beneficiaires': 0, 'notifications': 0, 'demandes': 0, 'messages': 0}
+
+    for lot in _lots(_clients(rng, users, prefix, hashed), chunk_size):
+        crees, _ = onboard_bulk(lot, cadeau=CADEAU_BIENVENUE)
+        stats['clients'] += crees
+    log(f"{stats['clients']} client(s) ouvert(s).")
+
+    user_ids = list(
+        User.objects.filter(username__startswith=prefix, email__endswith='@' + DOMAINE)
+        .order_by('id').values_list('id', flat=True)
+    )
+    if not user_ids:
+        return stats
+    comptes = list(
+        Compte.objects.filter(user_id__in=user_ids, type_compte='COURANT').order_by('id').values_list('id', 'user_id')
+    )
+    carte_par_compte = dict(
+        Carte.objects.filter(compte_id__in=[c for c, _ in comptes]).order_by('id').values_list('compte_id', 'id')
+    )
+
+    # Transactions : réparties équitablement entre les comptes, soldes tenus en mémoire
+    soldes = {}
+    ids = [c for c, _ in comptes]
+    part, reste = divmod(transactions, len(ids))
+
+    def _operations():
+        for rang, compte_id in enumerate(ids):
+            ops = _historique(rng, compte_id, carte_par_compte.get(compte_id), part + (rang < reste), now, days)
+            soldes[compte_id] = sum(op.montant for op in ops)
+            yield from ops
+
+    for lot in _lots(_operations(), chunk_size):
+        Transaction.objects.bulk_create(lot, batch_size=chunk_size)
+        stats['transactions'] += len(lot)
+        if stats['transactions'] % (chunk_size * 20) == 0:
+            log(f"{stats['transactions']} transaction(s)…")
+    for lot in _lots(soldes.items(), chunk_size):
+        with transaction.atomic():
+            maj = Compte.objects.in_bulk([compte_id for compte_id, _ in lot])
+            for compte_id, delta in lot:
+                maj[compte_id].solde += delta
+            Compte.objects.bulk_update(list(maj.values()), ['solde'])
+    log(f"{stats['transactions']} transaction(s) écrite(s).")
+
+    produits, emplois, logements = _reference()
+    annexes = {'beneficiaires': [], 'notifications': [], 'demandes': [], 'messages': []}
+
+    def _vider(force=False):
+        for cle, model in (('beneficiaires', Beneficiaire), ('notifications', Notification),
+                           ('demandes', DemandeCredit), ('messages', MessageSupport)):
+            if annexes[cle] and (force or len(annexes[cle]) >= chunk_size):
+                model.objects.bulk_create(annexes[cle], batch_size=chunk_size)
+                stats[cle] += len(annexes[cle])
+                annexes[cle] = []
+
+    for user_id in user_ids:
+        for n in range(rng.randrange(4)):
+            annexes['beneficiaires'].append(Beneficiaire(
+                user_id=user_id, nom=f"{rng.choice(PRENOMS)} {rng.choice(NOMS)}", surnom=f"Contact {n + 1}",
+                iban=_iban_externe(rng),
+            ))
+        for _ in range(rng.randrange(6)):
+            annexes['notifications'].append(Notification(
+                user_id=user_id, titre="Paiement carte", contenu="Un paiement a été enregistré sur votre compte.",
+                type='TRANSACTION', est_lu=rng.random() < 0.6,
+            ))
+        if rng.random() < 0.15:
+            montant = rng.randrange(5, 300) * 1000
+            statut = _pondere(rng, (('EN_ATTENTE', 50), ('ACCEPTEE', 30), ('REFUSEE', 20)))
+            annexes['demandes'].append(DemandeCredit(
+                user_id=user_id, produit=rng.choice(produits), montant_souhaite=montant,
+                duree_souhaitee_annees=rng.choice([5, 10, 15, 20, 25]), apport_personnel=montant // 10,
+                revenus_mensuels=rng.randrange(1500, 9000), loyer_actuel=rng.randrange(0, 1500),
+                dettes_mensuelles=rng.randrange(0, 800), enfants_a_charge=rng.randrange(4),
+                emploi_snapshot=rng.choice(emplois), logement_snapshot=rng.choice(logements),
+                score_calcule=rng.randrange(20, 100), statut=statut, soumise=True,
+                ia_decision=statut if statut != 'EN_ATTENTE' else None,
+                date_decision=now if statut != 'EN_ATTENTE' else None,
+            ))
+        if rng.random() < 0.05:
+            for k in range(rng.randrange(1, 4)):
+                annexes['messages'].append(MessageSupport(
+                    user_id=user_id, contenu=f"Question n°{k + 1} sur mon compte.", est_admin=False,
+                    est_lu=rng.random() < 0.5,
+                ))
+        _vider()
+    _vider(force=True)
+    log(
+        f"{stats['beneficiaires']} bénéficiaire(s), {stats['notifications']} notification(s), "
+        f"{stats['demandes']} demande(s) de crédit, {stats['messages']} message(s) support."
+    )
+    return stats
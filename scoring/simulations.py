@@ -0,0 +1,75 @@
+"""
+Simulations de crédit non soumises, conservées en session plutôt qu'en base.
+
+Chaque brouillon est identifié par un jeton aléatoire ; la session en garde au
+plus ``MAX_SIMULATIONS`` (les plus anciens sont évincés). Une ``DemandeCredit``
+n'est créée qu'au moment de la soumission aux conseillers.
+"""
+import secrets
+from decimal import Decimal
+
+from django.utils import timezone
+
+from .models import DemandeCredit
+
+SESSION_KEY = 'simulations_credit'
+MAX_SIMULATIONS = 5
+
+_FIELDS = [
+    'montant_souhaite', 'duree_souhaitee_annees', 'apport_personnel', 'revenus_mensuels',
+    'loyer_actuel', 'dettes_mensuelles', 'enfants_a_charge', 'produit_id',
+    'emploi_snapshot_id', 'logement_snapshot_id', 'sante_snapshot', 'score_calcule',
+    'recommendation', 'ia_decision', 'modele_version',
+]
+_DECIMAL_FIELDS = ['taux_calcule', 'mensualite_calculee']
+
+
+def _serialize(demande):
+    data = {field: getattr(demande, field) for field in _FIELDS}
+    for field in _DECIMAL_FIELDS:
+        value = getattr(demande, field)
+        data[field] = str(value) if value is not None else None
+    data['cree_le'] = timezone.now().isoformat()
+    return data
+
+
+def store_simulation(request, demande):
+    """Enregistre une simulation non soumise en session et retourne son jeton."""
+    simulations = request.session.get(SESSION_KEY, {})
+    token = secrets.token_urlsafe(9)
+    simulations[token] = _serialize(demande)
+    # Éviction des plus anciennes (les dicts conservent l'ordre d'insertion)
+    while len(simulations) > MAX_SIMULATIONS:
+        simulations.pop(next(iter(simulations)))
+    request.session[SESSION_KEY] = simulations
+    return token
+
+
+def load_simulation(request, token):
+    """Retourne une ``DemandeCredit`` non sauvegardée reconstruite depuis la session, ou ``None``."""
+    data = request.session.get(SESSION_KEY, {}).get(token)
+    if data is None:
+        return None
+    demande = DemandeCredit(user=request.user, statut='EN_ATTENTE', soumise=False)
+    for field in _FIELDS:
+        setattr(demande, field, data.get(field))
+    for field in _DECIMAL_FIELDS:
+        value = data.get(field)
+        setattr(demande, field, Decimal(value) if value is not None else None)
+    return demande
+
+
+def update_simulation(request, token, **fields):
+    simulations = request.session.get(SESSION_KEY, {})
+    if token not in simulations:
+        return False
+    for field, value in fields.items():
+        simulations[token][field] = str(value) if isinstance(value, Decimal) else value
+    request.session[SESSION_KEY] = simulations
+    return True
+
+
+def discard_simulation(request, token):
+    simulations = request.session.get(SESSION_KEY, {})
+    if simulations.pop(token, None) is not None:
+        request.session[SESSION_KEY] = simulations
@@ -0,0 +1,125 @@
+"""
+Compteurs de dépenses carte sur fenêtres glissantes (jour, 30 jours).
+
+Chaque débit carte incrémente un seau journalier (``DepenseCarteJour``) et le
+compteur de la carte (``CompteurCarte``), qui porte directement les totaux du
+jour et des 30 derniers jours : le contrôle d'un plafond ne lit qu'une ligne.
+Au premier débit d'une nouvelle journée, le compteur est recalé sur les seaux
+encore dans la fenêtre (au plus 30 lignes) et les seaux échus sont supprimés.
+
+Plafonds appliqués : ``plafond_paiement`` sur 30 jours glissants,
+``plafond_retrait`` sur la journée.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Carte, CompteurCarte, DepenseCarteJour, Transaction
+
+FENETRE_JOURS = 30
+
+
+def _debut_fenetre(today):
+    return today - timedelta(days=FENETRE_JOURS - 1)
+
+
+def _roll(compteur, today):
+    """Recale un compteur resté sur une journée précédente."""
+    DepenseCarteJour.objects.filter(carte_id=compteur.carte_id, jour__lt=_debut_fenetre(today)).delete()
+    total = DepenseCarteJour.objects.filter(
+        carte_id=compteur.carte_id, operation=compteur.operation, jour__lt=today,
+    ).aggregate(s=Sum('montant'))['s']
+    compteur.jour = today
+    compteur.montant_jour = Decimal("0")
+    compteur.montant_30j = total or Decimal("0")
+
+
+def fenetre(compteur, operation):
+    return compteur.montant_30j if operation == 'PAIEMENT' else compteur.montant_jour
+
+
+def reserve(carte_id, operation, montant, plafond, today=None):
+    """
+    Impute ``montant`` sur les compteurs de la carte si le plafond le permet
+    (à appeler dans la transaction du débit). Retourne ``None`` ou le motif de refus.
+    """
+    today = today or timezone.localdate()
+    compteur, _ = CompteurCarte.objects.select_for_update().get_or_create(
+        carte_id=carte_id, operation=operation, defaults={'jour': today},
+    )
+    if compteur.jour != today:
+        _roll(compteur, today)
+    if fenetre(compteur, operation) + montant > plafond:
+        return 'PLAFOND_30J' if operation == 'PAIEMENT' else 'PLAFOND_JOUR'
+    compteur.montant_jour += montant
+    compteur.montant_30j += montant
+    compteur.save(update_fields=['jour', 'montant_jour', 'montant_30j'])
+    updated = DepenseCarteJour.objects.filter(carte_id=carte_id, operation=operation, jour=today).update(
+        montant=F('montant') + montant
+    )
+    if not updated:
+        DepenseCarteJour.objects.create(carte_id=carte_id, operation=operation, jour=today, montant=montant)
+    return None
+
+
+def usage(carte_ids, today=None):
+    """``carte_id -> {'PAIEMENT': total 30 jours, 'RETRAIT': total du jour}`` (affichage)."""
+    today = today or timezone.localdate()
+    result = {}
+    for compteur in CompteurCarte.objects.filter(carte_id__in=carte_ids):
+        if compteur.jour != today:
+            # Compteur non recalé : seul le total 30 jours reste (approximativement) pertinent
+            compteur.montant_jour = Decimal("0")
+        result.setdefault(compteur.carte_id, {})[compteur.operation] = fenetre(compteur, compteur.operation)
+    return result
+
+
+def rebuild_counters(carte_ids, today=None):
+    """Reconstruit seaux et compteurs d'un lot de cartes à partir des transactions carte."""
+    today = today or timezone.localdate()
+    debut = _debut_fenetre(today)
+    rows = (
+        Transaction.objects.filter(carte_id__in=carte_ids, montant__lt=0, date_execution__date__gte=debut)
+        .annotate(
+            jour=TruncDate('date_execution', tzinfo=timezone.get_current_timezone()),
+            operation=Case(When(categorie='RETRAIT', then=Value('RETRAIT')), default=Value('PAIEMENT')),
+        )
+        .values('carte_id', 'operation', 'jour')
+        .annotate(total=Sum('montant'))
+    )
+    buckets, compteurs = [], {}
+    for row in rows:
+        if row['jour'] < debut or row['jour'] > today:
+            continue
+        montant = -row['total']
+        buckets.append(DepenseCarteJour(carte_id=row['carte_id'], operation=row['operation'], jour=row['jour'], montant=montant))
+        compteur = compteurs.setdefault(
+            (row['carte_id'], row['operation']),
+            CompteurCarte(carte_id=row['carte_id'], operation=row['operation'], jour=today),
+        )
+        compteur.montant_30j += montant
+        if row['jour'] == today:
+            compteur.montant_jour += montant
+    with transaction.atomic():
+        DepenseCarteJour.objects.filter(carte_id__in=carte_ids).delete()
+        CompteurCarte.objects.filter(carte_id__in=carte_ids).delete()
+        DepenseCarteJour.objects.bulk_create(buckets)
+        CompteurCarte.objects.bulk_create(compteurs.values())
+    return len(compteurs)
+
+
+def rebuild_all_counters(chunk_size=1000, today=None):
+    """Réconciliation complète, par lots de cartes. Retourne ``(cartes, compteurs)``."""
+    last_id = 0
+    cartes = compteurs = 0
+    while True:
+        ids = list(Carte.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return cartes, compteurs
+        last_id = ids[-1]
+        cartes += len(ids)
+        compteurs += rebuild_counters(ids, today)
@@ -0,0 +1,153 @@
+"""
+Stress test Monte-Carlo du portefeuille de crédits acceptés.
+
+Chaque trajectoire tire un choc de taux et un choc de revenus systémiques,
+auxquels s'ajoute un choc de revenus propre à chaque emprunteur. La mensualité
+est recalculée sur le capital restant dû au taux choqué ; la probabilité de
+défaut croît avec le taux d'endettement stressé. La perte d'une trajectoire est
+la somme ``capital restant × LGD`` des crédits en défaut.
+
+Le calcul se fait par blocs (crédits × trajectoires) dont la taille est bornée
+par ``memory_mb`` : seul le vecteur des pertes par trajectoire est conservé.
+"""
+from django.db.models import F
+
+from .credit_engine import DEFAULT_RATE
+from .models import DemandeCredit
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_PARAMS = {
+    'choc_taux': 1.0,           # écart-type du choc de taux (points)
+    'choc_revenus': 0.05,       # écart-type du choc de revenus systémique
+    'choc_individuel': 0.15,    # écart-type du choc de revenus individuel
+    'pd_base': 0.005,           # probabilité de défaut plancher
+    'dti_critique': 50.0,       # DTI stressé pour lequel la PD atteint ~50 %
+    'pente': 5.0,               # raideur de la courbe PD(DTI)
+    'lgd': 0.45,                # perte en cas de défaut
+}
+_FIELDS = (
+    'id', 'montant_souhaite', 'duree_souhaitee_annees', 'revenus_mensuels',
+    'dettes_mensuelles', 'loyer_actuel', 'taux_calcule', 'produit__taux_ref',
+    'mensualite_calculee', 'echeances_payees',
+)
+# Tableaux float64 de taille (crédits × trajectoires) vivants en même temps dans un bloc
+_BLOCK_ARRAYS = 8
+
+
+def active_credits():
+    """Crédits acceptés dont toutes les échéances n'ont pas encore été prélevées."""
+    return DemandeCredit.objects.filter(
+        statut='ACCEPTEE', montant_souhaite__gt=0,
+        echeances_payees__lt=F('duree_souhaitee_annees') * 12,
+    )
+
+
+def credit_arrays(rows):
+    """Capital restant, taux, échéances restantes, revenus et charges à partir de tuples ``_FIELDS``."""
+    _, montant, duree, revenus, dettes, loyer, taux, taux_ref, mensualite, payees = zip(*rows)
+    montant = np.array(montant, dtype=float)
+    n = np.maximum(1, np.array(duree, dtype=float) * 12)
+    payees = np.minimum(np.array(payees, dtype=float), n - 1)
+    taux = np.array([
+        float(t if t is not None else (ref if ref is not None else DEFAULT_RATE)) for t, ref in zip(taux, taux_ref)
+    ])
+    r = taux / 100 / 12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        theorique = np.where(r > 0, montant * r / (1 - (1 + r) ** (-n)), montant / n)
+        mensualite = np.array([float(m) if m is not None else np.nan for m in mensualite])
+        mensualite = np.where(np.isnan(mensualite), theorique, mensualite)
+        croissance = (1 + r) ** payees
+        restant = np.where(r > 0, montant * croissance - mensualite * (croissance - 1) / np.where(r > 0, r, 1),
+                           montant - mensualite * payees)
+    return {
+        'capital_restant': np.clip(restant, 0, None),
+        'taux': taux,
+        'echeances_restantes': n - payees,
+        'mensualite': mensualite,
+        'revenus': np.maximum(np.array(revenus, dtype=float), 1),
+        'charges': np.array(dettes, dtype=float) + np.array(loyer, dtype=float),
+    }
+
+
+def _block_losses(credits, choc_taux, choc_revenus, rng, params):
+    """Pertes (par trajectoire) et nombre de défauts pour un bloc crédits × trajectoires."""
+    capital = credits['capital_restant'][:, None]
+    restantes = credits['echeances_restantes'][:, None]
+    taux = np.clip(credits['taux'][:, None] + choc_taux[None, :], 0, None)
+    r = taux / 100 / 12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mensualite = np.where(r > 0, capital * r / (1 - (1 + r) ** (-restantes)), capital / restantes)
+    individuel = rng.normal(0.0, params['choc_individuel'], size=mensualite.shape)
+    revenus = credits['revenus'][:, None] * np.clip(1 + choc_revenus[None, :] + individuel, 0.05, None)
+    dti = (mensualite + credits['charges'][:, None]) / revenus * 100
+    pd = params['pd_base'] + (1 - params['pd_base']) / (1 + np.exp(-(dti - params['dti_critique']) / params['pente']))
+    defaut = rng.random(size=pd.shape) < pd
+    pertes = (defaut * capital).sum(axis=0) * params['lgd']
+    return pertes, int(defaut.sum())
+
+
+def run_stress_test(paths=10000, seed=42, chunk_size=2000, memory_mb=256, queryset=None, **overrides):
+    """
+    Simule ``paths`` trajectoires sur tous les crédits actifs et retourne la
+    distribution des pertes. Les crédits sont lus par lots (pagination par clé)
+    et les trajectoires découpées pour tenir dans ``memory_mb``.
+    """
+    if np is None:
+        raise RuntimeError("numpy est requis pour le stress test.")
+    params = {**DEFAULT_PARAMS, **{k: v for k, v in overrides.items() if v is not None}}
+    paths = max(1, int(paths))
+    rng = np.random.default_rng(seed)
+    choc_taux = rng.normal(0.0, params['choc_taux'], size=paths)
+    choc_revenus = rng.normal(0.0, params['choc_revenus'], size=paths)
+
+    qs = (queryset if queryset is not None else active_credits()).order_by('id')
+    pertes = np.zeros(paths)
+    exposition = 0.0
+    n_credits = defauts = 0
+    budget = max(1, int(memory_mb * 1024 * 1024 / (8 * _BLOCK_ARRAYS)))
+    last_id = 0
+    while True:
+        rows = list(qs.filter(id__gt=last_id).values_list(*_FIELDS)[:chunk_size])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        credits = credit_arrays(rows)
+        n_credits += len(rows)
+        exposition += float(credits['capital_restant'].sum())
+        step = max(1, budget // len(rows))
+        for start in range(0, paths, step):
+            stop = min(paths, start + step)
+            bloc, nb = _block_losses(credits, choc_taux[start:stop], choc_revenus[start:stop], rng, params)
+            pertes[start:stop] += bloc
+            defauts += nb
+
+    return summarize(pertes, exposition, n_credits, defauts, params, seed)
+
+
+def summarize(pertes, exposition, n_credits, defauts, params, seed, bins=20):
+    paths = len(pertes)
+    var99 = float(np.quantile(pertes, 0.99))
+    queue = pertes[pertes >= var99]
+    counts, edges = np.histogram(pertes, bins=bins)
+    return {
+        'credits': n_credits,
+        'trajectoires': paths,
+        'graine': seed,
+        'parametres': params,
+        'exposition': round(exposition, 2),
+        'perte_attendue': round(float(pertes.mean()), 2),
+        'ecart_type': round(float(pertes.std()), 2),
+        'quantiles': {f"p{int(q * 100)}": round(float(np.quantile(pertes, q)), 2) for q in (0.5, 0.9, 0.95, 0.99)},
+        'var_99': round(var99, 2),
+        'es_99': round(float(queue.mean()) if len(queue) else var99, 2),
+        'perte_attendue_pct': round(float(pertes.mean()) / exposition * 100, 3) if exposition else 0.0,
+        'taux_defaut_moyen': round(defauts / (n_credits * paths), 4) if n_credits else 0.0,
+        'histogramme': [
+            {'de': round(float(edges[i]), 2), 'a': round(float(edges[i + 1]), 2), 'trajectoires': int(counts[i])}
+            for i in range(len(counts))
+        ],
+    }
@@ -0,0 +1,38 @@
+// Configuration Tailwind (v3) du bundle CSS précompilé : `python manage.py build_css`.
+// Le thème reprend celui de l'ancien `tailwind.config` inline de base.html.
+module.exports = {
+  content: {
+    relative: true,
+    files: [
+      '../../templates/**/*.html',
+      '../templates/**/*.html',
+      '../**/*.py',
+      '../static/**/*.js',
+    ],
+  },
+  theme: {
+    extend: {
+      fontFamily: {
+        sans: ['"Plus Jakarta Sans"', 'sans-serif'],
+        display: ['"Outfit"', 'sans-serif'],
+      },
+      colors: {
+        ice: { 50: '#f0f9ff', 100: '#e0f2fe', 200: '#bae6fd', 300: '#7dd3fc', 400: '#38bdf8', 500: '#0ea5e9', 600: '#0284c7', 700: '#0369a1', 800: '#075985', 900: '#0c4a6e', 950: '#082f49' },
+      },
+      boxShadow: {
+        glow: '0 0 20px rgba(56, 189, 248, 0.5)',
+        glass: '0 8px 32px 0 rgba(31, 38, 135, 0.15)',
+      },
+      keyframes: {
+        blob: {
+          '0%': { transform: 'translate(0px, 0px) scale(1)' },
+          '33%': { transform: 'translate(30px, -50px) scale(1.1)' },
+          '66%': { transform: 'translate(-20px, 20px) scale(0.9)' },
+          '100%': { transform: 'translate(0px, 0px) scale(1)' },
+        },
+      },
+      animation: { blob: 'blob 7s infinite cubic-bezier(0.6, 0.4, 0.4, 0.6)' },
+    },
+  },
+  plugins: [],
+};
@@ -0,0 +1,181 @@
+"""
+File de tâches en arrière-plan, stockée en base (SQLite comme PostgreSQL, sans broker).
+
+Une vue appelle ``enqueue`` et rend la main ; la commande ``run_worker`` réserve
+les tâches dues et les exécute dans un pool de threads ou de processus. La
+réservation est un ``UPDATE`` conditionnel par tâche (un seul worker gagne) qui
+pose un bail, prolongé pendant l'exécution : une tâche dont le worker s'arrête
+redevient disponible à l'expiration du bail, et un worker qui a perdu le bail
+n'écrit pas l'issue de la tâche. Les échecs sont rejoués avec un délai exponentiel jusqu'à
+``max_tentatives``.
+"""
+import io
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Tache
+from .stress import run_stress_test
+
+logger = logging.getLogger(__name__)
+
+BAIL = timedelta(minutes=30)
+DELAI_BASE = timedelta(seconds=30)
+
+TACHES = {}
+
+
+def register(nom):
+    """Décorateur : enregistre une fonction ``f(**parametres) -> résultat JSON`` sous ``nom``."""
+    def decorator(func):
+        TACHES[nom] = func
+        return func
+    return decorator
+
+
+def enqueue(nom, parametres=None, user=None, max_tentatives=3):
+    if nom not in TACHES:
+        raise ValueError(f"Tâche inconnue : {nom}")
+    return Tache.objects.create(nom=nom, parametres=parametres or {}, cree_par=user, max_tentatives=max_tentatives)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim(limit, worker, now=None, bail=BAIL):
+    """Réserve jusqu'à ``limit`` tâches dues (ou dont le bail a expiré). Retourne leurs ids."""
+    now = now or timezone.now()
+    candidats = (
+        Tache.objects.filter(
+            Q(statut='EN_ATTENTE', prochain_essai__lte=now) | Q(statut='EN_COURS', bail_expire__lt=now)
+        )
+        .order_by('prochain_essai', 'id')
+        .values_list('id', 'statut', 'bail_expire')[:limit * 2]
+    )
+    ids = []
+    for tache_id, statut, bail_expire in candidats:
+        if len(ids) >= limit:
+            break
+        won = Tache.objects.filter(id=tache_id, statut=statut, bail_expire=bail_expire).update(
+            statut='EN_COURS', bail_expire=now + bail, worker=worker, debut=now,
+            tentatives=F('tentatives') + 1,
+        )
+        if won:
+            ids.append(tache_id)
+    return ids
+
+
+def renew(tache_id, worker, bail=BAIL):
+    """Prolonge le bail si ``worker`` détient toujours la tâche. Retourne False si le bail est perdu."""
+    return bool(
+        Tache.objects.filter(id=tache_id, worker=worker, statut='EN_COURS')
+        .update(bail_expire=timezone.now() + bail)
+    )
+
+
+def _heartbeat(tache_id, worker, bail, stop):
+    # Thread séparé : sa propre connexion, fermée en sortie
+    try:
+        while not stop.wait(bail.total_seconds() / 3):
+            try:
+                if not renew(tache_id, worker, bail):
+                    logger.warning("Tâche %s : bail perdu par %s", tache_id, worker)
+                    return
+            except Exception:
+                logger.exception("Tâche %s : prolongation du bail impossible", tache_id)
+    finally:
+        connection.close()
+
+
+def execute(tache_id, worker, bail=BAIL):
+    """
+    Exécute une tâche réservée par ``worker`` et enregistre son issue. Le bail est
+    prolongé toutes les ``bail / 3`` pendant l'exécution ; l'issue n'est écrite
+    que si ``worker`` détient encore la tâche (sinon retourne None).
+    """
+    try:
+        tache = Tache.objects.get(id=tache_id, worker=worker, statut='EN_COURS')
+    except Tache.DoesNotExist:
+        return None
+    mine = Tache.objects.filter(id=tache_id, worker=worker, statut='EN_COURS')
+    stop = threading.Event()
+    battement = threading.Thread(target=_heartbeat, args=(tache_id, worker, bail, stop), daemon=True)
+    battement.start()
+    try:
+        if tache.tentatives > tache.max_tentatives:
+            raise RuntimeError("Nombre maximal de tentatives atteint (bail expiré).")
+        resultat = TACHES[tache.nom](**tache.parametres)
+    except Exception as exc:
+        erreur = f"{type(exc).__name__}: {exc}"[:2000]
+        if tache.tentatives >= tache.max_tentatives:
+            logger.exception("Tâche %s (%s) en échec définitif", tache_id, tache.nom)
+            issue, champs = 'ECHEC', {'erreur': erreur, 'fin': timezone.now()}
+        else:
+            delai = DELAI_BASE * (2 ** (tache.tentatives - 1))
+            issue, champs = 'EN_ATTENTE', {'erreur': erreur, 'prochain_essai': timezone.now() + delai}
+    else:
+        issue, champs = 'TERMINEE', {'resultat': resultat, 'erreur': '', 'fin': timezone.now()}
+    finally:
+        stop.set()
+        battement.join()
+    if not mine.update(statut=issue, bail_expire=None, **champs):
+        logger.warning("Tâche %s : bail perdu par %s, issue %s ignorée", tache_id, worker, issue)
+        return None
+    return issue
+
+
+def run_pending(worker=None, limit=100, bail=BAIL):
+    """Exécute en série les tâches dues dans le process courant (tests, cron)."""
+    worker = worker or worker_name()
+    done = 0
+    while done < limit:
+        ids = claim(1, worker, bail=bail)
+        if not ids:
+            break
+        execute(ids[0], worker, bail=bail)
+        done += 1
+    return done
+
+
+def status_payload(tache):
+    return {
+        'id': tache.id,
+        'nom': tache.nom,
+        'statut': tache.statut,
+        'tentatives': tache.tentatives,
+        'cree_le': tache.cree_le.isoformat(),
+        'fin': tache.fin.isoformat() if tache.fin else None,
+        'resultat': tache.resultat if tache.statut == 'TERMINEE' else None,
+        'erreur': tache.erreur if tache.statut == 'ECHEC' else '',
+    }
+
+
+# --- Tâches disponibles ---
+
+COMMANDES = {
+    'rescore_credits', 'rebuild_features', 'backtest_credit_models',
+    'send_weekly_admin_report', 'rebuild_card_counters', 'update_credit_model',
+}
+
+
+@register('stress_test')
+def stress_test(**params):
+    return run_stress_test(**params)
+
+
+@register('commande')
+def commande(nom, args=(), options=None):
+    """Commande de gestion autorisée ; le résultat est sa sortie texte."""
+    if nom not in COMMANDES:
+        raise ValueError(f"Commande non autorisée : {nom}")
+    out = io.StringIO()
+    call_command(nom, *args, stdout=out, **(options or {}))
+    return {'sortie': out.getvalue()[-5000:]}
@@ -1,11 +1,48 @@
-from django.test import TestCase
+import json
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import F
+from django.test import LiveServerTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth.models import User
+from datetime import timedelta
 from decimal import Decimal
 
-from .models import Compte, Carte, ProfilClient, Transaction, Notification
+from .models import (
+    ProfilFinancier, Formule, VersionReferentiel, DemandeDecouvert,
+    Compte, Carte, ProfilClient, Transaction, Notification,
+    DemandeCredit, ProduitPret, TypeEmploi, TypeLogement, CompteurCarte, EmailOutbox, Tache, SequenceCompte,
+    FluxMensuel,
+)
 from .views import enforce_overdraft
+from .utils import overdraft_limit_for_user
+from .overdraft import enforce_overdraft_bulk
+from .billing import bill_subscriptions
+from . import ml
+from .credit_engine import score_application, score_applications, score_arrays
+from . import finance
+from .training import update_model
+from . import backtest
+from . import stress
+from . import features
+from . import catalogue
+from . import cards
+from . import spend
+from . import outbox
+from . import tasks
+from . import iban
+from .forms import SimulationPretForm
+from .seeding import seed_bank
 
 
 class CoreFlowTests(TestCase):
@@ -97,3 +134,1149 @@ class OverdraftRulesTests(TestCase):
         self.assertFalse(self.carte.est_bloquee)
         notif = Notification.objects.filter(user=self.user, titre__icontains="Cartes débloquées").first()
         self.assertIsNotNone(notif)
+
+
+class MLRegistryTests(TestCase):
+    def test_save_and_preload_latest_version(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(SCORING_MODEL_DIR=tmp):
+            weights = ml.train_credit_model()
+            self.assertEqual(ml.save_weights(weights), 1)
+            self.assertEqual(ml.save_weights(weights * 2), 2)
+            self.assertEqual(ml.list_versions(), [1, 2])
+            self.assertEqual(ml.preload(), 2)
+            loaded, meta = ml.load_model(1)
+            self.assertEqual(meta['version'], 1)
+            self.assertEqual(list(loaded), list(weights))
+        ml.preload()
+
+    def test_score_uses_preloaded_weights(self):
+        score = ml.ml_score(revenus=8, dti=25, ltv=70, apport_ratio=0.3)
+        self.assertGreater(score, 50)
+        self.assertLessEqual(score, 100)
+
+
+class CreditFixtures:
+    """Demandes de crédit communes aux tests du moteur et du backtest."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="carol", password="pass1234")
+        self.produit = ProduitPret.objects.create(nom="Immo", taux_ref=Decimal("2.90"))
+        cdi = TypeEmploi.objects.create(nom="CDI")
+        proprio = TypeLogement.objects.create(nom="Propriétaire")
+        profils = [
+            dict(montant_souhaite=200000, duree_souhaitee_annees=20, apport_personnel=40000, revenus_mensuels=5200, loyer_actuel=0, dettes_mensuelles=0, emploi_snapshot=cdi, logement_snapshot=proprio),
+            dict(montant_souhaite=300000, duree_souhaitee_annees=25, apport_personnel=0, revenus_mensuels=1800, loyer_actuel=700, dettes_mensuelles=300),
+            dict(montant_souhaite=15000, duree_souhaitee_annees=5, apport_personnel=1000, revenus_mensuels=2500, loyer_actuel=600, dettes_mensuelles=0, produit=None),
+            dict(montant_souhaite=500000, duree_souhaitee_annees=30, apport_personnel=60000, revenus_mensuels=9000, loyer_actuel=0, dettes_mensuelles=800, sante_snapshot='MOYEN'),
+        ]
+        for data in profils:
+            data.setdefault('produit', self.produit)
+            DemandeCredit.objects.create(user=self.user, ia_decision='ACCEPTEE', score_calcule=99, **data)
+
+
+class CreditEngineTests(CreditFixtures, TestCase):
+    def test_batch_matches_single_scoring(self):
+        demandes = list(DemandeCredit.objects.select_related('produit', 'emploi_snapshot', 'logement_snapshot').order_by('id'))
+        batch = score_applications(demandes)
+        for demande, result in zip(demandes, batch):
+            single = score_application(demande)
+            self.assertEqual(result['score_calcule'], single['score_calcule'])
+            self.assertEqual(result['ia_decision'], single['ia_decision'])
+            self.assertEqual(result['taux_calcule'], single['taux_calcule'])
+            self.assertEqual(result['mensualite_calculee'], single['mensualite_calculee'])
+
+    def test_rescore_command_updates_pending_in_bulk(self):
+        DemandeCredit.objects.filter(montant_souhaite=15000).update(statut='REFUSEE')
+        out = StringIO()
+        call_command('rescore_credits', '--chunk-size', '2', stdout=out)
+        self.assertIn("3 demande(s) re-scorée(s)", out.getvalue())
+        self.assertIn("Décisions modifiées", out.getvalue())
+        refusee = DemandeCredit.objects.get(montant_souhaite=15000)
+        self.assertEqual(refusee.score_calcule, 99)
+        for demande in DemandeCredit.objects.filter(statut='EN_ATTENTE'):
+            self.assertNotEqual(demande.score_calcule, 99)
+            self.assertEqual(demande.modele_version, ml.current_version())
+
+
+class BacktestTests(CreditFixtures, TestCase):
+    def test_backtest_matches_engine_and_writes_reports(self):
+        DemandeCredit.objects.filter(montant_souhaite__in=[200000, 500000]).update(statut='ACCEPTEE')
+        DemandeCredit.objects.filter(montant_souhaite=300000).update(statut='REFUSEE')
+        demandes = list(DemandeCredit.objects.select_related('produit', 'emploi_snapshot', 'logement_snapshot').order_by('id'))
+        attendus = [r['ia_decision'] == 'ACCEPTEE' for r in score_applications(demandes)]
+
+        report = backtest.run_backtest([0, 0], chunk_size=3)
+        self.assertEqual(report['demandes'], 4)
+        self.assertEqual(report['decisions_admin'], 3)
+        row = report['versions'][0]
+        self.assertEqual(row['taux_acceptation'], round(sum(attendus) / 4, 4))
+        c = row['confusion']
+        self.assertEqual(c['vrais_positifs'] + c['faux_positifs'] + c['faux_negatifs'] + c['vrais_negatifs'], 3)
+        self.assertTrue(all(seg['derive_vs_reference'] == 0 for seg in report['segments']))
+        self.assertIn("Sans produit", {seg['valeur'] for seg in report['segments']})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            out = StringIO()
+            call_command('backtest_credit_models', '--versions', '0', '--json', f"{tmp}/r.json", '--csv', f"{tmp}/r.csv", stdout=out)
+            self.assertIn("4 demande(s) rejouée(s)", out.getvalue())
+            with open(f"{tmp}/r.csv", encoding='utf-8') as handle:
+                self.assertTrue(handle.readline().startswith("segment,valeur,version"))
+
+    def test_replay_applies_the_verified_income_cap_like_production(self):
+        ProfilFinancier.objects.create(user=self.user, salaire_mensuel_moyen=Decimal("2100"), mois_avec_salaire=6)
+        demandes = list(DemandeCredit.objects.select_related('produit', 'emploi_snapshot', 'logement_snapshot').order_by('id'))
+        weights = ml.get_weights()
+        production = score_applications(demandes, weights=weights, version=0,
+                                        revenus_verifies=features.revenus_verifies_map([self.user.id]))
+        sans_plafond = score_applications(demandes, weights=weights, version=0)
+
+        columns, bonus, _, _ = backtest.load_columns(chunk_size=3)
+        _, final = score_arrays(columns, bonus, weights)
+        self.assertEqual(final.tolist(), [r['score_calcule'] for r in production])
+        self.assertNotEqual(final.tolist(), [r['score_calcule'] for r in sans_plafond])
+
+    def test_auc_handles_ties_and_single_class(self):
+        self.assertEqual(backtest.auc([10, 20, 30, 40], [0, 0, 1, 1]), 1.0)
+        self.assertEqual(backtest.auc([50, 50], [0, 1]), 0.5)
+        self.assertIsNone(backtest.auc([1, 2], [1, 1]))
+
+
+class AmortizationApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="dave", password="pass1234")
+        self.client.force_login(self.user)
+
+    def test_schedule_endpoint(self):
+        resp = self.client.get(reverse("api_calcul_pret"), {"principal": "200000", "taux": "3.5", "mois": "240"})
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data["mensualite"], 1159.92)
+        self.assertEqual(len(data["echeancier"]), 240)
+        self.assertEqual(data["echeancier"][-1]["capital_restant"], 0)
+        self.assertAlmostEqual(sum(e["capital"] for e in data["echeancier"]), 200000, delta=1)
+        self.assertAlmostEqual(data["cout_total"] - data["interets_totaux"], 200000, delta=0.02)
+
+    def test_invalid_params_and_cache(self):
+        resp = self.client.get(reverse("api_calcul_pret"), {"principal": "-5", "taux": "3.5", "mois": "12"})
+        self.assertEqual(resp.status_code, 400)
+        finance._cached_schedule.cache_clear()
+        finance.amortization_schedule("1200", "0", "12")
+        finance.amortization_schedule(Decimal("1200.00"), 0, 12)
+        self.assertEqual(finance._cached_schedule.cache_info().hits, 1)
+        self.assertEqual(finance.amortization_schedule("1200", "0", "12")["mensualite"], 100)
+
+
+class AffordabilityGridTests(TestCase):
+    def test_grid_shapes_and_suggestion(self):
+        grid = finance.affordability_grid(revenus=3000, charges=500, principal=200000, taux_ref=Decimal("3.50"))
+        self.assertEqual(len(grid["capital_max"]), len(grid["durees"]))
+        self.assertEqual(len(grid["capital_max"][0]), len(grid["taux"]))
+        self.assertEqual(len(grid["capital_max"][0][0]), len(grid["dti"]))
+        ref = grid["taux_ref_index"]
+        self.assertEqual(grid["taux"][ref], 3.5)
+        d20 = grid["durees"].index(20)
+        self.assertAlmostEqual(grid["mensualite_requise"][d20][ref], 1159.92, places=2)
+        # 35 % de 3000 - 500 = 550 €/mois : capital max cohérent avec la mensualité cible
+        k35 = grid["dti"].index(35)
+        self.assertAlmostEqual(grid["capital_max"][d20][ref][k35], finance.principal_for_payment(550, 3.5, 240), delta=1)
+        duree = finance.suggested_duration(grid, 1000)
+        self.assertGreater(duree, 20)
+        self.assertLessEqual(grid["mensualite_requise"][grid["durees"].index(duree)][ref], 1000)
+        self.assertIsNone(finance.suggested_duration(grid, 100))
+
+    def test_result_page_embeds_grid(self):
+        user = User.objects.create_user(username="erin", password="pass1234")
+        demande = DemandeCredit.objects.create(
+            user=user, montant_souhaite=200000, duree_souhaitee_annees=20, revenus_mensuels=4000,
+            loyer_actuel=500, taux_calcule=Decimal("3.50"), mensualite_calculee=Decimal("1159.92"), score_calcule=60,
+        )
+        self.client.force_login(user)
+        resp = self.client.get(reverse("resultat_simulation", args=[demande.id]))
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, 'id="affordability-grid"')
+        self.assertEqual(resp.context["suggested_duree"], 30)
+        self.assertEqual(resp.context["suggested_mensualite"], 900)
+
+    def test_result_page_without_numpy(self):
+        user = User.objects.create_user(username="erin", password="pass1234")
+        demande = DemandeCredit.objects.create(
+            user=user, montant_souhaite=200000, duree_souhaitee_annees=20, revenus_mensuels=4000,
+            loyer_actuel=500, taux_calcule=Decimal("3.50"), mensualite_calculee=Decimal("1159.92"), score_calcule=60,
+        )
+        self.client.force_login(user)
+        with mock.patch.object(finance, "np", None):
+            resp = self.client.get(reverse("resultat_simulation", args=[demande.id]))
+            api = self.client.get(reverse("api_calcul_pret"), {"principal": "200000", "taux": "3.5", "mois": "240"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotContains(resp, 'id="affordability-grid"')
+        self.assertEqual(resp.context["suggested_duree"], 30)
+        self.assertEqual(resp.context["suggested_mensualite"], 900)
+        self.assertEqual(api.status_code, 503)
+
+
+class EphemeralSimulationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="fred", password="pass1234")
+        self.client.force_login(self.user)
+        self.produit = ProduitPret.objects.create(nom="Perso", taux_ref=Decimal("3.50"))
+        self.data = {
+            "produit": self.produit.id, "montant_souhaite": 20000, "duree_souhaitee_annees": 5,
+            "apport_personnel": 2000, "revenus_mensuels": 3500, "loyer_actuel": 700,
+            "dettes_mensuelles": 0, "enfants_a_charge": 0,
+        }
+
+    def test_choice_deleted_elsewhere_is_rejected_on_post(self):
+        form = SimulationPretForm(self.data)  # choix chargés depuis le référentiel en cache
+        self.produit.delete()
+        self.assertFalse(form.is_valid())
+        self.assertIn("produit", form.errors)
+
+    def test_draft_stays_in_session_until_submitted(self):
+        resp = self.client.post(reverse("simulation"), self.data)
+        self.assertEqual(resp.status_code, 302)
+        self.assertFalse(DemandeCredit.objects.exists())
+        token = resp.url.rstrip("/").split("/")[-1]
+
+        page = self.client.get(resp.url)
+        self.assertEqual(page.status_code, 200)
+        self.assertContains(page, reverse("valider_brouillon", args=[token]))
+
+        upd = self.client.post(reverse("api_update_brouillon", args=[token]), '{"duree": 7, "mensualite": 300}', content_type="application/json")
+        self.assertEqual(upd.status_code, 200)
+        self.assertFalse(DemandeCredit.objects.exists())
+
+        resp = self.client.post(reverse("valider_brouillon", args=[token]))
+        demande = DemandeCredit.objects.get()
+        self.assertRedirects(resp, reverse("resultat_simulation", args=[demande.id]))
+        self.assertTrue(demande.soumise)
+        self.assertEqual(demande.duree_souhaitee_annees, 7)
+        self.assertIsNotNone(demande.score_calcule)
+        self.assertEqual(self.client.get(reverse("resultat_brouillon", args=[token])).status_code, 302)
+
+    def test_submitted_simulation_is_persisted_directly(self):
+        resp = self.client.post(reverse("simulation"), dict(self.data, soumise="on"))
+        demande = DemandeCredit.objects.get()
+        self.assertRedirects(resp, reverse("resultat_simulation", args=[demande.id]))
+        self.assertTrue(demande.soumise)
+
+    def test_purge_command_removes_old_unsubmitted_rows(self):
+        old = DemandeCredit.objects.create(user=self.user, soumise=False)
+        kept = DemandeCredit.objects.create(user=self.user, soumise=True)
+        DemandeCredit.objects.filter(id__in=[old.id, kept.id]).update(date_demande=timezone.now() - timedelta(days=90))
+        recent = DemandeCredit.objects.create(user=self.user, soumise=False)
+        call_command("purge_simulations", "--days", "30", stdout=StringIO())
+        self.assertEqual(set(DemandeCredit.objects.values_list("id", flat=True)), {kept.id, recent.id})
+
+
+class OnlineTrainingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="gina", password="pass1234")
+        self.staff = User.objects.create_user(username="boss", password="pass1234", is_staff=True)
+
+    def _decide(self, n, action):
+        for i in range(n):
+            demande = DemandeCredit.objects.create(
+                user=self.user, montant_souhaite=100000 + i * 1000, duree_souhaitee_annees=20,
+                revenus_mensuels=2500 + i * 100, apport_personnel=5000, soumise=True,
+            )
+            self.client.post(reverse("admin_manage_credits"), {"demande_id": demande.id, "action": action})
+
+    def test_incremental_updates_only_read_new_decisions(self):
+        self.client.force_login(self.staff)
+        with tempfile.TemporaryDirectory() as tmp, override_settings(SCORING_MODEL_DIR=tmp):
+            ml.save_weights(ml.train_credit_model())
+            self._decide(3, "ACCEPTEE")
+            self._decide(2, "REFUSEE")
+            first = update_model(chunk_size=2)
+            self.assertEqual(first["decisions"], 5)
+            self.assertEqual(first["acceptees"], 3)
+            self.assertEqual(first["version"], 2)
+            _, meta = ml.load_model(2)
+            self.assertEqual(meta["parent_version"], 1)
+            self.assertEqual(meta["n_decisions"], 5)
+
+            self.assertEqual(update_model()["decisions"], 0)
+            self._decide(1, "REFUSEE")
+            second = update_model()
+            self.assertEqual(second["decisions"], 1)
+            self.assertEqual(second["version"], 3)
+            self.assertEqual(ml.load_model(3)[1]["n_decisions"], 6)
+        ml.preload()
+
+    def test_sgd_moves_towards_labels(self):
+        X = ml.design_matrix([8, 8], [20, 20], [60, 60], [0.4, 0.4])
+        w0 = ml.get_weights()
+        w1 = ml.sgd_update(w0, X, [0.0, 0.0], lr=0.5, epochs=20)
+        self.assertLess(float(X[0] @ w1), float(X[0] @ w0))
+
+
+class StressTestTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="hugo", password="pass1234")
+        for i in range(6):
+            DemandeCredit.objects.create(
+                user=self.user, statut='ACCEPTEE', soumise=True, montant_souhaite=150000 + i * 20000,
+                duree_souhaitee_annees=20, revenus_mensuels=2200 + i * 600, dettes_mensuelles=150,
+                taux_calcule=Decimal("3.20"), echeances_payees=i * 12,
+            )
+        # Crédit soldé et demande en attente : hors portefeuille
+        DemandeCredit.objects.create(user=self.user, statut='ACCEPTEE', montant_souhaite=10000, duree_souhaitee_annees=1, echeances_payees=12)
+        DemandeCredit.objects.create(user=self.user, statut='EN_ATTENTE', montant_souhaite=90000, duree_souhaitee_annees=15)
+
+    def test_results_are_reproducible_for_a_seed(self):
+        a = stress.run_stress_test(paths=500, seed=7, chunk_size=100)
+        b = stress.run_stress_test(paths=500, seed=7, chunk_size=100)
+        self.assertEqual(a, b)
+        self.assertEqual(a['credits'], 6)
+        self.assertGreater(a['perte_attendue'], 0)
+        self.assertLessEqual(a['quantiles']['p50'], a['var_99'])
+        self.assertLessEqual(a['var_99'], a['es_99'])
+        self.assertEqual(sum(h['trajectoires'] for h in a['histogramme']), 500)
+
+    def test_memory_budget_splits_paths_into_blocks(self):
+        small = stress.run_stress_test(paths=300, seed=1, chunk_size=2, memory_mb=0.001)
+        self.assertEqual(small['trajectoires'], 300)
+        self.assertEqual(small['credits'], 6)
+
+    def test_admin_page_and_command(self):
+        staff = User.objects.create_user(username="risk", password="pass1234", is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse("admin_stress_test"), {"paths": 200, "lgd": "0.5"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["rapport"]["parametres"]["lgd"], 0.5)
+        response = self.client.get(reverse("admin_stress_test"), {"paths": 200, "seed": "-1"})
+        self.assertEqual(response.status_code, 200)
+        out = StringIO()
+        call_command('stress_test_credits', '--paths', '200', stdout=out)
+        self.assertIn("6 crédit(s) × 200 trajectoire(s)", out.getvalue())
+        for args, message in ((('--seed', '-1'), "--seed"), (('--paths', '0'), "--paths"), (('--lgd', '1.5'), "--lgd")):
+            with self.assertRaisesMessage(CommandError, message):
+                call_command('stress_test_credits', *args, stdout=StringIO())
+
+
+class FeatureStoreTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="ines", password="pass1234")
+        self.compte = Compte.objects.create(user=self.user, numero_compte="FR-FEAT-1", solde=Decimal("0"))
+        self.now = timezone.now()
+
+    def _tx(self, montant, libelle, categorie, mois_avant=0, jour=5):
+        mois = features._mois_precedent(self.now.date().replace(day=1), mois_avant)
+        date = self.now.replace(year=mois.year, month=mois.month, day=jour)
+        self.compte.solde += Decimal(montant)
+        self.compte.save(update_fields=['solde'])
+        with self.captureOnCommitCallbacks(execute=True):
+            return Transaction.objects.create(
+                compte=self.compte, montant=Decimal(montant), libelle=libelle,
+                type='CREDIT' if Decimal(montant) > 0 else 'DEBIT', categorie=categorie, date_execution=date,
+            )
+
+    def _historique(self):
+        for m in (3, 2, 1):
+            self._tx("2500", "Salaire ACME", 'SALAIRE', m, jour=1)
+            self._tx("-900", f"Loyer {m:02d}/2026", 'LOGEMENT', m, jour=3)
+            self._tx("-1900", "Courses", 'ALIM', m, jour=10)
+            self._tx("300", "Remboursement", 'AUTRE', m, jour=20)
+
+    def test_incremental_updates_match_full_rebuild(self):
+        self._historique()
+        profil = ProfilFinancier.objects.get(user=self.user)
+        self.assertEqual(profil.nb_transactions, 12)
+        self.assertEqual(profil.mois_avec_salaire, 3)
+        self.assertEqual(profil.nb_prelevements_recurrents, 2)
+        self.assertGreater(profil.jours_decouvert, 0)
+        self.assertEqual(features.revenus_verifies(self.user), profil.salaire_mensuel_moyen)
+
+        incremental = {f: getattr(profil, f) for f in (
+            'salaire_mensuel_moyen', 'depense_mensuelle_moyenne', 'prelevements_recurrents',
+            'jours_decouvert', 'solde_suivi', 'nb_transactions',
+        )}
+        call_command('rebuild_features', '--user', 'ines', stdout=StringIO())
+        rebuilt = ProfilFinancier.objects.get(user=self.user)
+        for field, value in incremental.items():
+            self.assertEqual(getattr(rebuilt, field), value, field)
+        self.assertAlmostEqual(rebuilt.volatilite_solde, profil.volatilite_solde)
+
+    def test_declared_income_is_capped_by_verified_salary(self):
+        self._historique()
+        verifie = features.revenus_verifies(self.user)
+        demande = DemandeCredit(user=self.user, montant_souhaite=200000, duree_souhaitee_annees=20,
+                                revenus_mensuels=9000, apport_personnel=20000)
+        declare = score_application(demande)
+        plafonne = score_application(demande, revenus_verifies=verifie)
+        self.assertLess(plafonne['score_calcule'], declare['score_calcule'])
+        batch = score_applications([demande], revenus_verifies={self.user.id: verifie})[0]
+        self.assertEqual(batch['score_calcule'], plafonne['score_calcule'])
+
+    def test_transfer_defers_feature_updates_until_commit(self):
+        autre = User.objects.create_user(username="jules", password="pass1234")
+        Compte.objects.create(user=autre, numero_compte="FR7612345678901234567890555", solde=Decimal("0"))
+        self._tx("500", "Salaire ACME", 'SALAIRE')
+        self.client.force_login(self.user)
+        data = {"compte_emetteur": self.compte.id, "montant": "50.00", "motif": "Loyer",
+                "nouveau_beneficiaire_iban": "FR7612345678901234567890555"}
+        with self.captureOnCommitCallbacks() as callbacks, CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.post(reverse("virement"), data).status_code, 302)
+        tables = ('scoring_profilfinancier', 'scoring_fluxmensuel', 'scoring_prelevementrecurrent')
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if any(t in q['sql'] for t in tables)])
+        self.assertEqual(len(callbacks), 2)  # débit émetteur, crédit miroir
+        # Après commit : mise à jour incrémentale du seul titulaire (points de sauvegarde compris)
+        with self.assertNumQueries(13):
+            callbacks[0]()
+        for callback in callbacks[1:]:
+            callback()
+        self.assertEqual(ProfilFinancier.objects.get(user=self.user).nb_transactions, 2)
+        self.assertEqual(ProfilFinancier.objects.get(user=autre).nb_transactions, 1)
+
+    def test_single_salary_is_not_trusted(self):
+        self._tx("100", "Cadeau de bienvenue Banquise", 'SALAIRE')
+        self.assertIsNone(features.revenus_verifies(self.user))
+
+
+class SubscriptionBillingTests(TestCase):
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.comptes = {}
+        plans = [("plus", "PLUS", "PLUS"), ("down", "INFINITE", "ESSENTIEL"), ("free", "ESSENTIEL", "ESSENTIEL"), ("later", "PLUS", "PLUS")]
+        for name, plan, prochain in plans:
+            user = User.objects.create_user(username=name, password="pass1234")
+            echeance = self.today + timedelta(days=10) if name == "later" else self.today - timedelta(days=1)
+            ProfilClient.objects.create(user=user, abonnement=plan, prochain_abonnement=prochain, prochaine_facturation=echeance)
+            self.comptes[name] = Compte.objects.create(user=user, solde=Decimal("5.00"), numero_compte=f"FR-BILL-{name}")
+        Carte.objects.create(compte=self.comptes["plus"], numero_visible="1111", date_expiration=self.today)
+
+    def test_bills_due_profiles_once_per_period(self):
+        out = StringIO()
+        call_command('bill_subscriptions', '--chunk-size', '2', stdout=out)
+        self.assertIn("3 profil(s) à échéance", out.getvalue())
+        self.assertIn("1 facture(s) pour 9.90 €", out.getvalue())
+
+        self.comptes["plus"].refresh_from_db()
+        self.assertEqual(self.comptes["plus"].solde, Decimal("-4.90"))
+        self.assertTrue(Transaction.objects.filter(compte=self.comptes["plus"], libelle__startswith="Abonnement Banquise Plus").exists())
+        down = ProfilClient.objects.get(user__username="down")
+        self.assertEqual(down.abonnement, "ESSENTIEL")
+        self.assertEqual(down.prochaine_facturation, self.today + timedelta(days=29))
+        self.comptes["later"].refresh_from_db()
+        self.assertEqual(self.comptes["later"].solde, Decimal("5.00"))
+
+        call_command('bill_subscriptions', stdout=StringIO())
+        self.assertEqual(Transaction.objects.filter(libelle__startswith="Abonnement Banquise").count(), 1)
+        self.comptes["plus"].refresh_from_db()
+        self.assertEqual(self.comptes["plus"].solde, Decimal("-4.90"))
+
+    def test_features_updated_in_batch_like_a_rebuild(self):
+        user = self.comptes["plus"].user
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(compte=self.comptes["plus"], montant=Decimal("2100"), libelle="Salaire", type='CREDIT', categorie='SALAIRE')
+        self.assertIsNotNone(ProfilFinancier.objects.filter(user=user).first())
+        bill_subscriptions(today=self.today)
+        suivi = ProfilFinancier.objects.get(user=user)
+        flux = list(FluxMensuel.objects.filter(user=user).values_list('mois', 'salaires', 'depenses', 'nb_operations'))
+        reconstruit = features.rebuild_user(user.id, today=self.today)
+        for champ in ('solde_suivi', 'nb_transactions', 'depense_mensuelle_moyenne', 'salaire_mensuel_moyen'):
+            self.assertEqual(getattr(suivi, champ), getattr(reconstruit, champ), champ)
+        self.assertEqual(flux, list(FluxMensuel.objects.filter(user=user).values_list('mois', 'salaires', 'depenses', 'nb_operations')))
+
+    def test_dry_run_changes_nothing(self):
+        call_command('bill_subscriptions', '--dry-run', stdout=StringIO())
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(ProfilClient.objects.get(user__username="down").abonnement, "INFINITE")
+
+
+class CatalogueTests(TestCase):
+    def setUp(self):
+        self.produit = ProduitPret.objects.create(nom="Auto", taux_ref=Decimal("4.10"))
+        TypeEmploi.objects.create(nom="CDI")
+        catalogue.invalidate()
+
+    def test_cached_reads_need_no_queries(self):
+        catalogue.plans()
+        with self.assertNumQueries(0):
+            self.assertEqual(catalogue.plan("PLUS")["prix"], Decimal("9.90"))
+            self.assertEqual(catalogue.decouvert_autorise("INFINITE"), Decimal("1000.00"))
+            form = SimulationPretForm()
+            html = form.as_p()
+        self.assertIn("Auto", html)
+        self.assertIn("CDI", html)
+
+    def test_admin_change_invalidates_local_cache(self):
+        self.assertEqual(catalogue.decouvert_autorise("PLUS"), Decimal("500.00"))
+        formule = Formule.objects.get(code="PLUS")
+        formule.decouvert_autorise = Decimal("750.00")
+        formule.save()
+        self.assertEqual(catalogue.decouvert_autorise("PLUS"), Decimal("750.00"))
+
+    def test_other_process_change_is_seen_after_check_interval(self):
+        catalogue.plans()
+        # Modification faite par un autre process : pas de signal ici, seul le tampon change
+        Formule.objects.filter(code="PLUS").update(prix=Decimal("11.90"))
+        VersionReferentiel.objects.filter(pk=1).update(version=F("version") + 1)
+        self.assertEqual(catalogue.plan("PLUS")["prix"], Decimal("9.90"))
+        with override_settings(REFERENTIEL_CHECK_SECONDS=0):
+            self.assertEqual(catalogue.plan("PLUS")["prix"], Decimal("11.90"))
+
+    def test_form_resolves_cached_instances(self):
+        form = SimulationPretForm(data={
+            "montant_souhaite": 20000, "duree_souhaitee_annees": 5, "apport_personnel": 0,
+            "revenus_mensuels": 3000, "produit": str(self.produit.pk), "enfants_a_charge": 0,
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data["produit"].taux_ref, Decimal("4.10"))
+        invalid = SimulationPretForm(data={"montant_souhaite": 1, "duree_souhaitee_annees": 1, "revenus_mensuels": 1, "produit": "999999"})
+        self.assertIn("produit", invalid.errors)
+
+
+class OverdraftLimitTests(TestCase):
+    def setUp(self):
+        catalogue.invalidate()
+        self.user = User.objects.create_user(username="jade", password="pass1234")
+        self.profil = ProfilClient.objects.create(user=self.user, abonnement="PLUS")
+        self.compte = Compte.objects.create(user=self.user, solde=Decimal("-700.00"), numero_compte="FR-OD-1")
+        self.carte = Carte.objects.create(compte=self.compte, numero_visible="2222", date_expiration=timezone.now().date(), est_bloquee=True)
+        self.staff = User.objects.create_user(username="ops", password="pass1234", is_staff=True)
+
+    def test_limit_is_read_from_profile_without_writes(self):
+        self.assertEqual(ProfilClient.objects.get(pk=self.profil.pk).decouvert_autorise, Decimal("500.00"))
+        user = User.objects.select_related("profil").get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(overdraft_limit_for_user(user), Decimal("500.00"))
+        sans_profil = User.objects.create_user(username="nobody", password="pass1234")
+        self.assertEqual(overdraft_limit_for_user(sans_profil), Decimal("100.00"))
+        self.assertFalse(ProfilClient.objects.filter(user=sans_profil).exists())
+
+    def test_approval_updates_limit_and_unblocks_cards(self):
+        demande = DemandeDecouvert.objects.create(user=self.user, montant_souhaite=Decimal("800.00"))
+        self.client.force_login(self.staff)
+        self.client.post(reverse("admin_manage"), {"action": "approve_decouvert", "target_id": demande.id})
+        self.assertEqual(ProfilClient.objects.get(pk=self.profil.pk).decouvert_autorise, Decimal("800.00"))
+        self.carte.refresh_from_db()
+        self.assertFalse(self.carte.est_bloquee)
+
+    def test_sweep_expires_boosts_and_reblocks_cards(self):
+        DemandeDecouvert.objects.create(
+            user=self.user, montant_souhaite=Decimal("800.00"), statut="ACCEPTEE",
+            expire_le=timezone.now().date() - timedelta(days=1),
+        )
+        ProfilClient.objects.filter(pk=self.profil.pk).update(decouvert_autorise=Decimal("800.00"))
+        Carte.objects.filter(pk=self.carte.pk).update(est_bloquee=False)
+        out = StringIO()
+        call_command("expire_overdrafts", stdout=out)
+        self.assertIn("1 découvert(s) temporaire(s) expiré(s)", out.getvalue())
+        self.assertEqual(ProfilClient.objects.get(pk=self.profil.pk).decouvert_autorise, Decimal("500.00"))
+        self.assertEqual(DemandeDecouvert.objects.get().statut, "EXPIREE")
+        self.carte.refresh_from_db()
+        self.assertTrue(self.carte.est_bloquee)
+
+    def test_plan_tier_change_propagates_to_profiles(self):
+        formule = Formule.objects.get(code="PLUS")
+        formule.decouvert_autorise = Decimal("650.00")
+        formule.save()
+        self.assertEqual(ProfilClient.objects.get(pk=self.profil.pk).decouvert_autorise, Decimal("650.00"))
+
+
+class BulkOverdraftTests(TestCase):
+    def setUp(self):
+        self.comptes = []
+        soldes = ["-150.00", "-90.00", "20.00", "-95.00"]  # limite Essentiel : 100 €
+        for i, solde in enumerate(soldes):
+            user = User.objects.create_user(username=f"bulk{i}", password="pass1234")
+            ProfilClient.objects.create(user=user)
+            compte = Compte.objects.create(user=user, solde=Decimal(solde), numero_compte=f"FR-BULK-{i}")
+            Carte.objects.create(compte=compte, numero_visible=f"{i}000", date_expiration=timezone.now().date(), est_bloquee=(i == 2))
+            self.comptes.append(compte)
+
+    def test_decisions_are_applied_in_a_fixed_number_of_queries(self):
+        with self.assertNumQueries(6):
+            result = enforce_overdraft_bulk(self.comptes)
+        self.assertEqual(result["bloques"], [self.comptes[0].id])
+        self.assertEqual(result["debloques"], [self.comptes[2].id])
+        self.assertEqual(sorted(result["alertes"]), sorted(c.id for c in (self.comptes[0], self.comptes[1], self.comptes[3])))
+        self.assertEqual(Carte.objects.filter(est_bloquee=True).get().compte_id, self.comptes[0].id)
+        self.assertEqual(Notification.objects.filter(titre="Alerte découvert").count(), 3)
+
+    def test_alerts_are_deduplicated_with_the_account_field(self):
+        enforce_overdraft_bulk(self.comptes)
+        again = enforce_overdraft_bulk(self.comptes)
+        self.assertEqual(again, {"bloques": [], "debloques": [], "alertes": []})
+        self.assertEqual(Notification.objects.filter(titre="Alerte découvert").count(), 3)
+        later = timezone.now() + timedelta(hours=13)
+        self.assertEqual(len(enforce_overdraft_bulk(self.comptes, now=later)["alertes"]), 3)
+
+
+@override_settings(CARTE_AUTORISATION_CLE="test-key")
+class CardAuthorizationTests(TestCase):
+    def setUp(self):
+        cards.invalidate()
+        user = User.objects.create_user(username="carte", password="pass1234")
+        ProfilClient.objects.create(user=user)  # Essentiel : 100 € de découvert
+        self.compte = Compte.objects.create(user=user, solde=Decimal("50.00"), numero_compte="FR-CARTE-1")
+        self.carte = Carte.objects.create(
+            compte=self.compte, numero_visible="4242",
+            date_expiration=timezone.now().date() + timedelta(days=365), plafond_paiement=300,
+        )
+
+    def _authorize(self, **payload):
+        payload.setdefault("carte_id", self.carte.id)
+        return self.client.post(
+            reverse("api_autorisation_carte"), data=payload, content_type="application/json",
+            HTTP_X_BANQUISE_KEY="test-key",
+        )
+
+    def test_approved_payment_is_posted_within_balance_plus_overdraft(self):
+        response = self._authorize(montant="140.00", commercant="Librairie", categorie="LOISIRS")
+        self.assertEqual(response.json()["decision"], "APPROUVEE")
+        self.compte.refresh_from_db()
+        self.assertEqual(self.compte.solde, Decimal("-90.00"))
+        tx = Transaction.objects.get(pk=response.json()["transaction_id"])
+        self.assertEqual((tx.montant, tx.categorie), (Decimal("-140.00"), "LOISIRS"))
+        self.assertTrue(Notification.objects.filter(titre="Alerte découvert").exists())
+
+        refus = self._authorize(montant="20.00").json()
+        self.assertEqual((refus["decision"], refus["motif"]), ("REFUSEE", "SOLDE_INSUFFISANT"))
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_card_rules_are_served_from_the_write_through_cache(self):
+        cards.card_state(self.carte.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(cards.authorize(self.carte.id, Decimal("10"), etranger=True)["motif"], "ETRANGER_DESACTIVE")
+            self.assertEqual(cards.authorize(self.carte.id, Decimal("60"), sans_contact=True)["motif"], "PLAFOND_SANS_CONTACT")
+            self.assertEqual(cards.authorize(self.carte.id, Decimal("301"))["motif"], "PLAFOND_DEPASSE")
+        self.carte.est_bloquee = True
+        self.carte.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(cards.authorize(self.carte.id, Decimal("10"))["motif"], "CARTE_BLOQUEE")
+        Carte.objects.filter(pk=self.carte.pk).update(est_bloquee=False)
+        cards.invalidate([self.carte.pk])
+        self.assertEqual(cards.authorize(self.carte.id, Decimal("10"))["decision"], "APPROUVEE")
+
+    def test_card_blocked_by_another_process_is_refused_despite_the_cache(self):
+        cards.card_state(self.carte.id)
+        Carte.objects.filter(pk=self.carte.pk).update(est_bloquee=True)  # autre worker, cache local intact
+        refus = cards.authorize(self.carte.id, Decimal("10"))
+        self.assertEqual((refus["decision"], refus["motif"]), ("REFUSEE", "CARTE_BLOQUEE"))
+        self.assertFalse(Transaction.objects.exists())
+        self.compte.refresh_from_db()
+        self.assertEqual(self.compte.solde, Decimal("50.00"))
+        self.assertTrue(cards.card_state(self.carte.id).bloquee)
+
+    def test_endpoint_requires_the_shared_key_and_a_valid_amount(self):
+        response = self.client.post(reverse("api_autorisation_carte"), data={"carte_id": self.carte.id, "montant": "5"},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self._authorize(montant="-5").status_code, 400)
+        self.assertEqual(self._authorize(montant="5", carte_id=999999).json()["motif"], "CARTE_INCONNUE")
+
+
+class CardSpendCounterTests(TestCase):
+    def setUp(self):
+        cards.invalidate()
+        user = User.objects.create_user(username="plafonds", password="pass1234")
+        ProfilClient.objects.create(user=user)
+        self.compte = Compte.objects.create(user=user, solde=Decimal("5000.00"), numero_compte="FR-PLAF-1")
+        self.carte = Carte.objects.create(
+            compte=self.compte, numero_visible="1111", plafond_paiement=300, plafond_retrait=100,
+            date_expiration=timezone.now().date() + timedelta(days=365),
+        )
+
+    def test_payment_limit_is_enforced_on_a_rolling_30_day_window(self):
+        jour = timezone.localdate()
+        self.assertIsNone(spend.reserve(self.carte.id, "PAIEMENT", Decimal("200"), 300, today=jour))
+        self.assertEqual(spend.reserve(self.carte.id, "PAIEMENT", Decimal("150"), 300, today=jour + timedelta(days=29)), "PLAFOND_30J")
+        self.assertIsNone(spend.reserve(self.carte.id, "PAIEMENT", Decimal("150"), 300, today=jour + timedelta(days=30)))
+        compteur = CompteurCarte.objects.get(carte=self.carte, operation="PAIEMENT")
+        self.assertEqual((compteur.montant_jour, compteur.montant_30j), (Decimal("150"), Decimal("150")))
+
+    def test_authorizations_update_counters_and_reconciliation_matches(self):
+        self.assertEqual(cards.authorize(self.carte.id, Decimal("60"), retrait=True)["decision"], "APPROUVEE")
+        self.assertEqual(cards.authorize(self.carte.id, Decimal("50"), retrait=True)["motif"], "PLAFOND_JOUR")
+        self.assertEqual(cards.authorize(self.carte.id, Decimal("250"), categorie="SHOPPING")["decision"], "APPROUVEE")
+        self.assertEqual(cards.authorize(self.carte.id, Decimal("60"))["motif"], "PLAFOND_30J")
+        self.assertEqual(Transaction.objects.filter(carte=self.carte).count(), 2)
+
+        avant = set(CompteurCarte.objects.values_list("operation", "montant_jour", "montant_30j"))
+        CompteurCarte.objects.update(montant_jour=0, montant_30j=0)
+        call_command("rebuild_card_counters", stdout=StringIO())
+        apres = set(CompteurCarte.objects.values_list("operation", "montant_jour", "montant_30j"))
+        self.assertEqual(avant, apres)
+        self.assertEqual(spend.usage([self.carte.id])[self.carte.id], {"PAIEMENT": Decimal("250.00"), "RETRAIT": Decimal("60.00")})
+
+
+class CountingBackend(BaseEmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        mail.outbox.extend(messages)
+        return len(messages)
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError("smtp indisponible")
+
+
+class EmailOutboxTests(TestCase):
+    def test_signup_queues_the_code_and_the_worker_delivers_it(self):
+        response = self.client.post(reverse("register"), {
+            "username": "nouveau", "first_name": "Nina", "last_name": "Neige",
+            "email": "nina@example.com", "confirm_email": "nina@example.com",
+            "password": "motdepasse1!", "confirm_password": "motdepasse1!",
+            "birth_date": "1990-01-01", "birth_city": "Lyon",
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = EmailOutbox.objects.get()
+        self.assertEqual(queued.destinataires, ["nina@example.com"])
+
+        call_command("deliver_emails", stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(self.client.session["pending_email_code"], mail.outbox[0].body)
+        self.assertEqual(EmailOutbox.objects.get().statut, "ENVOYE")
+
+    @override_settings(EMAIL_BACKEND="scoring.tests.CountingBackend")
+    def test_batches_reuse_a_single_connection(self):
+        for i in range(5):
+            outbox.enqueue_email(f"Sujet {i}", "corps", [f"u{i}@example.com"])
+        CountingBackend.opened = 0
+        stats = outbox.deliver_pending(batch_size=2)
+        self.assertEqual(stats, {"envoyes": 5, "reportes": 0, "abandonnes": 0})
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(CountingBackend.opened, 3)  # un open() par lot sur la même connexion
+
+    @override_settings(EMAIL_BACKEND="scoring.tests.FailingBackend")
+    def test_failures_are_retried_with_backoff_then_abandoned(self):
+        outbox.enqueue_email("Sujet", "corps", ["a@example.com"])
+        now = timezone.now()
+        self.assertEqual(outbox.deliver_pending(now=now)["reportes"], 1)
+        row = EmailOutbox.objects.get()
+        self.assertEqual((row.statut, row.tentatives), ("EN_ATTENTE", 1))
+        self.assertEqual(outbox.deliver_pending(now=now)["reportes"], 0)  # pas encore dû
+        with self.assertLogs("scoring.outbox", level="ERROR"):
+            for _ in range(outbox.MAX_TENTATIVES - 1):
+                now += outbox.DELAI_MAX
+                outbox.deliver_pending(now=now)
+        row.refresh_from_db()
+        self.assertEqual((row.statut, row.tentatives), ("ECHEC", outbox.MAX_TENTATIVES))
+        self.assertIn("smtp indisponible", row.derniere_erreur)
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin_taches", password="pass1234", is_staff=True)
+        self.calls = []
+
+        @tasks.register("test_echo")
+        def echo(valeur, echecs=0):
+            self.calls.append(valeur)
+            if len(self.calls) <= echecs:
+                raise RuntimeError("boum")
+            return {"valeur": valeur}
+
+    def tearDown(self):
+        tasks.TACHES.pop("test_echo", None)
+
+    def test_claim_is_exclusive_and_expired_leases_are_reclaimed(self):
+        tache = tasks.enqueue("test_echo", {"valeur": 1})
+        now = timezone.now()
+        self.assertEqual(tasks.claim(5, "w1", now=now), [tache.id])
+        self.assertEqual(tasks.claim(5, "w2", now=now), [])
+        later = now + tasks.BAIL + timedelta(seconds=1)
+        self.assertEqual(tasks.claim(5, "w2", now=later), [tache.id])
+        self.assertIsNone(tasks.execute(tache.id, "w1"))  # bail perdu : w1 n'écrit plus
+        self.assertEqual(tasks.execute(tache.id, "w2"), "TERMINEE")
+        tache.refresh_from_db()
+        self.assertEqual((tache.tentatives, tache.resultat), (2, {"valeur": 1}))
+
+    def test_lease_is_renewed_during_execution_and_lost_lease_discards_the_outcome(self):
+        tache = tasks.enqueue("test_echo", {"valeur": 3})
+        tasks.claim(1, "w1")
+        avant = Tache.objects.get(pk=tache.pk).bail_expire
+        self.assertTrue(tasks.renew(tache.id, "w1", bail=tasks.BAIL * 2))
+        self.assertGreater(Tache.objects.get(pk=tache.pk).bail_expire, avant)
+        self.assertFalse(tasks.renew(tache.id, "w2"))
+
+        @tasks.register("test_lent")
+        def lent(valeur):
+            time.sleep(0.2)
+            # Bail repris par un autre worker pendant l'exécution
+            Tache.objects.filter(pk=tache.pk).update(worker="w2")
+            return {"fini": True}
+        self.addCleanup(tasks.TACHES.pop, "test_lent", None)
+        Tache.objects.filter(pk=tache.pk).update(nom="test_lent")
+        with mock.patch.object(tasks, "renew", return_value=True) as renew:
+            with self.assertLogs("scoring.tasks", level="WARNING"):
+                self.assertIsNone(tasks.execute(tache.id, "w1", bail=timedelta(seconds=0.03)))
+        self.assertGreaterEqual(renew.call_count, 2)
+        tache.refresh_from_db()
+        self.assertEqual((tache.statut, tache.worker, tache.resultat), ("EN_COURS", "w2", None))
+
+    def test_failures_are_retried_then_marked_failed(self):
+        tache = tasks.enqueue("test_echo", {"valeur": 2, "echecs": 5}, max_tentatives=2)
+        self.assertEqual(tasks.run_pending(worker="w"), 1)
+        tache.refresh_from_db()
+        self.assertEqual((tache.statut, tache.tentatives), ("EN_ATTENTE", 1))
+        self.assertGreater(tache.prochain_essai, timezone.now())
+        Tache.objects.filter(pk=tache.pk).update(prochain_essai=timezone.now())
+        with self.assertLogs("scoring.tasks", level="ERROR"):
+            tasks.run_pending(worker="w")
+        tache.refresh_from_db()
+        self.assertEqual(tache.statut, "ECHEC")
+        self.assertIn("boum", tache.erreur)
+
+    def test_stress_test_view_enqueues_and_status_is_polled_as_json(self):
+        self.client.login(username="admin_taches", password="pass1234")
+        self.client.get(reverse("admin_stress_test"), {"arriere_plan": "1", "paths": "300"})
+        self.assertFalse(Tache.objects.exists())  # GET : pas de mise en file
+        response = self.client.post(reverse("admin_stress_test"), {"paths": "300"})
+        tache = Tache.objects.get(nom="stress_test")
+        self.assertRedirects(response, f"{reverse('admin_stress_test')}?tache={tache.id}")
+        statut = self.client.get(reverse("api_tache_statut", args=[tache.id])).json()
+        self.assertEqual(statut["statut"], "EN_ATTENTE")
+
+        tasks.run_pending()
+        statut = self.client.get(reverse("api_tache_statut", args=[tache.id])).json()
+        self.assertEqual((statut["statut"], statut["resultat"]["trajectoires"]), ("TERMINEE", 300))
+        page = self.client.get(reverse("admin_stress_test"), {"tache": tache.id})
+        self.assertEqual(page.context["rapport"]["trajectoires"], 300)
+
+        autre = User.objects.create_user(username="curieux", password="pass1234")
+        self.client.force_login(autre)
+        self.assertEqual(self.client.get(reverse("api_tache_statut", args=[tache.id])).status_code, 404)
+
+
+class IbanAllocatorTests(TransactionTestCase):
+    # Hors transaction de test : les blocs ne sont servis qu'en autocommit
+    def setUp(self):
+        iban.reset()
+
+    def test_generated_ibans_pass_the_mod_97_checks(self):
+        self.assertTrue(iban.est_valide("FR76 3000 6000 0112 3456 7890 189"))
+        self.assertFalse(iban.est_valide("FR7630006000011234567890188"))
+        numero = iban.format_iban(123)
+        self.assertEqual(len(numero), 27)
+        self.assertTrue(iban.est_valide(numero))
+        self.assertEqual(iban.cle_rib(numero[4:9], numero[9:14], numero[14:25]), int(numero[25:]))
+
+    @override_settings(IBAN_BLOCK_SIZE=10)
+    def test_numbers_come_from_reserved_blocks_without_queries(self):
+        first = iban.allocate_iban()
+        with self.assertNumQueries(0):
+            suivants = [iban.allocate_iban() for _ in range(9)]
+        self.assertEqual(len({first, *suivants}), 10)
+        debut = SequenceCompte.objects.get(nom="COMPTE").prochain
+        iban.allocate_iban()
+        self.assertEqual(SequenceCompte.objects.get(nom="COMPTE").prochain, debut + 10)
+
+    @override_settings(IBAN_BLOCK_SIZE=10)
+    def test_numbers_taken_in_a_transaction_bypass_the_local_block(self):
+        from django.db import transaction
+        bloc = iban.allocate_numero()
+        debut = SequenceCompte.objects.get(nom="COMPTE").prochain
+        self.assertEqual(debut, bloc + 10)
+        try:
+            with transaction.atomic():
+                self.assertEqual(iban.allocate_numero(), debut)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        # Réservation annulée avec la transaction ; le bloc local, commité, continue de servir
+        self.assertEqual(SequenceCompte.objects.get(nom="COMPTE").prochain, debut)
+        with self.assertNumQueries(0):
+            self.assertEqual(iban.allocate_numero(), bloc + 1)
+        with transaction.atomic():
+            self.assertEqual(iban.allocate_numero(), debut)
+        self.assertEqual(SequenceCompte.objects.get(nom="COMPTE").prochain, debut + 1)
+
+
+class CustomerImportTests(TestCase):
+    def setUp(self):
+        catalogue.invalidate()
+        User.objects.create_user(username="deja", email="deja@example.com", password="pass1234")
+        User.objects.create_user(username="mixte", email="Mixte.Casse@Example.com", password="pass1234")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _write(self, name, content):
+        path = f"{self.tmp.name}/{name}"
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(content)
+        return path
+
+    def test_csv_and_jsonl_files_are_imported_in_chunks(self):
+        csv_path = self._write("clients.csv", "\n".join(
+            ["username,email,first_name,birth_date,abonnement"]
+            + [f"client{i},client{i}@example.com,C{i},1990-01-0{i % 9 + 1},PLUS" for i in range(5)]
+            + ["deja,autre@example.com,,,", ",sans-identifiant@example.com,,,", "x,y@example.com,,,GOLD"]
+        ))
+        jsonl_path = self._write("clients.jsonl", "\n".join([
+            json.dumps({"username": "json1", "email": "JSON1@example.com", "abonnement": "infinite"}),
+            json.dumps({"username": "client0", "email": "doublon@example.com"}),
+            "{pas du json",
+        ]))
+        out, err = StringIO(), StringIO()
+        call_command("import_customers", csv_path, jsonl_path, "--chunk-size", "2", stdout=out, stderr=err)
+        self.assertIn("6 client(s) créé(s), 2 déjà présent(s), 3 en erreur", out.getvalue())
+        self.assertIn("formule inconnue : GOLD", err.getvalue())
+
+        importes = User.objects.filter(username__startswith="client").count() + User.objects.filter(username="json1").count()
+        self.assertEqual(importes, 6)
+        self.assertEqual(ProfilClient.objects.get(user__username="client3").decouvert_autorise, Decimal("500.00"))
+        self.assertEqual(ProfilClient.objects.get(user__username="json1").abonnement, "INFINITE")
+        comptes = Compte.objects.filter(user__username__in=["client0", "json1"])
+        self.assertTrue(all(iban.est_valide(c.numero_compte) and c.solde == Decimal("100.00") for c in comptes))
+        self.assertEqual(Carte.objects.filter(compte__in=comptes).count(), 2)
+        self.assertEqual(Transaction.objects.filter(compte__in=comptes, libelle="Cadeau de bienvenue Banquise").count(), 2)
+        self.assertFalse(User.objects.get(username="json1").has_usable_password())
+
+    def test_signup_onboarding_is_idempotent(self):
+        from .onboarding import onboard_customer
+        user = User.objects.create_user(username="web", email="web@example.com", password="pass1234")
+        onboard_customer(user, birth_city="Nantes")
+        onboard_customer(user)
+        compte = Compte.objects.get(user=user)
+        self.assertEqual((compte.solde, compte.cartes.count(), compte.transactions.count()), (Decimal("100.00"), 1, 1))
+        self.assertEqual(user.profil.ville_naissance, "Nantes")
+
+    def test_dry_run_writes_nothing(self):
+        path = self._write("clients.csv", "username,email\nsec,sec@example.com\n")
+        out = StringIO()
+        call_command("import_customers", path, "--dry-run", stdout=out)
+        self.assertIn("1 client(s) à créer", out.getvalue())
+        self.assertFalse(User.objects.filter(username="sec").exists())
+
+    def test_existing_email_is_matched_whatever_its_case(self):
+        path = self._write("clients.csv", "username,email\nautre,MIXTE.casse@example.COM\n")
+        out = StringIO()
+        call_command("import_customers", path, stdout=out, stderr=StringIO())
+        self.assertIn("0 client(s) créé(s), 1 déjà présent(s)", out.getvalue())
+        self.assertFalse(User.objects.filter(username="autre").exists())
+
+
+class CachePolicyTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_public_page_is_cached_for_anonymous_visitors(self):
+        url = reverse("tarifs")
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("public", first["Cache-Control"])
+        self.assertIn("Cookie", first["Vary"])
+        etag = first["ETag"]
+
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again["ETag"], etag)
+
+    def test_authenticated_and_private_pages_stay_no_store(self):
+        user = User.objects.create_user(username="cachee", password="pass1234")
+        self.client.force_login(user)
+        self.assertIn("no-store", self.client.get(reverse("tarifs"))["Cache-Control"])
+        self.assertIn("no-store", self.client.get(reverse("dashboard"))["Cache-Control"])
+        self.client.logout()
+        self.assertIn("no-store", self.client.get(reverse("login"))["Cache-Control"])
+
+
+class CssBundleTests(TestCase):
+    def test_prebuilt_bundle_replaces_tailwind_cdn(self):
+        from django.core.cache import cache
+        cache.clear()
+        with override_settings(TAILWIND_CDN=False):
+            response = self.client.get(reverse("a_propos"))
+        self.assertContains(response, "css/tailwind.min.css")
+        self.assertNotContains(response, "cdn.tailwindcss.com")
+        self.assertNotIn("cdn.tailwindcss.com", response["Content-Security-Policy"])
+
+        with override_settings(TAILWIND_CDN=True):
+            response = self.client.get(reverse("produits_cartes"))
+        self.assertContains(response, "https://cdn.tailwindcss.com")
+        self.assertIn("cdn.tailwindcss.com", response["Content-Security-Policy"])
+
+    def test_build_css_runs_minified_tailwind_build(self):
+        import os
+        import stat
+        tmp = tempfile.mkdtemp()
+        binary = os.path.join(tmp, "tailwindcss")
+        with open(binary, "w") as fh:
+            fh.write('#!/bin/sh\nout=""\nwhile [ "$#" -gt 0 ]; do [ "$1" = "-o" ] && out="$2"; shift; done\nprintf ".a{color:red}" > "$out"\n')
+        os.chmod(binary, os.stat(binary).st_mode | stat.S_IEXEC)
+        output = os.path.join(tmp, "css", "tailwind.min.css")
+        out = StringIO()
+        with override_settings(TAILWINDCSS_BIN=binary, TAILWIND_CSS=output):
+            call_command("build_css", stdout=out)
+        with open(output) as fh:
+            self.assertEqual(fh.read(), ".a{color:red}")
+        self.assertIn("CSS construit", out.getvalue())
+
+
+    @override_settings(DEBUG=False, TAILWINDCSS_BIN="/nonexistent/tailwindcss")
+    def test_failed_css_build_stops_collectstatic_in_production(self):
+        with self.assertRaisesMessage(CommandError, "--css-fallback"):
+            call_command("collectstatic", "--noinput", stdout=StringIO(), stderr=StringIO())
+
+class PerfInstrumentationTests(TestCase):
+    def setUp(self):
+        from . import perf
+        perf.reset()
+        self.staff = User.objects.create_user(username="ops", password="pass1234", is_staff=True)
+
+    @override_settings(PERF_SAMPLE_RATE=1.0)
+    def test_requests_are_recorded_per_url_name(self):
+        from . import perf
+        self.client.force_login(self.staff)
+        for _ in range(3):
+            self.assertEqual(self.client.get(reverse("dashboard")).status_code, 200)
+        ligne = next(r for r in perf.rapport() if r["route"] == "dashboard")
+        self.assertEqual(ligne["n"], 3)
+        self.assertGreater(ligne["requetes_moy"], 0)
+        self.assertGreater(ligne["templates_moy_ms"], 0)
+        self.assertGreaterEqual(ligne["p99_ms"], ligne["p50_ms"])
+
+        page = self.client.get(reverse("admin_perf"))
+        self.assertContains(page, "dashboard")
+        self.client.post(reverse("admin_perf"))
+        self.assertEqual([r["route"] for r in perf.rapport()], ["admin_perf"])
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_unsampled_requests_cost_nothing_and_page_is_staff_only(self):
+        from . import perf
+        user = User.objects.create_user(username="client", password="pass1234")
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(reverse("admin_perf")).status_code, 302)
+        self.client.get(reverse("dashboard"))
+        self.assertEqual(perf.rapport(), [])
+
+
+class QueryBudgetTests(TestCase):
+    """Budgets de requêtes SQL et plafonds de durée des vues principales, sur un jeu ``seed_bank``."""
+
+    PLAFOND_SECONDES = 2.0
+    VUES_CLIENT = {
+        "dashboard": 30, "gerer_comptes": 7, "statistiques": 10, "cartes": 8, "virement": 5,
+        "beneficiaires": 4, "historique": 6, "notifications": 5, "profil": 6, "chat_support": 5,
+    }
+    VUES_STAFF = {
+        "admin_dashboard": 9, "admin_reports": 12, "admin_manage": 12, "admin_manage_credits": 5,
+        "chat_support_admin": 11, "admin_stats_api": 6,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_bank(users=120, transactions=12000, seed=7, chunk_size=1000)
+        cls.client_user = User.objects.filter(username__startswith="seed").order_by("id").first()
+        cls.staff = User.objects.create_user(username="budget_admin", password="pass1234", is_staff=True, is_superuser=True)
+
+    def assertBudget(self, url, queries):
+        self.client.get(url)  # caches du process (référentiel, cartes) déjà chauds
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = self.client.get(url)
+            elapsed = time.perf_counter() - start
+        self.assertEqual(response.status_code, 200, url)
+        self.assertLessEqual(len(ctx), queries, f"{url} : {len(ctx)} requêtes\n" + "\n".join(q["sql"] for q in ctx.captured_queries))
+        self.assertLess(elapsed, self.PLAFOND_SECONDES, url)
+
+    def test_client_views_stay_within_budget(self):
+        self.client.force_login(self.client_user)
+        for name, queries in self.VUES_CLIENT.items():
+            self.assertBudget(reverse(name), queries)
+
+    def test_staff_views_stay_within_budget(self):
+        self.client.force_login(self.staff)
+        for name, queries in self.VUES_STAFF.items():
+            self.assertBudget(reverse(name), queries)
+
+    def test_seed_is_deterministic(self):
+        def historique(prefix):
+            seed_bank(users=3, transactions=40, seed=11, prefix=prefix, chunk_size=16)
+            qs = Transaction.objects.filter(compte__user__username__startswith=prefix).order_by("id")
+            return [(t.compte.user.username[len(prefix):], t.montant, t.categorie, t.date_execution.date()) for t in qs]
+
+        premier = historique("alpha")
+        self.assertEqual(len(premier), 43)
+        self.assertEqual(premier, historique("beta"))
+        with self.assertRaises(ValueError):
+            seed_bank(users=1, transactions=0, prefix="alpha")
+
+
+class LoadTestScriptTests(LiveServerTestCase):
+    """``scripts/load_test.py`` joué brièvement contre le serveur de test."""
+
+    def _script(self):
+        import importlib.util
+        from pathlib import Path
+        path = Path(__file__).resolve().parents[1] / "scripts" / "load_test.py"
+        spec = importlib.util.spec_from_file_location("load_test", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    def _run(self, *options):
+        with tempfile.NamedTemporaryFile(suffix=".json") as fh:
+            code = self._script().main([
+                "--url", self.live_server_url, "--duration", "1", "--ramp-up", "0", "--json", fh.name, *options,
+            ], out=StringIO())
+            with open(fh.name, encoding="utf-8") as rapport:
+                return code, json.load(rapport)
+
+    def test_short_run_reports_every_step(self):
+        seed_bank(users=2, transactions=60, seed=3, chunk_size=50)
+        User.objects.create_user(username="charge_admin", password="pass1234", is_staff=True)
+
+        # Un seul utilisateur virtuel à la fois : la base de test SQLite en mémoire est partagée entre threads
+        code, rapport = self._run("--users", "1", "--accounts", "1", "--mix", "virement=1")
+        self.assertEqual(code, 0)
+        self.assertEqual(rapport["global"]["erreurs"], 0, rapport["erreurs"])
+        self.assertEqual(set(rapport["etapes"]), {"login", "virement"})
+        for cle in ("p50_ms", "p95_ms", "p99_ms", "debit_par_s", "taux_erreur"):
+            self.assertIn(cle, rapport["global"])
+        self.assertTrue(Transaction.objects.filter(compte__user__username="seed0000000", montant=Decimal("-1.00")).exists())
+
+        code, rapport = self._run("--users", "0", "--admin", "charge_admin:pass1234")
+        self.assertEqual(code, 0)
+        self.assertGreater(rapport["etapes"]["admin_manage"]["requetes"], 0)
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_run_measures_selected_cases(self):
+        from . import benchmarks
+        resultats = benchmarks.run(noms=["months_diff", "normalize_iban"], repeat=2, min_time=0.001)
+        self.assertEqual(set(resultats["cas"]), {"months_diff", "normalize_iban"})
+        for mesure in resultats["cas"].values():
+            self.assertGreater(mesure["min_us"], 0)
+            self.assertLessEqual(mesure["min_us"], mesure["mediane_us"])
+        with self.assertRaises(ValueError):
+            benchmarks.run(noms=["inconnu"])
+
+    def test_baseline_covers_every_case(self):
+        from . import benchmarks
+        from .benchmarks.cases import CAS
+        self.assertEqual(set(benchmarks.charger()["cas"]), set(CAS))
+
+    def test_compare_flags_regressions_beyond_threshold(self):
+        from . import benchmarks
+        reference = {"cas": {"a": {"min_us": 10.0}, "b": {"min_us": 10.0}, "c": {"min_us": 10.0}, "d": {"min_us": 1.0}}}
+        actuel = {"cas": {"a": {"min_us": 12.5}, "b": {"min_us": 11.0}, "c": {"min_us": 7.0}, "e": {"min_us": 1.0}}}
+        statuts = {l["cas"]: l["statut"] for l in benchmarks.compare(actuel, reference, seuil=0.2)}
+        self.assertEqual(statuts, {"a": "REGRESSION", "b": "STABLE", "c": "AMELIORATION", "d": "ABSENT", "e": "NOUVEAU"})
+
+    def test_compare_command_strict_fails_on_regression(self):
+        from . import benchmarks
+        with tempfile.TemporaryDirectory() as tmp:
+            actuel, reference = f"{tmp}/actuel.json", f"{tmp}/reference.json"
+            call_command("run_benchmarks", "--only", "months_diff", "--repeat", "1", "--min-time", "0.001",
+                         "--json", actuel, stdout=StringIO())
+            resultats = benchmarks.charger(actuel)
+            resultats["cas"]["months_diff"]["min_us"] /= 10
+            benchmarks.enregistrer(resultats, reference)
+            out = StringIO()
+            call_command("compare_benchmarks", actuel, "--baseline", reference, stdout=out, stderr=StringIO())
+            self.assertIn("REGRESSION", out.getvalue())
+            with self.assertRaises(CommandError):
+                call_command("compare_benchmarks", actuel, "--baseline", reference, "--strict",
+                             stdout=StringIO(), stderr=StringIO())
@@ -0,0 +1,73 @@
+"""
+Apprentissage incrémental du modèle de scoring à partir des décisions admin.
+
+Chaque version publiée mémorise un point de reprise ``(date_decision, id)`` :
+l'exécution suivante ne lit que les décisions postérieures, par lots, et
+poursuit la descente de gradient depuis les poids courants. Le coût d'une mise
+à jour dépend donc du nombre de nouvelles décisions, pas de l'historique.
+"""
+from datetime import datetime
+
+from django.db.models import Q
+
+from . import ml
+from .credit_engine import feature_arrays
+from .models import DemandeCredit
+
+DECISIONS = ('ACCEPTEE', 'REFUSEE')
+
+
+def _checkpoint(meta):
+    raw = meta.get('checkpoint_date') or ''
+    return (datetime.fromisoformat(raw) if raw else None), int(meta.get('checkpoint_id') or 0)
+
+
+def new_decisions(checkpoint_date, checkpoint_id, chunk_size=1000):
+    """Itère sur les demandes décidées après le point de reprise, par lots (pagination par clé)."""
+    qs = DemandeCredit.objects.filter(
+        statut__in=DECISIONS, date_decision__isnull=False
+    ).select_related('produit').order_by('date_decision', 'id')
+    while True:
+        page = qs
+        if checkpoint_date is not None:
+            page = qs.filter(
+                Q(date_decision__gt=checkpoint_date) | Q(date_decision=checkpoint_date, id__gt=checkpoint_id)
+            )
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        checkpoint_date, checkpoint_id = chunk[-1].date_decision, chunk[-1].id
+
+
+def update_model(chunk_size=1000, lr=0.05, batch_size=64, epochs=1, l2=0.0, publish=True):
+    """
+    Met à jour les poids avec les décisions postérieures au dernier point de reprise.
+    Retourne un dict de synthèse (``version`` vaut ``None`` si rien n'a été publié).
+    """
+    weights, meta = ml.load_model()
+    parent = meta.get('version')
+    if weights is None:
+        weights, parent = ml.train_credit_model(), None
+    checkpoint_date, checkpoint_id = _checkpoint(meta)
+
+    seen = accepted = 0
+    for chunk in new_decisions(checkpoint_date, checkpoint_id, chunk_size):
+        f = feature_arrays(chunk)
+        X = ml.design_matrix(f['revenus'] / 1000.0, f['dti'], f['ltv'], f['apport_ratio'])
+        y = [1.0 if d.statut == 'ACCEPTEE' else 0.0 for d in chunk]
+        weights = ml.sgd_update(weights, X, y, lr=lr, batch_size=batch_size, epochs=epochs, l2=l2, seed=seen)
+        seen += len(chunk)
+        accepted += int(sum(y))
+        checkpoint_date, checkpoint_id = chunk[-1].date_decision, chunk[-1].id
+
+    summary = {'parent': parent, 'decisions': seen, 'acceptees': accepted, 'version': None}
+    if seen and publish:
+        summary['version'] = ml.save_weights(
+            weights,
+            parent_version=parent if parent is not None else 0,
+            checkpoint_date=checkpoint_date.isoformat(),
+            checkpoint_id=checkpoint_id,
+            n_decisions=int(meta.get('n_decisions') or 0) + seen,
+        )
+    return summary
@@ -34,8 +34,12 @@ urlpatterns = [
     path('simulation/', views.page_simulation, name='simulation'),
     path('resultat/<int:demande_id>/', views.page_resultat, name='resultat_simulation'),
     path('resultat/<int:demande_id>/valider/', views.valider_demande_credit, name='valider_demande_credit'),
+    path('resultat/brouillon/<str:token>/', views.page_resultat_brouillon, name='resultat_brouillon'),
+    path('resultat/brouillon/<str:token>/valider/', views.valider_brouillon, name='valider_brouillon'),
     path('demande/<int:demande_id>/supprimer/', views.supprimer_demande_credit, name='supprimer_demande_credit'),
     path('historique/', views.page_historique, name='historique'),
+    path('api/taches/<int:tache_id>/', views.api_tache_statut, name='api_tache_statut'),
+    path('api/cartes/autorisation/', views.api_autorisation_carte, name='api_autorisation_carte'),
     path('api/calcul-pret/', views.api_calcul_pret_dynamique, name='api_calcul_pret'),
     path('changer-abonnement/', views.changer_abonnement, name='changer_abonnement'),
     path('demande-decouvert/', views.demande_decouvert, name='demande_decouvert'),
@@ -44,7 +48,9 @@ urlpatterns = [
     path('support/', views.support, name='support'),
     path('profil/', views.profil, name='profil'),
     path('admin-dashboard/', views.admin_dashboard_view, name='admin_dashboard'),
+    path('admin-dashboard/perf/', views.admin_perf, name='admin_perf'),
     path('admin-reports/', views.admin_reports, name='admin_reports'),
+    path('admin-reports/stress-test/', views.admin_stress_test, name='admin_stress_test'),
     path('api/admin-stats/', views.admin_stats_api, name='admin_stats_api'),
     path('produits/comptes/', views.produits_comptes, name='produits_comptes'),
     path('produits/cartes/', views.produits_cartes, name='produits_cartes'),
@@ -77,4 +83,5 @@ urlpatterns = [
     path('200/', views.preview_200, name='preview_200'),
     path('credit/<int:demande_id>/', views.demande_credit_detail, name='demande_credit_detail'),
     path('api/resultat/<int:demande_id>/update/', views.api_update_resultat, name='api_update_resultat'),
+    path('api/resultat/brouillon/<str:token>/update/', views.api_update_brouillon, name='api_update_brouillon'),
 ]
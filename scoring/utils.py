@@ -1,34 +1,89 @@
-from decimal import Decimal
-from datetime import timedelta
-
+from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
 from django.utils import timezone
 
+from . import cards, catalogue
 from .models import ProfilClient, DemandeDecouvert
 
 
-def _base_overdraft_limit(user):
-    profil, _ = ProfilClient.objects.get_or_create(user=user, defaults={
-        'abonnement': 'ESSENTIEL',
-        'prochaine_facturation': timezone.now().date() + timedelta(days=30)
-    })
-    return {
-        'ESSENTIEL': Decimal("100.00"),
-        'PLUS': Decimal("500.00"),
-        'INFINITE': Decimal("1000.00")
-    }.get(profil.abonnement, Decimal("100.00"))
+def _active_boosts(user_ids, today=None):
+    """Dernier découvert temporaire accepté et non expiré, par utilisateur."""
+    today = today or timezone.now().date()
+    boosts = {}
+    demandes = DemandeDecouvert.objects.filter(user_id__in=user_ids, statut='ACCEPTEE').filter(
+        models.Q(expire_le__isnull=True) | models.Q(expire_le__gte=today)
+    ).order_by('-cree_le').values_list('user_id', 'montant_souhaite')
+    for user_id, montant in demandes:
+        boosts.setdefault(user_id, montant)
+    return boosts
+
+
+def effective_overdraft_limit(abonnement, boost=None):
+    base = catalogue.decouvert_autorise(abonnement)
+    return max(base, boost) if boost else base
 
 
-def _active_decouvert_boost(user):
-    return DemandeDecouvert.objects.filter(
-        user=user,
-        statut='ACCEPTEE'
-    ).filter(
-        models.Q(expire_le__isnull=True) | models.Q(expire_le__gte=timezone.now().date())
-    ).order_by('-cree_le').first()
+def refresh_overdraft_limits(user_ids, today=None):
+    """
+    Recalcule le découvert effectif stocké sur les profils (formule + découvert
+    temporaire) en deux requêtes de lecture. Retourne les ids des utilisateurs
+    dont la limite a changé.
+    """
+    user_ids = list(user_ids)
+    profils = list(ProfilClient.objects.filter(user_id__in=user_ids))
+    boosts = _active_boosts(user_ids, today)
+    changed = []
+    for profil in profils:
+        limite = effective_overdraft_limit(profil.abonnement, boosts.get(profil.user_id))
+        if profil.decouvert_autorise != limite:
+            profil.decouvert_autorise = limite
+            changed.append(profil)
+    ProfilClient.objects.bulk_update(changed, ['decouvert_autorise'], batch_size=1000)
+    cards.invalidate_users([p.user_id for p in changed])
+    return [p.user_id for p in changed]
 
 
 def overdraft_limit_for_user(user):
-    base = _base_overdraft_limit(user)
-    boost = _active_decouvert_boost(user)
-    return max(base, boost.montant_souhaite) if boost else base
+    """Découvert autorisé, lu sur le profil (aucune écriture, aucune requête si le profil est déjà chargé)."""
+    try:
+        return user.profil.decouvert_autorise
+    except ObjectDoesNotExist:
+        return effective_overdraft_limit('ESSENTIEL')
+
+
+def refresh_all_overdraft_limits(chunk_size=1000, **filters):
+    """Recalcule les limites de tous les profils (ou d'un sous-ensemble), par lots. Retourne les ids modifiés."""
+    qs = ProfilClient.objects.filter(**filters).order_by('user_id')
+    changed = []
+    last_id = 0
+    while True:
+        ids = list(qs.filter(user_id__gt=last_id).values_list('user_id', flat=True)[:chunk_size])
+        if not ids:
+            return changed
+        last_id = ids[-1]
+        changed.extend(refresh_overdraft_limits(ids))
+
+
+def expire_overdraft_boosts(today=None):
+    """Passe en EXPIREE les découverts temporaires échus et recalcule les limites concernées."""
+    today = today or timezone.now().date()
+    echus = DemandeDecouvert.objects.filter(statut='ACCEPTEE', expire_le__lt=today)
+    user_ids = set(echus.values_list('user_id', flat=True))
+    expired = echus.update(statut='EXPIREE')
+    return expired, refresh_overdraft_limits(user_ids, today)
+
+
+def on_profil_created(sender, instance, created, **kwargs):
+    if not created:
+        return
+    limite = effective_overdraft_limit(instance.abonnement, _active_boosts([instance.user_id]).get(instance.user_id))
+    if instance.decouvert_autorise != limite:
+        instance.decouvert_autorise = limite
+        ProfilClient.objects.filter(pk=instance.pk).update(decouvert_autorise=limite)
+        cards.invalidate_users([instance.user_id])
+
+
+def on_formule_saved(sender, instance, **kwargs):
+    # Palier de découvert modifié : profils de la formule recalculés
+    catalogue.invalidate()
+    refresh_all_overdraft_limits(abonnement=instance.code)
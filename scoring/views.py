@@ -6,7 +6,8 @@ from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.forms import AuthenticationForm, PasswordChangeForm
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
-from django.core.mail import send_mail
+from django.views.decorators.csrf import csrf_exempt
+from django.conf import settings
 from django.db import transaction, models
 from django.db.models import Sum, F, Q
 import csv
@@ -15,13 +16,9 @@ from django.utils import timezone
 from django.urls import reverse
 from datetime import timedelta, datetime
 from decimal import Decimal
-from math import exp, log
-try:
-    import numpy as np
-except ImportError:
-    np = None
 import random
 import io
+import hmac
 import json
 import re
 import csv
@@ -38,6 +35,7 @@ try:
 except ImportError:
     HAS_REPORTLAB = False
 
+from .cache_policy import public_page
 from .forms import (
     InscriptionForm, VirementForm, SimulationPretForm, 
     OuvrirCompteForm, CloturerCompteForm, TransactionFilterForm,
@@ -45,70 +43,26 @@ from .forms import (
 )
 from .models import (
     Compte, Carte, Transaction, DemandeCredit, ProfilClient, ProduitPret,
-    Beneficiaire, MessageSupport, Notification, DemandeDecouvert
+    Beneficiaire, MessageSupport, Notification, DemandeDecouvert, Tache
+)
+from .utils import overdraft_limit_for_user, refresh_overdraft_limits
+from .overdraft import enforce_overdraft_bulk
+from .credit_engine import score_application
+from .stress import run_stress_test
+from .features import revenus_verifies
+from . import cards, catalogue, perf, spend, tasks
+from .outbox import enqueue_email
+from .iban import allocate_iban
+from .onboarding import onboard_customer
+from .simulations import discard_simulation, load_simulation, store_simulation, update_simulation
+from .finance import (
+    affordability_grid, amortization_schedule, min_duration_for_payment,
+    principal_for_payment, suggested_duration, to_cents
 )
-from .utils import overdraft_limit_for_user
 
 # BIC Statique pour la démo
 BANQUISE_BIC = "BANQFR76"
 
-PLAN_CONFIG = {
-    'ESSENTIEL': {'prix': Decimal("0.00"), 'label': 'Essentiel'},
-    'PLUS': {'prix': Decimal("9.90"), 'label': 'Plus'},
-    'INFINITE': {'prix': Decimal("19.90"), 'label': 'Infinite'},
-}
-
-# Petit modèle ML entraîné sur un dataset synthétique (logistic regression)
-_ML_WEIGHTS = None
-
-
-def _train_credit_model():
-    """Entraîne rapidement un modèle logistique sur un dataset synthétique pour approximer le risque."""
-    global _ML_WEIGHTS
-    if _ML_WEIGHTS is not None or np is None:
-        return
-    rng = np.random.default_rng(42)
-    n = 600
-    revenus = rng.uniform(1, 12, size=n)      # k€
-    dti = rng.uniform(10, 70, size=n)         # %
-    ltv = rng.uniform(50, 110, size=n)        # %
-    apport = rng.uniform(0, 0.6, size=n)      # ratio
-
-    # Règle synthétique pour générer un label
-    score = (revenus > 4).astype(int) + (dti < 40).astype(int) + (ltv < 90).astype(int) + (apport > 0.2).astype(int)
-    y = (score >= 3).astype(float)  # 1 si profil jugé "bon" par la règle, sinon 0
-
-    X = np.column_stack([revenus, dti, ltv, apport])
-    X = (X - X.mean(axis=0)) / (X.std(axis=0) + 1e-6)  # normalisation simple
-    X = np.concatenate([np.ones((n, 1)), X], axis=1)   # biais
-    w = np.zeros(X.shape[1])
-    lr = 0.05
-    for _ in range(300):  # descente de gradient rapide
-        z = X @ w
-        pred = 1 / (1 + np.exp(-z))
-        grad = X.T @ (pred - y) / n
-        w -= lr * grad
-    _ML_WEIGHTS = w
-
-
-def _ml_score(revenus, dti, ltv, apport_ratio):
-    """Retourne un score 0-100 issu du modèle logistique synthétique."""
-    if np is None:
-        return None
-    if _ML_WEIGHTS is None:
-        _train_credit_model()
-    if _ML_WEIGHTS is None:
-        return None
-    x = np.array([
-        1.0,
-        (revenus - 6) / 3,          # centrage approximatif
-        (dti - 40) / 15,
-        (ltv - 90) / 15,
-        (apport_ratio - 0.2) / 0.15
-    ])
-    z = float(np.dot(_ML_WEIGHTS, x))
-    prob = 1 / (1 + exp(-z))
-    return int(max(0, min(100, prob * 100)))
 
 def notifier(user, titre, contenu, type_evt='INFO', url=''):
     Notification.objects.create(
@@ -153,44 +107,21 @@ def preview_200(request):
 
 
 
-def enforce_overdraft(compte):
-    """Blocage/déblocage des cartes en fonction du découvert autorisé."""
-    limit = overdraft_limit_for_user(compte.user)
-    solsous = compte.solde
-    cartes = Carte.objects.filter(compte=compte)
-
-    # Alerte préventive quand on approche du seuil de blocage
-    seuil_alerte = -limit * Decimal("0.8")
-    if solsous <= seuil_alerte:
-        recent_alert = Notification.objects.filter(
-            user=compte.user,
-            titre__icontains="Alerte découvert",
-            date_creation__gte=timezone.now() - timedelta(hours=12)
-        ).exists()
-        if not recent_alert:
-            notifier(
-                compte.user,
-                "Alerte découvert",
-                f"Votre solde ({solsous} €) s'approche de la limite autorisée ({-limit} €).",
-                "INFO",
-                url=reverse('dashboard')
-            )
+def _appliquer_decouvert(user_id):
+    """Recalcule le découvert effectif d'un client puis réévalue les cartes de ses comptes."""
+    refresh_overdraft_limits([user_id])
+    enforce_overdraft_bulk(Compte.objects.filter(user_id=user_id).values_list('id', flat=True))
 
-    if solsous < -limit:
-        # Blocage si pas déjà bloqué
-        updated = cartes.filter(est_bloquee=False).update(est_bloquee=True)
-        if updated:
-            notifier(compte.user, "Découvert dépassé", "Vos cartes sont bloquées jusqu'au retour en dessous du découvert autorisé.", "TRANSACTION", url=reverse('cartes'))
-    else:
-        # Déblocage si le compte est revenu au-dessus du découvert autorisé
-        updated = cartes.filter(est_bloquee=True).update(est_bloquee=False)
-        if updated:
-            notifier(compte.user, "Cartes débloquées", "Votre solde est revenu au-dessus du découvert autorisé.", "TRANSACTION", url=reverse('cartes'))
+
+def enforce_overdraft(compte):
+    """Blocage/déblocage des cartes en fonction du découvert autorisé (voir overdraft.enforce_overdraft_bulk)."""
+    enforce_overdraft_bulk([compte])
 
 # ==============================================================================
 # 1. AUTHENTIFICATION
 # ==============================================================================
 
+@public_page()
 def home(request):
     unread_notifs = 0
     if request.user.is_authenticated:
@@ -216,52 +147,42 @@ def register(request):
         request.session['pending_email_code'] = code
         request.session['pending_code_sent_at'] = timezone.now().isoformat()
         request.session['pending_email'] = user.email
-        try:
-            # Email HTML stylisé
-            subject = "Banquise - Code de confirmation"
-            message_text = f"Votre code de vérification est : {code}"
-            html_message = f"""
-            <div style="background:#f8fafc;padding:32px;font-family:'Plus Jakarta Sans',Arial,sans-serif;color:#0f172a;">
-              <div style="max-width:560px;margin:auto;border:1px solid #e2e8f0;border-radius:24px;overflow:hidden;background:white;box-shadow:0 18px 45px rgba(8,47,73,0.15);">
-                <div style="padding:22px 24px;background:linear-gradient(135deg,#0ea5e9,#6366f1);color:white;display:flex;align-items:center;justify-content:space-between;gap:12px;">
-                  <div style="display:flex;align-items:center;gap:12px;font-weight:800;font-size:19px;letter-spacing:0.6px;">
-                    <span style="display:inline-flex;width:42px;height:42px;border-radius:14px;background:rgba(255,255,255,0.15);border:1px solid rgba(255,255,255,0.3);align-items:center;justify-content:center;font-size:20px;color:white;">❄️</span>
-                    <span style="text-transform:uppercase;color:white;">BANQUISE</span>
-                  </div>
-                  <span style="padding:8px 12px;border-radius:999px;border:1px solid rgba(255,255,255,0.4);font-weight:700;font-size:12px;letter-spacing:0.1em;">Sécurité</span>
-                </div>
-                <div style="padding:28px;">
-                  <p style="font-size:14px;font-weight:700;color:#0ea5e9;margin:0 0 6px;letter-spacing:0.08em;text-transform:uppercase;">Code de confirmation</p>
-                  <h2 style="margin:0 0 12px;font-size:24px;font-weight:800;color:#0f172a;line-height:1.3;">Activez votre compte Banquise</h2>
-                  <p style="font-size:15px;line-height:1.6;margin:0 0 16px;">Bonjour {user.first_name or user.username}, voici votre code de vérification pour sécuriser votre inscription.</p>
-                  <div style="text-align:center;margin:26px 0;">
-                    <span style="display:inline-block;font-size:30px;font-weight:800;letter-spacing:10px;padding:18px 26px;border-radius:18px;background:#e0f2fe;color:#0ea5e9;border:1px solid #bae6fd;box-shadow:0 12px 25px rgba(14,165,233,0.18);">{code}</span>
-                  </div>
-                  <p style="font-size:13px;line-height:1.6;margin:0 0 14px;color:#475569;text-align:center;">Valide pendant 10 minutes. Si vous n'êtes pas à l'origine de cette demande, ignorez cet email.</p>
-                  <div style="margin-top:22px;padding:16px 18px;border-radius:14px;background:#f8fafc;border:1px solid #e2e8f0;display:flex;gap:12px;align-items:flex-start;">
-                    <span style="width:34px;height:34px;border-radius:10px;background:#e0f2fe;color:#0ea5e9;display:inline-flex;align-items:center;justify-content:center;font-weight:800;">i</span>
-                    <div>
-                      <p style="margin:0;font-size:12px;font-weight:800;color:#0ea5e9;letter-spacing:0.08em;text-transform:uppercase;">Support Banquise</p>
-                      <p style="margin:4px 0 0;font-size:13px;color:#475569;">Besoin d'aide ? Répondez à cet email ou ouvrez le chat support depuis l'app.</p>
-                    </div>
-                  </div>
-                </div>
-                <div style="background:#0f172a;color:white;padding:14px 24px;font-size:12px;text-align:center;letter-spacing:0.04em;">
-                  Banquise • Banque nouvelle génération • www.banquise.com
+        # Email HTML stylisé
+        subject = "Banquise - Code de confirmation"
+        message_text = f"Votre code de vérification est : {code}"
+        html_message = f"""
+        <div style="background:#f8fafc;padding:32px;font-family:'Plus Jakarta Sans',Arial,sans-serif;color:#0f172a;">
+          <div style="max-width:560px;margin:auto;border:1px solid #e2e8f0;border-radius:24px;overflow:hidden;background:white;box-shadow:0 18px 45px rgba(8,47,73,0.15);">
+            <div style="padding:22px 24px;background:linear-gradient(135deg,#0ea5e9,#6366f1);color:white;display:flex;align-items:center;justify-content:space-between;gap:12px;">
+              <div style="display:flex;align-items:center;gap:12px;font-weight:800;font-size:19px;letter-spacing:0.6px;">
+                <span style="display:inline-flex;width:42px;height:42px;border-radius:14px;background:rgba(255,255,255,0.15);border:1px solid rgba(255,255,255,0.3);align-items:center;justify-content:center;font-size:20px;color:white;">❄️</span>
+                <span style="text-transform:uppercase;color:white;">BANQUISE</span>
+              </div>
+              <span style="padding:8px 12px;border-radius:999px;border:1px solid rgba(255,255,255,0.4);font-weight:700;font-size:12px;letter-spacing:0.1em;">Sécurité</span>
+            </div>
+            <div style="padding:28px;">
+              <p style="font-size:14px;font-weight:700;color:#0ea5e9;margin:0 0 6px;letter-spacing:0.08em;text-transform:uppercase;">Code de confirmation</p>
+              <h2 style="margin:0 0 12px;font-size:24px;font-weight:800;color:#0f172a;line-height:1.3;">Activez votre compte Banquise</h2>
+              <p style="font-size:15px;line-height:1.6;margin:0 0 16px;">Bonjour {user.first_name or user.username}, voici votre code de vérification pour sécuriser votre inscription.</p>
+              <div style="text-align:center;margin:26px 0;">
+                <span style="display:inline-block;font-size:30px;font-weight:800;letter-spacing:10px;padding:18px 26px;border-radius:18px;background:#e0f2fe;color:#0ea5e9;border:1px solid #bae6fd;box-shadow:0 12px 25px rgba(14,165,233,0.18);">{code}</span>
+              </div>
+              <p style="font-size:13px;line-height:1.6;margin:0 0 14px;color:#475569;text-align:center;">Valide pendant 10 minutes. Si vous n'êtes pas à l'origine de cette demande, ignorez cet email.</p>
+              <div style="margin-top:22px;padding:16px 18px;border-radius:14px;background:#f8fafc;border:1px solid #e2e8f0;display:flex;gap:12px;align-items:flex-start;">
+                <span style="width:34px;height:34px;border-radius:10px;background:#e0f2fe;color:#0ea5e9;display:inline-flex;align-items:center;justify-content:center;font-weight:800;">i</span>
+                <div>
+                  <p style="margin:0;font-size:12px;font-weight:800;color:#0ea5e9;letter-spacing:0.08em;text-transform:uppercase;">Support Banquise</p>
+                  <p style="margin:4px 0 0;font-size:13px;color:#475569;">Besoin d'aide ? Répondez à cet email ou ouvrez le chat support depuis l'app.</p>
                 </div>
               </div>
             </div>
-            """
-            send_mail(
-                subject,
-                message_text,
-                "no-reply@banquise.demo",
-                [user.email],
-                fail_silently=True,
-                html_message=html_message
-            )
-        except Exception:
-            pass
+            <div style="background:#0f172a;color:white;padding:14px 24px;font-size:12px;text-align:center;letter-spacing:0.04em;">
+              Banquise • Banque nouvelle génération • www.banquise.com
+            </div>
+          </div>
+        </div>
+        """
+        enqueue_email(subject, message_text, [user.email], "no-reply@banquise.demo", html_message=html_message)
 
     if request.method == 'POST':
         stage = request.POST.get('stage', 'register')
@@ -281,38 +202,7 @@ def register(request):
                 except Exception:
                     birth_date = None
                 birth_city = pending_birth_city or ""
-                ProfilClient.objects.get_or_create(
-                    user=user,
-                    defaults={
-                        'date_de_naissance': birth_date,
-                        'ville_naissance': birth_city,
-                        'abonnement': 'ESSENTIEL',
-                        'prochaine_facturation': timezone.now().date() + timedelta(days=30)
-                    }
-                )
-                if not Compte.objects.filter(user=user).exists():
-                    compte = Compte.objects.create(
-                        user=user,
-                        type_compte='COURANT',
-                        solde=100.00,
-                        numero_compte=f"FR76{random.randint(1000,9999)}{random.randint(1000,9999)}{random.randint(1000,9999)}",
-                        est_actif=True
-                    )
-                    Carte.objects.create(
-                        compte=compte,
-                        numero_visible=str(random.randint(1000,9999)),
-                        date_expiration=timezone.now()+timedelta(days=365*4),
-                        est_bloquee=False,
-                        sans_contact_actif=True,
-                        paiement_etranger_actif=False
-                    )
-                    Transaction.objects.create(
-                        compte=compte,
-                        montant=100.00,
-                        libelle="Cadeau de bienvenue Banquise",
-                        type='CREDIT',
-                        categorie='SALAIRE'
-                    )
+                onboard_customer(user, birth_date=birth_date, birth_city=birth_city)
 
                 # Nettoyage session
                 request.session.pop('pending_user_id', None)
@@ -359,13 +249,15 @@ def register(request):
         # Étape 1 : création du compte + envoi code
         form = InscriptionForm(request.POST)
         if form.is_valid():
-            user = form.save()
-            user.is_active = False
-            user.save(update_fields=["is_active"])
+            # Utilisateur et email de confirmation écrits dans la même transaction
+            with transaction.atomic():
+                user = form.save()
+                user.is_active = False
+                user.save(update_fields=["is_active"])
+                _send_confirmation_code(user)
 
             request.session['pending_birth_date'] = str(form.cleaned_data.get('birth_date'))
             request.session['pending_birth_city'] = form.cleaned_data.get('birth_city')
-            _send_confirmation_code(user)
 
             messages.info(request, "Nous avons envoyé un code à 6 chiffres sur votre email. Saisissez-le pour activer votre compte.")
             return render(request, 'registration/register.html', {
@@ -382,41 +274,6 @@ def register(request):
     })
 
 
-def _create_default_accounts(user, form):
-    profil, _ = ProfilClient.objects.get_or_create(
-        user=user,
-        defaults={
-            'date_de_naissance': form.cleaned_data.get('birth_date'),
-            'ville_naissance': form.cleaned_data.get('birth_city'),
-            'abonnement': 'ESSENTIEL',
-            'prochaine_facturation': timezone.now().date() + timedelta(days=30)
-        }
-    )
-    compte = Compte.objects.create(
-        user=user,
-        type_compte='COURANT',
-        solde=100.00,
-        numero_compte=f"FR76{random.randint(1000,9999)}{random.randint(1000,9999)}{random.randint(1000,9999)}",
-        est_actif=True
-    )
-    Carte.objects.create(
-        compte=compte,
-        numero_visible=str(random.randint(1000,9999)),
-        date_expiration=timezone.now()+timedelta(days=365*4),
-        est_bloquee=False,
-        sans_contact_actif=True,
-        paiement_etranger_actif=False
-    )
-    Transaction.objects.create(
-        compte=compte,
-        montant=100.00,
-        libelle="Cadeau de bienvenue Banquise",
-        type='CREDIT',
-        categorie='SALAIRE'
-    )
-    return profil
-
-
 def confirm_email(request):
     user_id = request.session.get('pending_user_id')
     code_session = request.session.get('pending_email_code')
@@ -434,16 +291,12 @@ def confirm_email(request):
         request.session['pending_email_code'] = code_new
         request.session['pending_code_sent_at'] = timezone.now().isoformat()
         user = User.objects.get(id=user_id)
-        try:
-            send_mail(
-                "Banquise - Nouveau code de confirmation",
-                f"Votre nouveau code de vérification est : {code_new}",
-                "no-reply@banquise.demo",
-                [user.email],
-                fail_silently=True
-            )
-        except Exception:
-            pass
+        enqueue_email(
+            "Banquise - Nouveau code de confirmation",
+            f"Votre nouveau code de vérification est : {code_new}",
+            [user.email],
+            "no-reply@banquise.demo",
+        )
         messages.info(request, "Un nouveau code a été envoyé.")
 
     if request.method == 'POST':
@@ -464,38 +317,7 @@ def confirm_email(request):
                 birth_date = None
             birth_city = request.session.get('pending_birth_city') or ""
             # Créer profil + compte si pas déjà fait
-            ProfilClient.objects.get_or_create(
-                user=user,
-                defaults={
-                    'date_de_naissance': birth_date,
-                    'ville_naissance': birth_city,
-                    'abonnement': 'ESSENTIEL',
-                    'prochaine_facturation': timezone.now().date() + timedelta(days=30)
-                }
-            )
-            if not Compte.objects.filter(user=user).exists():
-                compte = Compte.objects.create(
-                    user=user,
-                    type_compte='COURANT',
-                    solde=100.00,
-                    numero_compte=f"FR76{random.randint(1000,9999)}{random.randint(1000,9999)}{random.randint(1000,9999)}",
-                    est_actif=True
-                )
-                Carte.objects.create(
-                    compte=compte,
-                    numero_visible=str(random.randint(1000,9999)),
-                    date_expiration=timezone.now()+timedelta(days=365*4),
-                    est_bloquee=False,
-                    sans_contact_actif=True,
-                    paiement_etranger_actif=False
-                )
-                Transaction.objects.create(
-                    compte=compte,
-                    montant=100.00,
-                    libelle="Cadeau de bienvenue Banquise",
-                    type='CREDIT',
-                    categorie='SALAIRE'
-                )
+            onboard_customer(user, birth_date=birth_date, birth_city=birth_city)
 
             # Nettoyage session
             request.session.pop('pending_user_id', None)
@@ -556,7 +378,7 @@ def dashboard(request):
         'prochaine_facturation': timezone.now().date() + timedelta(days=30)
     })
     unread_notifs = Notification.objects.filter(user=request.user, est_lu=False).count()
-    overdraft_limit = overdraft_limit_for_user(request.user)
+    overdraft_limit = profil.decouvert_autorise
     overdraft_margins = {c.id: overdraft_limit + c.solde for c in comptes}
     for c in comptes:
         c.marge_dispo = overdraft_margins.get(c.id)
@@ -644,7 +466,7 @@ def dashboard(request):
         'cartes': cartes,
         'transactions_recentes': transactions,
         'profil_client': profil,
-        'plans': PLAN_CONFIG,
+        'plans': catalogue.plans(),
         'unread_notifs': unread_notifs,
         'spending_labels_6': json.dumps(labels_6),
         'spending_values_6': json.dumps(values_6),
@@ -690,7 +512,8 @@ def changer_abonnement(request):
         messages.success(request, "Votre abonnement sera résilié à la fin de la période en cours (retour à Essentiel).")
         return redirect('dashboard')
 
-    if plan not in PLAN_CONFIG:
+    formule = catalogue.plan(plan)
+    if formule is None:
         messages.error(request, "Formule inconnue.")
         return redirect('dashboard')
 
@@ -703,7 +526,7 @@ def changer_abonnement(request):
         messages.error(request, "Aucun compte actif pour débiter l'abonnement.")
         return redirect('dashboard')
 
-    prix = PLAN_CONFIG[plan]['prix']
+    prix = formule['prix']
     if compte.solde < prix:
         messages.error(request, "Solde insuffisant pour activer cette formule.")
         return redirect('dashboard')
@@ -713,19 +536,21 @@ def changer_abonnement(request):
     Transaction.objects.create(
         compte=compte,
         montant=-prix,
-        libelle=f"Abonnement Banquise {PLAN_CONFIG[plan]['label']}",
+        libelle=f"Abonnement Banquise {formule['label']}",
         type='DEBIT',
         categorie='AUTRE'
     )
-    notifier(request.user, "Abonnement modifié", f"Passage à {PLAN_CONFIG[plan]['label']} facturé {prix} €.", "TRANSACTION", url=reverse('dashboard'))
-    enforce_overdraft(compte)
+    notifier(request.user, "Abonnement modifié", f"Passage à {formule['label']} facturé {prix} €.", "TRANSACTION", url=reverse('dashboard'))
 
     profil.abonnement = plan
     profil.prochain_abonnement = plan
     profil.prochaine_facturation = timezone.now().date() + timedelta(days=30)
     profil.save(update_fields=['abonnement', 'prochain_abonnement', 'prochaine_facturation'])
+    # Nouveau palier de découvert avant le contrôle des cartes
+    refresh_overdraft_limits([request.user.id])
+    enforce_overdraft(compte)
 
-    messages.success(request, f"Formule {PLAN_CONFIG[plan]['label']} activée. Prochaine facturation dans 30 jours.")
+    messages.success(request, f"Formule {formule['label']} activée. Prochaine facturation dans 30 jours.")
     return redirect('dashboard')
 
 
@@ -774,7 +599,7 @@ def page_abonnements(request):
         })
     unread_notifs = Notification.objects.filter(user=request.user, est_lu=False).count() if request.user.is_authenticated else 0
     return render(request, 'scoring/abonnements.html', {
-        'plans': PLAN_CONFIG,
+        'plans': catalogue.plans(),
         'profil_client': profil,
         'unread_notifs': unread_notifs
     })
@@ -836,26 +661,30 @@ def chat_support(request):
 
 @staff_member_required
 def chat_support_admin(request):
-    # Liste des conversations ordonnées par dernier message
-    from django.db.models import Max
+    # Liste des conversations ordonnées par dernier message (requêtes en nombre constant)
+    from django.db.models import Count, Max, OuterRef, Subquery
     filter_user = request.GET.get('user')
-    base_threads = MessageSupport.objects.values('user').annotate(last=Max('date_envoi')).order_by('-last')
+    dernier = MessageSupport.objects.filter(user=OuterRef('user')).order_by('-date_envoi', '-id').values('id')[:1]
+    base_threads = list(
+        MessageSupport.objects.values('user')
+        .annotate(last=Max('date_envoi'), non_lus=Count('id', filter=Q(est_lu=False)), dernier_id=Subquery(dernier))
+        .order_by('-last')
+    )
+    users = User.objects.in_bulk([t['user'] for t in base_threads])
+    derniers = MessageSupport.objects.only('contenu', 'image', 'date_envoi').in_bulk([t['dernier_id'] for t in base_threads])
     conversations = []
     unread_count = Notification.objects.filter(user=request.user, est_lu=False).count()
     selected_convo = None
     for t in base_threads:
-        user_obj = User.objects.filter(id=t['user']).first()
         msgs = MessageSupport.objects.filter(user_id=t['user']).order_by('date_envoi')
-        last_msg = msgs.last()
-        unread = msgs.filter(est_lu=False).exists()
-        unseen_last = False
-        conversations.append({'user': user_obj, 'messages': msgs})
+        last_msg = derniers.get(t['dernier_id'])
+        conversations.append({'user': users[t['user']], 'messages': msgs})
         if last_msg:
             conversations[-1].update({
                 'last_message_preview': (last_msg.contenu or ("Pièce jointe" if last_msg.image else "—")).strip(),
                 'last_message_time': last_msg.date_envoi,
-                'unread': unread,
-                'unseen_last': unseen_last,
+                'unread': t['non_lus'] > 0,
+                'unseen_last': False,
             })
     selected_user = filter_user or (conversations[0]['user'].id if conversations else None)
     selected_convo = None
@@ -1151,9 +980,8 @@ def ouvrir_compte(request):
                 messages.error(request, f"Vous possédez déjà un compte de type {type_choisi}.")
                 return redirect('ouvrir_compte')
 
-            # --- C'est cette ligne qui manquait ou était incorrecte ---
-            # Génération de l'IBAN (sans espaces pour compatibilité virements)
-            numero = f"FR76{random.randint(1000,9999)}{random.randint(1000,9999)}{random.randint(1000,9999)}"
+            # IBAN attribué par blocs de séquence (sans espaces pour compatibilité virements)
+            numero = allocate_iban()
             
             nouveau_compte = Compte.objects.create(
                 user=request.user,
@@ -1257,6 +1085,13 @@ def cartes(request):
             
         carte.save()
         return redirect('cartes')
+    cartes_list = list(cartes_list)
+    usage = spend.usage([c.id for c in cartes_list])
+    for carte in cartes_list:
+        for operation, plafond, suffixe in (('PAIEMENT', carte.plafond_paiement, 'paiement'), ('RETRAIT', carte.plafond_retrait, 'retrait')):
+            utilise = usage.get(carte.id, {}).get(operation, Decimal("0"))
+            setattr(carte, f'utilise_{suffixe}', utilise)
+            setattr(carte, f'pct_{suffixe}', min(100, int(utilise * 100 / plafond)) if plafond else 0)
     return render(request, 'scoring/cartes.html', {'cartes': cartes_list})
 
 @login_required
@@ -1412,79 +1247,21 @@ def page_simulation(request):
             demande.montant_souhaite = demande.montant_souhaite or 0
             demande.duree_souhaitee_annees = demande.duree_souhaitee_annees or 1
             
-            # --- Simulation robuste ---
-            base_rate = demande.produit.taux_ref if demande.produit else Decimal("3.50")
-            nb_mois = max(1, (demande.duree_souhaitee_annees or 0) * 12)
-            taux_mensuel = (Decimal(base_rate) / Decimal("100")) / Decimal("12")
-
-            if taux_mensuel > 0:
-                mensualite = Decimal(demande.montant_souhaite) * taux_mensuel / (1 - (1 + taux_mensuel) ** (-nb_mois))
-            else:
-                mensualite = Decimal(demande.montant_souhaite) / nb_mois
-
-            dettes_totales = Decimal(demande.dettes_mensuelles or 0) + Decimal(demande.loyer_actuel or 0)
-            revenus = Decimal(demande.revenus_mensuels or 1)
-            dti = ((mensualite + dettes_totales) / revenus) * Decimal("100")
-            ltv = Decimal("100") * (Decimal("1") - (Decimal(demande.apport_personnel or 0) / Decimal(max(1, demande.montant_souhaite or 1))))
-
-            score = Decimal("100")
-            # Heuristique plus souple
-            if dti > Decimal("30"):
-                score -= (dti - Decimal("30")) * Decimal("1.0")
-            if ltv > Decimal("85"):
-                score -= (ltv - Decimal("85")) * Decimal("0.25")
-            if revenus < Decimal("2000"):
-                score -= Decimal("8")
-            if Decimal(demande.apport_personnel or 0) >= Decimal(demande.montant_souhaite or 0) * Decimal("0.2"):
-                score += Decimal("10")
-            if demande.sante_snapshot == 'BON':
-                score += Decimal("2")
-            if demande.emploi_snapshot and demande.emploi_snapshot.nom.lower().startswith('cdi'):
-                score += Decimal("10")
-            if demande.logement_snapshot and 'propri' in demande.logement_snapshot.nom.lower():
-                score += Decimal("10")
-
-            score = int(max(0, min(100, score)))
-
-            # ---- Score ML entraîné sur dataset synthétique (logistic regression) ----
-            ml_score = _ml_score(
-                revenus=float(revenus) / 1000.0,
-                dti=float(dti),
-                ltv=float(ltv),
-                apport_ratio=float(demande.apport_personnel or 0) / float(max(1, demande.montant_souhaite or 1))
-            )
-            final_score = int((score + (ml_score if ml_score is not None else score)) / 2)
-
-            # Seuils dynamiques
-            dti_limit = 42 if demande.revenus_mensuels < 6000 else 47
-            ltv_limit = 95
-            if demande.montant_souhaite and demande.montant_souhaite >= Decimal("250000") and demande.apport_personnel >= demande.montant_souhaite * Decimal("0.10"):
-                ltv_limit = 97
-
-            ia_decision = 'ACCEPTEE' if ( final_score >= 55) else 'REFUSEE'
-            recommendation = (
-                f"Avis automatique {ia_decision.lower()} "
-                f"(score final {final_score}, dti {dti:.1f}% / seuil {dti_limit}%, ltv {ltv:.1f}% / seuil {ltv_limit}%)"
-            )
-
-            surcharge_risque = Decimal(max(0, (70 - score)) * 0.02).quantize(Decimal("0.01"))
-            taux_final = Decimal(base_rate) + surcharge_risque
-
-            demande.score_calcule = final_score
-            demande.taux_calcule = taux_final
-            demande.mensualite_calculee = Decimal(str(mensualite)).quantize(Decimal("0.01"))
-            demande.ia_decision = ia_decision
-            demande.recommendation = recommendation
+            # --- Simulation robuste (moteur partagé avec rescore_credits) ---
+            for field, value in score_application(demande, revenus_verifies=revenus_verifies(request.user)).items():
+                setattr(demande, field, value)
             # Toujours validation admin finale
             demande.statut = 'EN_ATTENTE'
             demande.soumise = soumettre
-            
+
+            if not soumettre:
+                # Brouillon : conservé en session, aucune ligne en base tant qu'il n'est pas soumis
+                token = store_simulation(request, demande)
+                return redirect('resultat_brouillon', token=token)
+
             demande.save()
-            if soumettre:
-                messages.success(request, "Simulation envoyée aux conseillers.")
-                notifier(request.user, "Demande de crédit envoyée", f"Avis automatique : {demande.ia_decision or 'En attente'}. Un conseiller va répondre.", "CREDIT", url=reverse('historique'))
-                for admin in User.objects.filter(is_staff=True):
-                    notifier(admin, "Nouvelle demande de crédit", f"{request.user.username} a validé sa simulation ({demande.montant_souhaite} €).", "CREDIT", url=reverse('admin_manage_credits'))
+            messages.success(request, "Simulation envoyée aux conseillers.")
+            _notifier_soumission(request, demande)
             return redirect('resultat_simulation', demande_id=demande.id)
     else:
         initial = {}
@@ -1526,47 +1303,30 @@ def page_simulation(request):
                 form.initial['dettes_mensuelles'] = accepted_count
     return render(request, 'scoring/saisie_client.html', {'form': form})
 
-@login_required
-def page_resultat(request, demande_id):
-    demande = get_object_or_404(DemandeCredit, id=demande_id, user=request.user)
+def _render_resultat(request, demande, update_url, valider_url):
     mensualite_max = int(demande.revenus_mensuels * 0.35)
     unread_notifs = Notification.objects.filter(user=request.user, est_lu=False).count()
     score_val = demande.score_calcule or 0
     gauge_offset = max(0, 440 - (score_val * 4.4))
-    # Suggestion durée/mensualité si DTI trop élevé
+    # Grille d'alternatives (durée × taux × DTI) calculée une fois, explorée côté client
+    dettes_totales = (demande.dettes_mensuelles or 0) + (demande.loyer_actuel or 0)
+    taux = demande.taux_calcule or (demande.produit.taux_ref if demande.produit else Decimal("3.50"))
+    try:
+        grid = affordability_grid(demande.revenus_mensuels, dettes_totales, demande.montant_souhaite, taux)
+    except RuntimeError:
+        grid = None  # numpy absent : pas de grille, suggestion calculée en scalaire
+    # Suggestion durée/mensualité si DTI trop élevé : mensualité cible pour viser DTI 35%
     suggested_mensualite = None
     suggested_duree = None
-    try:
-        revenus = Decimal(demande.revenus_mensuels or 0)
-        dettes_totales = Decimal(demande.dettes_mensuelles or 0) + Decimal(demande.loyer_actuel or 0)
-        mensualite_actuelle = Decimal(demande.mensualite_calculee or 0)
-        principal = Decimal(demande.montant_souhaite or 0)
-        taux = Decimal(demande.taux_calcule or (demande.produit.taux_ref if demande.produit else Decimal("3.50")) or 0)
-        r = (taux / Decimal("100")) / Decimal("12")
-        # mensualité cible pour viser DTI 35%
-        cible = (revenus * Decimal("0.35")) - dettes_totales
-        if cible > 0 and mensualite_actuelle and mensualite_actuelle > cible:
+    cible = Decimal(demande.revenus_mensuels or 0) * Decimal("0.35") - dettes_totales
+    mensualite_actuelle = Decimal(demande.mensualite_calculee or 0)
+    if cible > 0 and mensualite_actuelle and mensualite_actuelle > cible:
+        if grid is not None:
+            suggested_duree = suggested_duration(grid, max(Decimal("50"), cible))
+        else:
+            suggested_duree = min_duration_for_payment(demande.montant_souhaite, taux, max(Decimal("50"), cible))
+        if suggested_duree:
             suggested_mensualite = int(max(Decimal("50"), cible))
-            # Durée nécessaire pour atteindre cette mensualité
-            months = None
-            if r > 0 and suggested_mensualite > 0 and (r * principal) < (Decimal(suggested_mensualite) * Decimal("0.99")):
-                try:
-                    months = -log(1 - (r * principal / Decimal(suggested_mensualite))) / log(1 + r)
-                except Exception:
-                    months = None
-            if months is None or months <= 0:
-                if suggested_mensualite > 0:
-                    months = principal / Decimal(suggested_mensualite)
-                else:
-                    months = 0
-            if months and months > 0:
-                suggested_duree = max(1, min(40, int((months + 11) // 12)))  # en années, plafond 40 ans
-            else:
-                suggested_mensualite = None
-                suggested_duree = None
-    except Exception:
-        suggested_mensualite = None
-        suggested_duree = None
     return render(request, 'scoring/resultat.html', {
         'demande': demande,
         'montant_propose_formate': f"{demande.montant_souhaite:,.0f}".replace(',', ' '),
@@ -1575,18 +1335,38 @@ def page_resultat(request, demande_id):
         'gauge_offset': gauge_offset,
         'suggested_mensualite': suggested_mensualite,
         'suggested_duree': suggested_duree,
+        'affordability_grid': grid,
+        'taux_reference': taux,
+        'update_url': update_url,
+        'valider_url': valider_url,
     })
 
 
 @login_required
-def api_update_resultat(request, demande_id):
-    demande = get_object_or_404(DemandeCredit, id=demande_id)
-    if demande.user != request.user and not request.user.is_staff:
-        return JsonResponse({'error': 'forbidden'}, status=403)
-    if demande.statut == 'ACCEPTEE':
-        return JsonResponse({'error': 'locked'}, status=403)
-    if request.method != 'POST':
-        return JsonResponse({'error': 'method_not_allowed'}, status=405)
+def page_resultat(request, demande_id):
+    demande = get_object_or_404(DemandeCredit, id=demande_id, user=request.user)
+    return _render_resultat(
+        request, demande,
+        reverse('api_update_resultat', args=[demande.id]),
+        reverse('valider_demande_credit', args=[demande.id]),
+    )
+
+
+@login_required
+def page_resultat_brouillon(request, token):
+    demande = load_simulation(request, token)
+    if demande is None:
+        messages.info(request, "Cette simulation a expiré. Relancez une simulation.")
+        return redirect('simulation')
+    return _render_resultat(
+        request, demande,
+        reverse('api_update_brouillon', args=[token]),
+        reverse('valider_brouillon', args=[token]),
+    )
+
+
+def _ajuster_simulation(request, demande):
+    """Recalcule le capital d'une simulation à partir de la durée et de la mensualité envoyées."""
     try:
         payload = json.loads(request.body.decode('utf-8'))
     except Exception:
@@ -1602,25 +1382,56 @@ def api_update_resultat(request, demande_id):
         mensualite = Decimal(demande.mensualite_calculee or 0)
 
     taux_ref = demande.taux_calcule or (demande.produit.taux_ref if demande.produit else Decimal("3.50"))
-    n = max(1, duree * 12)
-    r = Decimal(taux_ref) / Decimal("100") / Decimal("12")
-    if r > 0:
-        principal = mensualite * (1 - (1 + r) ** (-n)) / r
-    else:
-        principal = mensualite * n
+    principal = to_cents(principal_for_payment(mensualite, taux_ref, max(1, duree * 12)))
 
     demande.duree_souhaitee_annees = duree
     demande.mensualite_calculee = mensualite
-    demande.montant_souhaite = principal.quantize(Decimal("0.01"))
+    demande.montant_souhaite = int(principal)
     demande.recommendation = f"Simulation ajustée ({duree} ans, {mensualite} €/mois)."
-    demande.save(update_fields=['duree_souhaitee_annees', 'mensualite_calculee', 'montant_souhaite', 'recommendation'])
-
-    return JsonResponse({
+    return {
         'principal': float(principal),
         'duree': duree,
         'mensualite': float(mensualite),
         'taux': float(taux_ref),
-    })
+    }
+
+
+@login_required
+def api_update_resultat(request, demande_id):
+    demande = get_object_or_404(DemandeCredit, id=demande_id)
+    if demande.user != request.user and not request.user.is_staff:
+        return JsonResponse({'error': 'forbidden'}, status=403)
+    if demande.statut == 'ACCEPTEE':
+        return JsonResponse({'error': 'locked'}, status=403)
+    if request.method != 'POST':
+        return JsonResponse({'error': 'method_not_allowed'}, status=405)
+    data = _ajuster_simulation(request, demande)
+    demande.save(update_fields=['duree_souhaitee_annees', 'mensualite_calculee', 'montant_souhaite', 'recommendation'])
+    return JsonResponse(data)
+
+
+@login_required
+def api_update_brouillon(request, token):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'method_not_allowed'}, status=405)
+    demande = load_simulation(request, token)
+    if demande is None:
+        return JsonResponse({'error': 'not_found'}, status=404)
+    data = _ajuster_simulation(request, demande)
+    update_simulation(
+        request, token,
+        duree_souhaitee_annees=demande.duree_souhaitee_annees,
+        mensualite_calculee=demande.mensualite_calculee,
+        montant_souhaite=demande.montant_souhaite,
+        recommendation=demande.recommendation,
+    )
+    return JsonResponse(data)
+
+
+def _notifier_soumission(request, demande):
+    notifier(request.user, "Demande de crédit envoyée", f"Avis automatique : {demande.ia_decision or 'En attente'}. Un conseiller va répondre.", "CREDIT", url=reverse('historique'))
+    for admin in User.objects.filter(is_staff=True):
+        notifier(admin, "Nouvelle demande de crédit", f"{request.user.username} a validé sa simulation ({demande.montant_souhaite} €).", "CREDIT", url=reverse('admin_manage_credits'))
 
 
 @login_required
@@ -1635,9 +1446,26 @@ def valider_demande_credit(request, demande_id):
     demande.soumise = True
     demande.statut = 'EN_ATTENTE'
     demande.save(update_fields=['soumise', 'statut'])
-    notifier(request.user, "Demande de crédit envoyée", f"Avis automatique : {demande.ia_decision or 'En attente'}. Un conseiller va répondre.", "CREDIT", url=reverse('historique'))
-    for admin in User.objects.filter(is_staff=True):
-        notifier(admin, "Nouvelle demande de crédit", f"{request.user.username} a validé sa simulation ({demande.montant_souhaite} €).", "CREDIT", url=reverse('admin_manage_credits'))
+    _notifier_soumission(request, demande)
+    messages.success(request, "Demande envoyée aux conseillers.")
+    return redirect('resultat_simulation', demande_id=demande.id)
+
+
+@login_required
+def valider_brouillon(request, token):
+    if request.method != 'POST':
+        return redirect('resultat_brouillon', token=token)
+    demande = load_simulation(request, token)
+    if demande is None:
+        messages.info(request, "Cette simulation a expiré. Relancez une simulation.")
+        return redirect('simulation')
+
+    # Seule la soumission crée une ligne DemandeCredit
+    demande.soumise = True
+    demande.statut = 'EN_ATTENTE'
+    demande.save()
+    discard_simulation(request, token)
+    _notifier_soumission(request, demande)
     messages.success(request, "Demande envoyée aux conseillers.")
     return redirect('resultat_simulation', demande_id=demande.id)
 
@@ -1667,8 +1495,48 @@ def page_historique(request):
     return render(request, 'scoring/historique.html', {'demandes': demandes, 'unread_notifs': unread_notifs})
 
 @login_required
-def api_calcul_pret_dynamique(request): 
-    return JsonResponse({'total_projet_formate': "---"})
+def api_calcul_pret_dynamique(request):
+    """Mensualité, coût total et échéancier pour (principal, taux annuel %, mois)."""
+    params = request.GET if request.method == 'GET' else request.POST
+    try:
+        data = amortization_schedule(
+            params.get('principal', ''),
+            params.get('taux', '3.5'),
+            params.get('mois', ''),
+        )
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    except RuntimeError as exc:
+        return JsonResponse({'error': str(exc)}, status=503)
+    payload = dict(data)
+    payload['total_projet_formate'] = f"{data['cout_total']:,.0f} €".replace(',', ' ')
+    return JsonResponse(payload)
+
+@csrf_exempt
+def api_autorisation_carte(request):
+    """Autorisation d'un paiement carte (appel serveur à serveur, en-tête ``X-Banquise-Key``)."""
+    cle = getattr(settings, 'CARTE_AUTORISATION_CLE', '')
+    if not cle:
+        return JsonResponse({'error': 'disabled'}, status=503)
+    if not hmac.compare_digest(request.headers.get('X-Banquise-Key', ''), cle):
+        return JsonResponse({'error': 'forbidden'}, status=403)
+    if request.method != 'POST':
+        return JsonResponse({'error': 'method_not_allowed'}, status=405)
+    try:
+        data = json.loads(request.body or b'{}')
+        carte_id = int(data['carte_id'])
+        montant = cards.parse_montant(data.get('montant'))
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'error': 'invalid_request'}, status=400)
+    result = cards.authorize(
+        carte_id, montant,
+        commercant=str(data.get('commercant', ''))[:60],
+        categorie=str(data.get('categorie', 'AUTRE')),
+        sans_contact=bool(data.get('sans_contact')),
+        etranger=bool(data.get('etranger')),
+        retrait=bool(data.get('retrait')),
+    )
+    return JsonResponse(result)
 
 @login_required
 def supprimer_demande_credit(request, demande_id):
@@ -1732,13 +1600,15 @@ def admin_manage_credits(request):
                 else:
                     messages.warning(request, "Aucun compte actif pour créditer le montant.")
             demande.statut = 'ACCEPTEE'
-            demande.save(update_fields=['statut'])
+            demande.date_decision = timezone.now()
+            demande.save(update_fields=['statut', 'date_decision'])
             notifier(demande.user, "Crédit accepté", "Votre demande de crédit a été acceptée par un conseillé.", "CREDIT", url=reverse('historique'))
             messages.success(request, "Demande acceptée et montant crédité.")
 
         elif action == 'REFUSEE':
             demande.statut = 'REFUSEE'
-            demande.save(update_fields=['statut'])
+            demande.date_decision = timezone.now()
+            demande.save(update_fields=['statut', 'date_decision'])
             notifier(demande.user, "Crédit refusé", "Votre demande de crédit a été refusée / annulée par un conseillé.", "CREDIT", url=reverse('historique'))
             messages.info(request, "Demande refusée / annulée.")
 
@@ -1801,6 +1671,7 @@ def admin_manage(request):
                 ids = request.POST.get('card_ids', '')
                 id_list = [i for i in ids.split(',') if i]
                 updated = Carte.objects.filter(id__in=id_list, est_bloquee=False).update(est_bloquee=True)
+                cards.invalidate(id_list)
                 messages.success(request, f"{updated} carte(s) bloquée(s).")
             elif action in ['approve_decouvert', 'reject_decouvert']:
                 demande = get_object_or_404(DemandeDecouvert, id=target_id)
@@ -1818,12 +1689,14 @@ def admin_manage(request):
                     demande.save()
                     notifier(demande.user, "Découvert approuvé", f"Votre découvert temporaire ({demande.montant_souhaite} €) est accepté.", "INFO", url=reverse('dashboard'))
                     messages.success(request, "Demande de découvert acceptée.")
+                    _appliquer_decouvert(demande.user_id)
                 else:
                     demande.statut = 'REFUSEE'
                     demande.commentaire_admin = request.POST.get('commentaire', '')
                     demande.save(update_fields=['statut', 'commentaire_admin'])
                     notifier(demande.user, "Découvert refusé", "Votre demande de découvert temporaire a été refusée.", "INFO", url=reverse('dashboard'))
                     messages.info(request, "Demande de découvert refusée.")
+                    _appliquer_decouvert(demande.user_id)
             else:
                 messages.error(request, "Action inconnue.")
         except Exception as e:
@@ -1836,7 +1709,7 @@ def admin_manage(request):
     card_status = request.GET.get('card_status')
 
     users = User.objects.all().order_by('-date_joined')[:50]
-    comptes_qs = Compte.objects.select_related('user').order_by('-date_creation')
+    comptes_qs = Compte.objects.select_related('user__profil').order_by('-date_creation')
     cartes_qs = Carte.objects.select_related('compte', 'compte__user').order_by('-id')
 
     if search:
@@ -1903,7 +1776,8 @@ def admin_manage(request):
 def admin_reports(request):
     unread_notifs = Notification.objects.filter(user=request.user, est_lu=False).count()
 
-    comptes_qs = Compte.objects.select_related('user').all()
+    # Découvert autorisé toujours positif : « sous la limite » implique « sous 50 € »
+    comptes_qs = Compte.objects.select_related('user__profil').filter(solde__lt=Decimal("50.00"))
     comptes_surveiller = []
     for c in comptes_qs:
         limit = overdraft_limit_for_user(c.user)
@@ -1921,20 +1795,22 @@ def admin_reports(request):
     heatmap_grid = {}
     categories = [c[0] for c in Transaction.CATEGORIE_CHOICES]
     data = {}
+    tz = timezone.get_current_timezone()
     for i in range(5, -1, -1):
         m_date = today.replace(day=1) - timedelta(days=30 * i)
         label = m_date.strftime("%b %y")
         months.append(label)
+        # Une agrégation par mois (bornes sur la date, sans fonction par ligne) au lieu d'une par case
+        debut = timezone.make_aware(datetime(m_date.year, m_date.month, 1), tz)
+        fin = timezone.make_aware(datetime(m_date.year + m_date.month // 12, m_date.month % 12 + 1, 1), tz)
+        totaux = dict(
+            Transaction.objects.filter(type='DEBIT', date_execution__gte=debut, date_execution__lt=fin)
+            .values_list('categorie').annotate(total=Sum('montant')).order_by()
+        )
         for cat in categories:
-            key = (label, cat)
-            total = Transaction.objects.filter(
-                type='DEBIT',
-                categorie=cat,
-                date_execution__year=m_date.year,
-                date_execution__month=m_date.month
-            ).aggregate(total=Sum('montant'))['total'] or 0
-            data[key] = abs(float(total))
-            heatmap_grid.setdefault(cat, {})[label] = abs(float(total))
+            total = abs(float(totaux.get(cat) or 0))
+            data[(label, cat)] = total
+            heatmap_grid.setdefault(cat, {})[label] = total
     max_val = max(data.values()) if data else 1
 
     return render(request, 'scoring/admin_reports.html', {
@@ -1948,6 +1824,78 @@ def admin_reports(request):
     })
 
 
+STRESS_MAX_TRAJECTOIRES = 20000
+STRESS_MAX_TRAJECTOIRES_TACHE = 500000
+
+
+@staff_member_required
+def admin_stress_test(request):
+    """
+    Stress test Monte-Carlo du portefeuille (paramètres en GET, trajectoires plafonnées).
+    Un POST met le calcul en file (plafond relevé) ; ``tache=<id>`` affiche son résultat.
+    """
+    unread_notifs = Notification.objects.filter(user=request.user, est_lu=False).count()
+    arriere_plan = request.method == 'POST'
+    data = request.POST if arriere_plan else request.GET
+
+    def _param(name, default, cast=float):
+        try:
+            return cast(data.get(name, default))
+        except (TypeError, ValueError):
+            return default
+
+    plafond = STRESS_MAX_TRAJECTOIRES_TACHE if arriere_plan else STRESS_MAX_TRAJECTOIRES
+    params = {
+        'paths': min(plafond, max(100, _param('paths', 2000, int))),
+        'seed': max(0, _param('seed', 42, int)),
+        'choc_taux': max(0.0, _param('choc_taux', 1.0)),
+        'choc_revenus': max(0.0, _param('choc_revenus', 0.05)),
+        'lgd': min(1.0, max(0.0, _param('lgd', 0.45))),
+    }
+    tache = None
+    if arriere_plan:
+        tache = tasks.enqueue('stress_test', params, user=request.user)
+        return redirect(f"{reverse('admin_stress_test')}?tache={tache.id}")
+    if request.GET.get('tache'):
+        tache = get_object_or_404(Tache, id=_param('tache', 0, int), nom='stress_test')
+        rapport = tache.resultat if tache.statut == 'TERMINEE' else None
+        if rapport:
+            params = {k: rapport['parametres'].get(k, v) for k, v in params.items()}
+            params.update(paths=rapport['trajectoires'], seed=rapport['graine'])
+    else:
+        rapport = run_stress_test(**params)
+    max_bin = (max([b['trajectoires'] for b in rapport['histogramme']] or [1]) or 1) if rapport else 1
+
+    return render(request, 'scoring/admin_stress.html', {
+        'unread_notifs': unread_notifs,
+        'rapport': rapport,
+        'params': params,
+        'max_bin': max_bin,
+        'max_trajectoires': STRESS_MAX_TRAJECTOIRES,
+        'max_trajectoires_tache': STRESS_MAX_TRAJECTOIRES_TACHE,
+        'tache': tache,
+    })
+
+@staff_member_required
+def admin_perf(request):
+    """Latence, SQL et rendu des templates par route (histogrammes du process courant)."""
+    if request.method == 'POST':
+        perf.reset()
+        messages.success(request, "Mesures remises à zéro.")
+        return redirect('admin_perf')
+    return render(request, 'scoring/admin_perf.html', {
+        'routes': perf.rapport(),
+        'infos': perf.infos(),
+    })
+
+@login_required
+def api_tache_statut(request, tache_id):
+    """Statut JSON d'une tâche en arrière-plan (créateur ou staff)."""
+    tache = Tache.objects.filter(id=tache_id).first()
+    if tache is None or not (request.user.is_staff or tache.cree_par_id == request.user.id):
+        return JsonResponse({'error': 'not_found'}, status=404)
+    return JsonResponse(tasks.status_payload(tache))
+
 def support(request):
     messages_support = []
     if request.user.is_authenticated:
@@ -1992,36 +1940,46 @@ def support(request):
 
     return render(request, 'scoring/support.html', {'messages_support': messages_support})
 
+@public_page()
 def page_a_propos(request):
     return render(request, 'scoring/a_propos.html')
 
+@public_page()
 def page_tarifs(request):
     profil_client = None
     if request.user.is_authenticated:
         profil_client = ProfilClient.objects.filter(user=request.user).first()
     return render(request, 'scoring/tarifs.html', {'profil_client': profil_client})
 
+@public_page()
 def page_faq(request):
     return render(request, 'scoring/faq.html')
 
+@public_page()
 def page_carrieres(request):
     return render(request, 'scoring/carrieres.html')
 
+@public_page()
 def page_presse(request):
     return render(request, 'scoring/presse.html')
 
+@public_page()
 def page_partenaires(request):
     return render(request, 'scoring/partenaires.html')
 
+@public_page()
 def page_apis(request):
     return render(request, 'scoring/apis.html')
 
+@public_page()
 def page_mentions_legales(request):
     return render(request, 'scoring/mentions_legales.html')
 
+@public_page()
 def page_confidentialite(request):
     return render(request, 'scoring/confidentialite.html')
 
+@public_page()
 def page_cookies(request):
     return render(request, 'scoring/cookies.html')
 
@@ -2115,11 +2073,14 @@ def admin_dashboard_view(request):
 
 # Dans scoring/views.py (Ajoutez à la fin)
 
+@public_page()
 def produits_comptes(request):
     return render(request, 'scoring/produits/comptes.html')
 
+@public_page()
 def produits_cartes(request):
     return render(request, 'scoring/produits/cartes.html')
 
+@public_page()
 def produits_epargne(request):
     return render(request, 'scoring/produits/epargne.html')
@@ -0,0 +1,401 @@
+"""
+Test de charge HTTP local : scénarios scriptés joués par des clients asyncio
+(bibliothèque standard uniquement, aucune dépendance à installer).
+
+Usage :
+    python manage.py seed_bank --users 1000
+    gunicorn Banquise.wsgi:application --workers 4 --bind 127.0.0.1:8000
+    python scripts/load_test.py --url http://127.0.0.1:8000 --users 50 --duration 60 --json charge.json
+
+Chaque utilisateur virtuel se connecte avec un client généré par ``seed_bank``
+(seed0000000, seed0000001… et leur mot de passe commun), puis enchaîne des étapes
+tirées selon les poids de ``--mix`` : tableau de bord, relevé de compte, virement
+(formulaire puis envoi de 1 €). ``--admin identifiant:motdepasse`` ajoute des
+utilisateurs staff qui parcourent la console (``admin_manage``).
+
+Le rapport JSON (latences p50/p95/p99, débit, taux d'erreur, global et par étape,
+commit courant) permet de comparer deux exécutions d'un commit à l'autre.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import ssl
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+ROOT = Path(__file__).resolve().parents[1]
+
+MIX_CLIENT = {'dashboard': 50, 'releve_compte': 30, 'virement': 20}
+MIX_ADMIN = {'admin_manage': 1}
+MONTANT_VIREMENT = '1.00'
+IBAN_EXTERNE = 'FR7630006000011234567890189'
+
+RE_CSRF = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+RE_RELEVE = re.compile(r'/releve-compte/(\d+)/')
+
+
+def _options(html, name):
+    bloc = re.search(r'<select[^>]*name="%s"[^>]*>(.*?)</select>' % name, html, re.S)
+    return re.findall(r'<option value="(\d+)"', bloc.group(1)) if bloc else []
+
+
+class ErreurEtape(Exception):
+    pass
+
+
+class Connexion:
+    """Connexion HTTP/1.1 persistante avec ses cookies (un utilisateur virtuel)."""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.https else 80)
+        self.origin = f"{parts.scheme}://{parts.netloc}"
+        self.timeout = timeout
+        self.cookies = {}
+        self.reader = self.writer = None
+
+    async def fermer(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+        self.reader = self.writer = None
+
+    async def _lire(self):
+        ligne = await self.reader.readline()
+        if not ligne:
+            raise ConnectionError("connexion fermée par le serveur")
+        status = int(ligne.split()[1])
+        headers = []
+        while True:
+            ligne = await self.reader.readline()
+            if ligne in (b'\r\n', b'\n', b''):
+                break
+            nom, _, valeur = ligne.decode('latin-1').partition(':')
+            headers.append((nom.strip().lower(), valeur.strip()))
+        entetes = dict(headers)
+        if entetes.get('transfer-encoding', '').lower() == 'chunked':
+            morceaux = []
+            while True:
+                taille = int((await self.reader.readline()).split(b';')[0], 16)
+                if not taille:
+                    await self.reader.readline()
+                    break
+                morceaux.append(await self.reader.readexactly(taille))
+                await self.reader.readline()
+            body = b''.join(morceaux)
+        elif 'content-length' in entetes:
+            body = await self.reader.readexactly(int(entetes['content-length']))
+        else:
+            body = await self.reader.read()
+            entetes['connection'] = 'close'
+        return status, headers, entetes, body
+
+    async def requete(self, method, path, form=None):
+        body = urlencode(form).encode() if form is not None else b''
+        lignes = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Connection: keep-alive",
+            "User-Agent: banquise-load-test",
+            "Accept: text/html,application/json",
+        ]
+        if self.cookies:
+            lignes.append("Cookie: " + "; ".join(f"{k}={v}" for k, v in self.cookies.items()))
+        if form is not None:
+            lignes += [
+                "Content-Type: application/x-www-form-urlencoded",
+                f"Content-Length: {len(body)}",
+                f"Origin: {self.origin}",
+                f"Referer: {self.origin}{path}",
+            ]
+        message = ("\r\n".join(lignes) + "\r\n\r\n").encode() + body
+        # Une connexion gardée ouverte peut avoir été fermée par le serveur : un seul rejeu, GET uniquement
+        for essai in range(2):
+            try:
+                if self.writer is None:
+                    ctx = ssl.create_default_context() if self.https else None
+                    self.reader, self.writer = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port, ssl=ctx), self.timeout,
+                    )
+                self.writer.write(message)
+                await self.writer.drain()
+                status, headers, entetes, contenu = await asyncio.wait_for(self._lire(), self.timeout)
+                break
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.fermer()
+                if essai or method != 'GET':
+                    raise
+        for nom, valeur in headers:
+            if nom == 'set-cookie':
+                for morsel in SimpleCookie(valeur).values():
+                    if morsel['max-age'] == '0' or not morsel.value:
+                        self.cookies.pop(morsel.key, None)
+                    else:
+                        self.cookies[morsel.key] = morsel.value
+        if entetes.get('connection', '').lower() == 'close':
+            await self.fermer()
+        return status, entetes, contenu.decode('utf-8', 'replace')
+
+
+class Statistiques:
+    def __init__(self):
+        self.latences = {}
+        self.erreurs = {}
+        self.motifs = {}
+
+    def succes(self, etape, duree):
+        self.latences.setdefault(etape, []).append(duree * 1000)
+
+    def echec(self, etape, duree, motif):
+        self.latences.setdefault(etape, []).append(duree * 1000)
+        self.erreurs[etape] = self.erreurs.get(etape, 0) + 1
+        self.motifs[motif] = self.motifs.get(motif, 0) + 1
+
+
+def _percentile(valeurs, q):
+    if not valeurs:
+        return None
+    rang = max(0, min(len(valeurs) - 1, math.ceil(q * len(valeurs)) - 1))
+    return round(valeurs[rang], 2)
+
+
+def _resume(latences, erreurs, duree):
+    valeurs = sorted(latences)
+    n = len(valeurs)
+    return {
+        'requetes': n,
+        'erreurs': erreurs,
+        'taux_erreur': round(erreurs / n, 4) if n else 0.0,
+        'debit_par_s': round(n / duree, 2) if duree else 0.0,
+        'moyenne_ms': round(sum(valeurs) / n, 2) if n else None,
+        'p50_ms': _percentile(valeurs, 0.50),
+        'p95_ms': _percentile(valeurs, 0.95),
+        'p99_ms': _percentile(valeurs, 0.99),
+        'max_ms': round(valeurs[-1], 2) if n else None,
+    }
+
+
+class UtilisateurVirtuel:
+    def __init__(self, numero, username, password, mix, args, stats):
+        self.numero = numero
+        self.username = username
+        self.password = password
+        self.mix = mix
+        self.args = args
+        self.stats = stats
+        self.rng = random.Random(args.seed * 100003 + numero)
+        self.http = Connexion(args.url, args.timeout)
+        self.compte_id = None
+
+    async def _page(self, path):
+        status, entetes, html = await self.http.requete('GET', path)
+        if status == 302 and '/login' in entetes.get('location', ''):
+            raise ErreurEtape('session perdue')
+        if status != 200:
+            raise ErreurEtape(f'HTTP {status}')
+        return html
+
+    async def login(self):
+        html = await self._page('/login/')
+        token = RE_CSRF.search(html)
+        status, entetes, _ = await self.http.requete('POST', '/login/', {
+            'csrfmiddlewaretoken': token.group(1) if token else '',
+            'username': self.username,
+            'password': self.password,
+        })
+        if status != 302:
+            raise ErreurEtape(f'connexion refusée (HTTP {status})')
+
+    async def dashboard(self):
+        html = await self._page('/dashboard/')
+        if self.compte_id is None:
+            match = RE_RELEVE.search(html)
+            self.compte_id = match.group(1) if match else ''
+
+    async def releve_compte(self):
+        if self.compte_id is None:
+            await self.dashboard()
+        if not self.compte_id:
+            raise ErreurEtape('aucun compte')
+        await self._page(f'/releve-compte/{self.compte_id}/')
+
+    async def virement(self):
+        html = await self._page('/virement/')
+        token = RE_CSRF.search(html)
+        comptes = _options(html, 'compte_emetteur')
+        if not token or not comptes:
+            raise ErreurEtape('formulaire de virement incomplet')
+        form = {
+            'csrfmiddlewaretoken': token.group(1),
+            'compte_emetteur': comptes[0],
+            'montant': MONTANT_VIREMENT,
+            'motif': 'Test de charge',
+        }
+        beneficiaires = _options(html, 'beneficiaire_enregistre')
+        if beneficiaires:
+            form['beneficiaire_enregistre'] = self.rng.choice(beneficiaires)
+        else:
+            form['nouveau_beneficiaire_iban'] = IBAN_EXTERNE
+        status, _, _ = await self.http.requete('POST', '/virement/', form)
+        if status != 302:
+            raise ErreurEtape(f'virement refusé (HTTP {status})')
+
+    async def admin_manage(self):
+        await self._page('/console/manage/')
+
+    async def _jouer(self, etape):
+        debut = time.perf_counter()
+        try:
+            await getattr(self, etape)()
+        except ErreurEtape as exc:
+            self.stats.echec(etape, time.perf_counter() - debut, f"{etape}: {exc}")
+            return False
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as exc:
+            await self.http.fermer()
+            self.stats.echec(etape, time.perf_counter() - debut, f"{etape}: {type(exc).__name__}")
+            return False
+        self.stats.succes(etape, time.perf_counter() - debut)
+        return True
+
+    async def executer(self, fin):
+        etapes, poids = list(self.mix), list(self.mix.values())
+        # Démarrage étalé sur la montée en charge
+        await asyncio.sleep(self.args.ramp_up * self.rng.random())
+        try:
+            if not await self._jouer('login'):
+                return
+            while time.monotonic() < fin:
+                await self._jouer(self.rng.choices(etapes, weights=poids)[0])
+                if self.args.think_time:
+                    await asyncio.sleep(self.rng.uniform(0, 2 * self.args.think_time))
+        finally:
+            await self.http.fermer()
+
+
+def _parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        nom, _, poids = part.partition('=')
+        nom = nom.strip()
+        if nom not in MIX_CLIENT:
+            raise argparse.ArgumentTypeError(f"étape inconnue : {nom} ({', '.join(MIX_CLIENT)})")
+        mix[nom] = float(poids or 1)
+    return mix
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+async def run(args):
+    stats = Statistiques()
+    utilisateurs = [
+        UtilisateurVirtuel(i, args.username_pattern.format(i % args.accounts), args.password, args.mix, args, stats)
+        for i in range(args.users)
+    ]
+    if args.admin:
+        username, _, password = args.admin.partition(':')
+        utilisateurs += [
+            UtilisateurVirtuel(args.users + i, username, password, MIX_ADMIN, args, stats)
+            for i in range(args.admin_users)
+        ]
+    debut = time.monotonic()
+    fin = debut + args.ramp_up + args.duration
+    await asyncio.gather(*(u.executer(fin) for u in utilisateurs))
+    duree = time.monotonic() - debut
+
+    toutes = [v for nom, valeurs in stats.latences.items() if nom != 'login' for v in valeurs]
+    erreurs = sum(n for nom, n in stats.erreurs.items() if nom != 'login')
+    return {
+        'meta': {
+            'url': args.url,
+            'commit': _commit(),
+            'debut': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'utilisateurs': args.users,
+            'utilisateurs_admin': args.admin_users if args.admin else 0,
+            'duree_s': round(duree, 2),
+            'montee_en_charge_s': args.ramp_up,
+            'mix': args.mix,
+            'graine': args.seed,
+        },
+        'global': _resume(toutes, erreurs, duree),
+        'etapes': {
+            nom: _resume(valeurs, stats.erreurs.get(nom, 0), duree)
+            for nom, valeurs in sorted(stats.latences.items())
+        },
+        'erreurs': dict(sorted(stats.motifs.items(), key=lambda kv: -kv[1])),
+    }
+
+
+def _afficher(rapport, out):
+    g = rapport['global']
+    out.write(
+        f"{g['requetes']} étapes en {rapport['meta']['duree_s']}s : {g['debit_par_s']}/s, "
+        f"erreurs {g['taux_erreur']:.2%}, p50 {g['p50_ms']} ms, p95 {g['p95_ms']} ms, p99 {g['p99_ms']} ms\n"
+    )
+    for nom, r in rapport['etapes'].items():
+        out.write(
+            f"  {nom:<14} {r['requetes']:>7}  {r['debit_par_s']:>8}/s  err {r['taux_erreur']:>7.2%}  "
+            f"p50 {r['p50_ms']} ms  p95 {r['p95_ms']} ms  p99 {r['p99_ms']} ms\n"
+        )
+    for motif, n in list(rapport['erreurs'].items())[:10]:
+        out.write(f"  ! {motif} ×{n}\n")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge HTTP des parcours Banquise (rapport JSON).")
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--users', type=int, default=20, help="Utilisateurs virtuels clients simultanés.")
+    parser.add_argument('--accounts', type=int, default=1000, help="Nombre de clients seed_bank utilisables.")
+    parser.add_argument('--username-pattern', default='seed{:07d}')
+    parser.add_argument('--password', default='banquise')
+    parser.add_argument('--admin', help="identifiant:motdepasse d'un compte staff (parcours admin_manage).")
+    parser.add_argument('--admin-users', type=int, default=1)
+    parser.add_argument('--mix', type=_parse_mix, default=dict(MIX_CLIENT), help="ex. dashboard=50,releve_compte=30,virement=20")
+    parser.add_argument('--duration', type=float, default=30, help="Durée de la phase mesurée (s).")
+    parser.add_argument('--ramp-up', type=float, default=2, help="Démarrage étalé des utilisateurs (s).")
+    parser.add_argument('--think-time', type=float, default=0, help="Pause moyenne entre deux étapes (s).")
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help="Fichier du rapport JSON (sinon sur la sortie standard).")
+    args = parser.parse_args(argv)
+    args.users = max(0, args.users)
+    args.accounts = max(1, args.accounts)
+    return args
+
+
+def main(argv=None, out=None):
+    """``out`` : flux du résumé, ou du rapport JSON sans ``--json`` (sortie standard par défaut)."""
+    args = parse_args(argv)
+    out = out or sys.stdout
+    rapport = asyncio.run(run(args))
+    if args.json:
+        Path(args.json).write_text(json.dumps(rapport, indent=2, ensure_ascii=False), encoding='utf-8')
+        _afficher(rapport, out)
+    else:
+        _afficher(rapport, sys.stderr)
+        json.dump(rapport, out, indent=2, ensure_ascii=False)
+        out.write('\n')
+    return 1 if rapport['global']['requetes'] == 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())